@@ -5,31 +5,97 @@ Vercel-compatible Flask app for Advanced Python Terminal
 
 import os
 import sys
-from flask import Flask, render_template, request, jsonify, session
+import gzip
+import json
+import codecs
+import tempfile
+from flask import Flask, Response, render_template, request, jsonify, session, send_file
 import uuid
-from terminal import TerminalBackend
+from sessions import SessionManager, WebSession
+from scrollback import Scrollback
+from recording import Recording, paced
+from metrics import MetricsSampler
+from git_status import GitStatusCache
+from code_runner import CodeRunner
+from listing import iter_entries, unsorted_page, entry_stat
+from fileview import FileView
 
 app = Flask(__name__)
 app.secret_key = os.urandom(24)
 
-# Store terminal instances per session
-terminals = {}
+# Store terminal sessions, evicting idle and least recently used ones
+sessions = SessionManager(
+    max_sessions=int(os.environ.get('TERMINAL_MAX_SESSIONS', 100)),
+    idle_ttl=float(os.environ.get('TERMINAL_SESSION_TTL', 1800)),
+    # Session histories are in memory unless a database file is configured
+    factory=lambda session_id: WebSession(
+        session_id,
+        os.environ.get('TERMINAL_WEB_HISTORY_FILE', ':memory:'),
+        Scrollback(
+            max_lines=int(os.environ.get('TERMINAL_SCROLLBACK_LINES', Scrollback.max_lines)),
+            max_bytes=int(os.environ.get('TERMINAL_SCROLLBACK_BYTES', Scrollback.max_bytes))
+        )
+    )
+)
 
-def get_terminal():
-    """Get or create terminal instance for current session."""
+# Session recordings are kept here until deleted
+RECORDING_DIR = os.environ.get('TERMINAL_RECORDING_DIR', os.path.join(tempfile.gettempdir(), 'terminal-recordings'))
+
+# System statistics are sampled in the background and served from a snapshot
+metrics = MetricsSampler(interval=float(os.environ.get('TERMINAL_STATS_INTERVAL', 1.0)))
+
+# Git status is shared by every session polling the same repository
+git_status = GitStatusCache(max_age=float(os.environ.get('TERMINAL_GIT_STATUS_MAX_AGE', GitStatusCache.max_age)))
+
+# Editor snippets run in a pool of warm Python processes shared by every session
+code_workers = int(os.environ.get('TERMINAL_CODE_WORKERS', CodeRunner.max_running))
+code_runner = CodeRunner(
+    warm=int(os.environ.get('TERMINAL_CODE_WARM', code_workers)),
+    max_running=code_workers
+)
+
+def get_tab():
+    """Name the terminal tab a request is for, from the X-Terminal-Tab header or the tab parameter."""
+    tab = request.headers.get('X-Terminal-Tab') or request.args.get('tab', '')
+    tab = ''.join(c for c in tab if c.isalnum())[:32]
+    return tab or '1'
+
+def get_session_key():
+    """Key the current tab's server-side state by browser session and tab."""
     session_id = session.get('session_id')
     if not session_id:
         session_id = str(uuid.uuid4())
         session['session_id'] = session_id
     
-    if session_id not in terminals:
-        terminals[session_id] = TerminalBackend()
-    
-    return terminals[session_id]
+    return f"{session_id}/{get_tab()}"
+
+def get_session():
+    """Get or create the server-side state for the current tab of this browser session."""
+    return sessions.get(get_session_key())
+
+def get_terminal():
+    """Get or create terminal instance for current session."""
+    return get_session().terminal
+
+def get_channel():
+    """Get or create the event channel for the current session's terminal."""
+    return get_session().channel
+
+def compressed_json(payload, min_size=1024):
+    """Serialize payload compactly, gzipped when it is large and the client accepts gzip."""
+    body = json.dumps(payload, separators=(',', ':')).encode()
+    response = Response(body, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if len(body) >= min_size and request.accept_encodings['gzip']:
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
 
 @app.route('/')
 def index():
     """Main terminal page."""
+    # Warm the code runner for the page's editor; nothing is started just by importing this module
+    code_runner.fill()
     return render_template('terminal.html')
 
 @app.route('/execute', methods=['POST'])
@@ -41,13 +107,23 @@ def execute_command():
     if not command:
         return jsonify({'output': '', 'exit_code': 0, 'prompt': get_terminal().get_prompt()})
     
-    terminal = get_terminal()
+    web_session = get_session()
+    terminal = web_session.terminal
+    scrollback = web_session.scrollback
+    scrollback.begin(terminal.get_prompt(), command)
     
     # Handle AI interpretation
     if command.startswith('ai '):
         query = command[3:].strip()
         if query:
-            interpreted_command = terminal.interpret_natural_language(query)
+            try:
+                interpreted_command = terminal.interpret_natural_language(query)
+            except RuntimeError as e:
+                scrollback.write(str(e), 'error')
+                scrollback.end(1)
+                return jsonify({'output': str(e), 'exit_code': 1, 'prompt': terminal.get_prompt()})
+            scrollback.write(f"AI interpreted: {interpreted_command}", 'ai')
+            scrollback.end(0)
             return jsonify({
                 'output': f"AI interpreted: {interpreted_command}",
                 'exit_code': 0,
@@ -55,8 +131,31 @@ def execute_command():
                 'ai_interpreted': interpreted_command
             })
     
+    # Full-screen programs run on a pseudo-terminal the page attaches to
+    size = data.get('size')
+    pty_argv = terminal.needs_pty(command) if size else None
+    if pty_argv:
+        try:
+            pty_id, _ = terminal.open_pty(command, pty_argv, size.get('rows', 24), size.get('cols', 80))
+        except FileNotFoundError:
+            scrollback.write(terminal.command_not_found(pty_argv[0]), 'error')
+            scrollback.end(1)
+            return jsonify({
+                'output': terminal.command_not_found(pty_argv[0]),
+                'exit_code': 1,
+                'prompt': terminal.get_prompt()
+            })
+        scrollback.end(0)
+        return jsonify({'pty': pty_id, 'prompt': terminal.get_prompt()})
+    
+    # Stream output as newline-delimited JSON when the client asks for it
+    if data.get('stream'):
+        return Response(stream_command(terminal, command, scrollback), mimetype='application/x-ndjson')
+    
     # Execute command
     output, exit_code = terminal.execute_command(command)
+    scrollback.write(output)
+    scrollback.end(exit_code)
     
     # Handle special exit code
     if exit_code == -1:
@@ -73,77 +172,328 @@ def execute_command():
         'prompt': terminal.get_prompt()
     })
 
+def stream_command(terminal, command, scrollback):
+    """Yield a command's output chunks followed by its exit status, keeping them in the tab's scrollback."""
+    stream = terminal.stream_command(command)
+    try:
+        for chunk in stream:
+            scrollback.write(chunk)
+            yield json.dumps({'output': chunk}) + '\n'
+    finally:
+        stream.close()
+        scrollback.end(stream.exit_code or 0)
+    
+    yield json.dumps({
+        'exit_code': stream.exit_code,
+        'prompt': terminal.get_prompt(),
+        'should_exit': stream.exit_code == -1
+    }) + '\n'
+
+@app.route('/events')
+def events():
+    """Persistent Server-Sent-Events stream of command output for this tab.
+    
+    EventSource cannot send headers, so the tab is named by the tab parameter.
+    """
+    channel = get_channel()
+    return Response(
+        channel.events(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/input', methods=['POST'])
+def submit_input():
+    """Queue a command whose output will be pushed over /events."""
+    data = request.get_json()
+    command = data.get('command', '').strip()
+    
+    if not command:
+        return jsonify({'queued': False})
+    
+    get_channel().submit(command, data.get('size'))
+    return jsonify({'queued': True}), 202
+
+@app.route('/cancel', methods=['POST'])
+def cancel_command():
+    """Interrupt the session's running command, as Ctrl+C does in the CLI."""
+    return jsonify({'interrupted': get_terminal().interrupt()})
+
+@app.route('/scrollback')
+def get_scrollback():
+    """Get a range of the lines the tab has shown, the newest by default.
+    
+    Pass 'start' to read forward from that line number, or 'before' to
+    read the lines just before it, as the page does when it is scrolled
+    back. Each line is [seq, kind, text]; 'oldest' and 'newest' number the
+    lines kept and 'more' says whether older ones precede the range.
+    Events at or below 'version' are already drawn, and 'running' says
+    whether a command is still executing.
+    """
+    limit = max(1, min(request.args.get('limit', 500, type=int), 5000))
+    web_session = get_session()
+    lines = web_session.scrollback.read(
+        limit,
+        start=request.args.get('start', type=int),
+        before=request.args.get('before', type=int)
+    )
+    lines['prompt'] = web_session.terminal.get_prompt()
+    return compressed_json(lines)
+
+@app.route('/close_tab', methods=['POST'])
+def close_tab():
+    """Close the tab's backend, stopping its commands and jobs."""
+    return jsonify({'closed': sessions.close(get_session_key())})
+
+@app.route('/recording/start', methods=['POST'])
+def start_recording():
+    """Start recording the tab's commands and output in asciicast v2 format."""
+    size = (request.get_json(silent=True) or {}).get('size') or {}
+    recorder = get_session().start_recording(RECORDING_DIR, size.get('cols', 80), size.get('rows', 24))
+    return jsonify(recorder.info())
+
+@app.route('/recording/stop', methods=['POST'])
+def stop_recording():
+    """Finish the tab's recording."""
+    recorder = get_session().stop_recording()
+    if recorder is None:
+        return jsonify({'error': 'Not recording'}), 409
+    return jsonify(recorder.info())
+
+@app.route('/recordings/<recording_id>')
+def download_recording(recording_id):
+    """Download a recording: gzip-compressed asciicast v2, which zcat turns into a .cast file."""
+    try:
+        recording = Recording(RECORDING_DIR, recording_id)
+    except (ValueError, FileNotFoundError):
+        return jsonify({'error': 'No such recording'}), 404
+    return send_file(recording.path, mimetype='application/gzip', as_attachment=True,
+                     download_name=f"{recording_id}.cast.gz")
+
+@app.route('/recordings/<recording_id>/replay')
+def replay_recording(recording_id):
+    """Stream a recording's events as newline-delimited JSON, paced as they were recorded.
+    
+    'speed' multiplies the pace (0 sends everything at once), 'from'
+    starts that many seconds in, found through the recording's index, and
+    'idle' shortens longer pauses to that many seconds. Each line is
+    {"time", "type", "data"}, type 'o' for output and 'i' for input.
+    """
+    try:
+        recording = Recording(RECORDING_DIR, recording_id)
+    except (ValueError, FileNotFoundError):
+        return jsonify({'error': 'No such recording'}), 404
+    # Events of a recording still running may be waiting in its buffer
+    recorder = get_session().recorder
+    if recorder is not None and recorder.id == recording_id:
+        recorder.flush()
+    speed = request.args.get('speed', 1.0, type=float)
+    start = max(request.args.get('from', 0.0, type=float), 0.0)
+    idle = request.args.get('idle', type=float)
+    
+    def generate():
+        for time, kind, data in paced(recording.events(start), speed, idle, start):
+            yield json.dumps({'time': time, 'type': kind, 'data': data}) + '\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/pty/<int:pty_id>/output')
+def pty_output(pty_id):
+    """Stream a pseudo-terminal's raw output until its program exits."""
+    web_session = get_session()
+    terminal = web_session.terminal
+    pty_session = terminal.ptys.get(pty_id)
+    if pty_session is None:
+        return jsonify({'error': 'No such terminal'}), 404
+    
+    def generate():
+        # A chunk may end inside a UTF-8 character
+        decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        try:
+            for chunk in pty_session.output():
+                if web_session.recorder is not None:
+                    web_session.recorder.output(decoder.decode(chunk))
+                yield chunk
+        finally:
+            terminal.close_pty(pty_id)
+    
+    return Response(
+        generate(),
+        mimetype='application/octet-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/pty/<int:pty_id>/input', methods=['POST'])
+def pty_input(pty_id):
+    """Send keystrokes (the raw request body) to a pseudo-terminal."""
+    web_session = get_session()
+    pty_session = web_session.terminal.ptys.get(pty_id)
+    if pty_session is None:
+        return jsonify({'error': 'No such terminal'}), 404
+    data = request.get_data()
+    if web_session.recorder is not None:
+        web_session.recorder.input(data.decode('utf-8', 'replace'))
+    pty_session.write(data)
+    return jsonify({'success': True})
+
+@app.route('/pty/<int:pty_id>/resize', methods=['POST'])
+def pty_resize(pty_id):
+    """Change a pseudo-terminal's window size."""
+    pty_session = get_terminal().ptys.get(pty_id)
+    if pty_session is None:
+        return jsonify({'error': 'No such terminal'}), 404
+    data = request.get_json()
+    pty_session.resize(int(data.get('rows', 24)), int(data.get('cols', 80)))
+    return jsonify({'success': True})
+
+@app.route('/pty/<int:pty_id>/close', methods=['POST'])
+def pty_close(pty_id):
+    """Hang up a pseudo-terminal, stopping its program."""
+    exit_code = get_terminal().close_pty(pty_id)
+    return jsonify({'exit_code': exit_code})
+
 @app.route('/history')
 def get_history():
-    """Get command history."""
+    """Get command history a page at a time, oldest first within the page.
+    
+    Without parameters this returns the newest page. Pass the returned
+    'first' id as 'before' to page further back, or the returned 'last' id
+    as 'since' to fetch only the commands run after it; 'more' says whether
+    another page follows in that direction.
+    """
     terminal = get_terminal()
-    return jsonify({'history': terminal.command_history})
+    limit = max(1, min(request.args.get('limit', 1000, type=int), 10000))
+    since = request.args.get('since', type=int)
+    # Read one entry past the page to learn whether more follow
+    if since is not None:
+        entries = terminal.history.since(since, limit + 1)
+        more = len(entries) > limit
+        entries = entries[:limit]
+    else:
+        entries = terminal.history.page(request.args.get('before', type=int), limit + 1)
+        more = len(entries) > limit
+        entries = entries[:limit][::-1]
+    return compressed_json({
+        'history': [command for _, command in entries],
+        'first': entries[0][0] if entries else None,
+        'last': entries[-1][0] if entries else since,
+        'more': more
+    })
+
+@app.route('/complete')
+def complete():
+    """Complete the word before the cursor in a command line.
+    
+    Returns where that word starts and the candidates that can replace
+    it, each with its display text and kind (builtin, alias, command,
+    directory or file).
+    """
+    terminal = get_terminal()
+    line = request.args.get('line', '')
+    cursor = request.args.get('cursor', len(line), type=int)
+    start, candidates = terminal.completer.complete(line, cursor)
+    return jsonify({
+        'start': start,
+        'completions': [candidate._asdict() for candidate in candidates]
+    })
 
 @app.route('/clear_history', methods=['POST'])
 def clear_history():
     """Clear command history."""
     terminal = get_terminal()
-    terminal.command_history.clear()
+    terminal.history.clear()
     return jsonify({'success': True})
 
 @app.route('/files')
 def get_files():
-    """Get current directory files."""
-    import os
+    """Get one page of current directory files (offset/limit query parameters)."""
+    terminal = get_terminal()
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', 1000, type=int)
     try:
+        # Read one entry past the page to learn whether more follow
+        entries = unsorted_page(iter_entries(terminal.current_dir, show_all=True), offset, limit + 1)
         files = []
-        for item in os.listdir('.'):
-            is_dir = os.path.isdir(item)
+        for entry in entries[:limit]:
+            is_dir = entry.is_dir()
+            entry_info = None if is_dir else entry_stat(entry)
             files.append({
-                'name': item,
+                'name': entry.name,
                 'isDirectory': is_dir,
-                'size': os.path.getsize(item) if not is_dir else 0
+                'size': entry_info.st_size if entry_info else 0
             })
-        return jsonify({'files': files})
+        return jsonify({'files': files, 'offset': offset, 'hasMore': len(entries) > limit})
     except Exception as e:
         return jsonify({'files': [], 'error': str(e)})
 
+@app.route('/sessions')
+def get_session_stats():
+    """Get resident-session and eviction counters."""
+    return jsonify(sessions.stats())
+
+@app.route('/view')
+def view_file():
+    """Get one slice of a file for the paged viewer."""
+    terminal = get_terminal()
+    path = request.args.get('path', '')
+    offset = request.args.get('offset', 0, type=int)
+    length = min(request.args.get('length', 65536, type=int), 1024 * 1024)
+    try:
+        with FileView(terminal.resolve_path(path)) as view:
+            if view.is_binary():
+                return jsonify({'path': path, 'size': view.size, 'binary': True, 'data': ''})
+            data, next_offset = view.read_text(offset, length)
+            return jsonify({
+                'path': path,
+                'size': view.size,
+                'offset': offset,
+                'next': next_offset,
+                'binary': False,
+                'data': data
+            })
+    except Exception as e:
+        return jsonify({'path': path, 'data': '', 'error': str(e)})
+
 @app.route('/stats')
 def get_stats():
-    """Get system statistics."""
-    import psutil
-    import time
+    """Get system statistics from the latest background sample."""
+    body, etag = metrics.snapshot()
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.route('/run_code', methods=['POST'])
+def run_code():
+    """Run a Python snippet from the editor in the tab's directory, streaming its output.
     
-    try:
-        # CPU usage
-        cpu_percent = psutil.cpu_percent(interval=1)
-        
-        # Memory usage
-        memory = psutil.virtual_memory()
-        memory_percent = memory.percent
-        
-        # Disk usage
-        disk = psutil.disk_usage('/')
-        disk_percent = (disk.used / disk.total) * 100
-        
-        # Process count
-        process_count = len(psutil.pids())
-        
-        # Uptime
-        uptime_seconds = time.time() - psutil.boot_time()
-        uptime_str = f"{int(uptime_seconds // 3600)}h {int((uptime_seconds % 3600) // 60)}m"
-        
-        return jsonify({
-            'cpu': round(cpu_percent, 1),
-            'memory': round(memory_percent, 1),
-            'disk': round(disk_percent, 1),
-            'processes': process_count,
-            'uptime': uptime_str
-        })
-    except Exception as e:
-        return jsonify({
-            'cpu': 0,
-            'memory': 0,
-            'disk': 0,
-            'processes': 0,
-            'uptime': '0s',
-            'error': str(e)
-        })
+    The response is newline-delimited JSON like a streamed /execute:
+    {"output": ...} records, then {"exit_code": ...}.
+    """
+    data = request.get_json(silent=True) or {}
+    code = data.get('code', '')
+    if not isinstance(code, str):
+        return jsonify({'error': 'code must be a string'}), 400
+    if not code.strip():
+        return jsonify({'error': 'No code to run'}), 400
+    stream = code_runner.run(code, get_terminal().current_dir)
+    
+    def generate():
+        try:
+            for chunk in stream:
+                yield json.dumps({'output': chunk}) + '\n'
+        finally:
+            stream.close()
+        yield json.dumps({'exit_code': stream.exit_code}) + '\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/git_status')
+def get_git_status():
+    """Get the branch and change counts of the repository the tab's directory is in."""
+    return jsonify(git_status.status(get_terminal().current_dir))
 
 # This is the entry point for Render
 application = app
@@ -0,0 +1,1168 @@
+#!/usr/bin/env python3
+"""
+Terminal Benchmarks
+Measures the performance of the terminal backend and its web transports.
+
+Usage:
+  python benchmark.py transport [--clients N] [--commands N]
+  python benchmark.py isolation [--sessions N] [--rounds N]
+  python benchmark.py listing [--files N]
+  python benchmark.py pty [--mb N]
+  python benchmark.py history [--entries N]
+  python benchmark.py history-api [--sizes N,N,...]
+  python benchmark.py tabs [--lines N,N,...] [--window N]
+  python benchmark.py scrollback [--lines N] [--reads N]
+  python benchmark.py recording [--lines N] [--seeks N]
+  python benchmark.py dispatch [--calls N]
+  python benchmark.py startup [--import-budget MS] [--session-budget MS]
+  python benchmark.py ai [--clients N] [--queries N] [--latency MS]
+  python benchmark.py gitstatus [--files N] [--clients N]
+  python benchmark.py coderunner [--runs N] [--clients N] [--warm N]
+  python benchmark.py fileops [--dirs N] [--files N] [--size BYTES] [--mb N] [--workers N,N,...]
+"""
+
+import argparse
+import gzip
+import http.client
+import json
+import logging
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Return the pct-th percentile of samples."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(name: str, latencies: List[float], elapsed: float):
+    """Print throughput and latency figures for one benchmark run."""
+    print(f"{name:24s} {len(latencies) / elapsed:10.1f} cmd/s  "
+          f"p50 {statistics.median(latencies) * 1000:7.2f} ms  "
+          f"p99 {percentile(latencies, 99) * 1000:7.2f} ms")
+
+
+def start_server():
+    """Serve the web app on a free local port and return (server, port)."""
+    from werkzeug.serving import make_server
+    from app import app
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_port
+
+
+def open_session(port: int) -> str:
+    """Start a terminal session and return its session cookie."""
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    conn.request('GET', '/history')
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    return response.getheader('Set-Cookie', '').split(';')[0]
+
+
+def post_json(conn: http.client.HTTPConnection, path: str, cookie: str, payload: Dict) -> bytes:
+    """POST a JSON body on an open connection and return the response body."""
+    conn.request('POST', path, body=json.dumps(payload), headers={
+        'Content-Type': 'application/json',
+        'Cookie': cookie
+    })
+    return conn.getresponse().read()
+
+
+def execute_client(port: int, commands: List[str], latencies: List[float]):
+    """Run commands through request/response POST /execute."""
+    cookie = open_session(port)
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    post_json(conn, '/execute', cookie, {'command': 'pwd'})
+    for command in commands:
+        start = time.perf_counter()
+        post_json(conn, '/execute', cookie, {'command': command})
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def channel_client(port: int, commands: List[str], latencies: List[float]):
+    """Run commands through POST /input with output pushed over /events."""
+    cookie = open_session(port)
+    events = http.client.HTTPConnection('127.0.0.1', port)
+    events.request('GET', '/events', headers={'Cookie': cookie})
+    stream = events.getresponse()
+    stream.readline()  # ': connected'
+
+    def wait_for_exit():
+        event = ''
+        while True:
+            line = stream.readline().decode().rstrip('\n')
+            if line.startswith('event: '):
+                event = line[7:]
+            elif not line and event == 'exit':
+                return
+
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    post_json(conn, '/input', cookie, {'command': 'pwd'})
+    wait_for_exit()
+    for command in commands:
+        start = time.perf_counter()
+        post_json(conn, '/input', cookie, {'command': command})
+        wait_for_exit()
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+    events.close()
+
+
+def run_clients(client: Callable, port: int, clients: int, commands: List[str]):
+    """Run client concurrently and return (latencies, elapsed seconds)."""
+    latencies: List[float] = []
+    threads = [
+        threading.Thread(target=client, args=(port, commands, latencies))
+        for _ in range(clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, time.perf_counter() - start
+
+
+def bench_transport(args):
+    """Compare POST /execute round-trips with the SSE channel."""
+    server, port = start_server()
+    commands = ['echo hello', 'pwd', 'ls'] * (args.commands // 3)
+    print(f"{args.clients} clients x {len(commands)} commands")
+    try:
+        for name, client in [('POST /execute', execute_client), ('SSE /events + /input', channel_client)]:
+            latencies, elapsed = run_clients(client, port, args.clients, commands)
+            report(name, latencies, elapsed)
+    finally:
+        server.shutdown()
+
+
+def exercise_directories(run: Callable, home: str, name: str, rounds: int, errors: List[str]):
+    """Run cd, pwd, mkdir and ls in a session of its own under home, recording every answer that is wrong.
+
+    run(command) returns (output, exit code). Every session works in a
+    directory of its own, so any answer naming another session's directory
+    or files is cross-talk.
+    """
+    def check(command: str, expected: str = None):
+        output, exit_code = run(command)
+        if exit_code != 0 or (expected is not None and output.strip() != expected):
+            errors.append(f"{name}: {command!r} gave {output.strip()!r} (exit {exit_code}), expected {expected!r}")
+
+    check(f"mkdir {home}")
+    check(f"cd {home}")
+    for i in range(rounds):
+        check(f"mkdir r{i:04d}")
+        check(f"cd r{i:04d}")
+        check('pwd', os.path.join(home, f"r{i:04d}"))
+        check(f"mkdir {name}-{i}")
+        check('ls', f"{name}-{i}")
+        check('cd ..')
+        check('pwd', home)
+    check('ls', '\n'.join(f"r{i:04d}" for i in range(rounds)))
+
+
+def run_sessions(target: Callable, count: int) -> float:
+    """Run target(index) on count threads at once and return the seconds they took."""
+    threads = [threading.Thread(target=target, args=(index,)) for index in range(count)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def bench_isolation(args):
+    """Check that concurrent sessions never see each other's working directory.
+
+    Sessions run cd, pwd, mkdir and ls at once, first as TerminalBackend
+    instances on threads of one process, then through the web server with
+    separate session cookies and several tabs each. Exits non-zero if any
+    answer belongs to another session or the process cwd moved.
+    """
+    from terminal import TerminalBackend
+
+    root = tempfile.mkdtemp(prefix='bench-isolation-')
+    process_cwd = os.getcwd()
+    errors: List[str] = []
+    try:
+        terminals = [TerminalBackend() for _ in range(args.sessions)]
+
+        def backend_session(index: int):
+            exercise_directories(terminals[index].execute_command, os.path.join(root, f"backend{index}"),
+                                 f"backend{index}", args.rounds, errors)
+
+        elapsed = run_sessions(backend_session, args.sessions)
+        print(f"{'backends':10s} {args.sessions} sessions x {args.rounds} rounds in {elapsed:.2f}s, {len(errors)} errors")
+        for terminal in terminals:
+            terminal.close()
+
+        server, port = start_server()
+        try:
+            tabs = 2
+            cookies = [open_session(port) for _ in range(max(args.sessions // tabs, 1))]
+            before = len(errors)
+
+            def web_tab(index: int):
+                cookie, tab = cookies[index // tabs], index % tabs + 1
+                conn = http.client.HTTPConnection('127.0.0.1', port)
+
+                def run(command: str):
+                    data = json.loads(post_json(conn, f"/execute?tab={tab}", cookie, {'command': command}))
+                    return data.get('output', ''), data.get('exit_code')
+
+                exercise_directories(run, os.path.join(root, f"web{index}"), f"web{index}", args.rounds, errors)
+                conn.close()
+
+            elapsed = run_sessions(web_tab, len(cookies) * tabs)
+            print(f"{'web':10s} {len(cookies)} sessions x {tabs} tabs x {args.rounds} rounds in {elapsed:.2f}s, "
+                  f"{len(errors) - before} errors")
+        finally:
+            server.shutdown()
+        if os.getcwd() != process_cwd:
+            errors.append(f"process cwd moved from {process_cwd} to {os.getcwd()}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    for error in errors[:20]:
+        print(f"  {error}")
+    if errors:
+        print(f"FAIL: {len(errors)} answers crossed between sessions")
+        sys.exit(1)
+    print("OK: no directory cross-talk between sessions")
+
+
+def measure(name: str, func: Callable, repeat: int = 3):
+    """Print the best wall time and the peak Python allocation of func."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:32s} {best * 1000:10.1f} ms  peak {peak / 1024 / 1024:8.2f} MB")
+
+
+def legacy_long_listing(path: str):
+    """The listdir/stat/isdir/ctime loop ls -l used before the scandir engine."""
+    lines = []
+    for item in sorted(os.listdir(path)):
+        item_path = os.path.join(path, item)
+        st = os.stat(item_path)
+        is_dir = os.path.isdir(item_path)
+        lines.append(f"{st.st_size:>8} {time.ctime(st.st_mtime)} {item + '/' if is_dir else item}")
+    return '\n'.join(lines)
+
+
+def bench_listing(args):
+    """Time ls -l and the file explorer over a synthetic large directory."""
+    from terminal import TerminalBackend
+    from listing import iter_entries, unsorted_page
+
+    root = tempfile.mkdtemp(prefix='terminal-bench-')
+    try:
+        for i in range(args.files):
+            with open(os.path.join(root, f"file_{i:07d}.txt"), 'w'):
+                pass
+        print(f"{args.files} files in {root}")
+
+        terminal = TerminalBackend()
+        terminal.current_dir = root
+
+        def drain(command):
+            for _ in terminal.stream_command(command):
+                pass
+
+        measure('legacy listdir + stat + isdir', lambda: legacy_long_listing(root))
+        measure('ls -l', lambda: terminal.execute_command('ls -l'))
+        measure('ls -l (streamed)', lambda: drain('ls -l'))
+        measure('ls -l --limit 100', lambda: terminal.execute_command('ls -l --limit 100'))
+        measure('ls', lambda: terminal.execute_command('ls'))
+        measure('/files page (1000)', lambda: unsorted_page(iter_entries(root, True), 0, 1001))
+    finally:
+        shutil.rmtree(root)
+
+
+def throughput(name: str, func: Callable, repeat: int = 3):
+    """Print the best rate at which func moves its reported number of bytes."""
+    best = float('inf')
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = func()
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:32s} {size / best / 1024 / 1024:10.1f} MB/s  ({size / 1024 / 1024:.1f} MB in {best * 1000:.0f} ms)")
+
+
+def bench_pty(args):
+    """Measure terminal output throughput of cat on a pipe, a PTY and the web PTY stream."""
+    from pty_session import PtySession, PTY_SUPPORTED
+
+    if not PTY_SUPPORTED:
+        print("Pseudo-terminals are not supported on this platform")
+        return
+
+    fd, path = tempfile.mkstemp(prefix='terminal-bench-', suffix='.txt')
+    line = b'The quick brown fox jumps over the lazy dog 0123456789\n'
+    with os.fdopen(fd, 'wb') as f:
+        f.write(line * (args.mb * 1024 * 1024 // len(line)))
+    print(f"cat of {os.path.getsize(path) / 1024 / 1024:.0f} MB")
+
+    def pipe_cat():
+        process = subprocess.Popen(['cat', path], stdout=subprocess.PIPE)
+        size = 0
+        while True:
+            data = os.read(process.stdout.fileno(), 65536)
+            if not data:
+                break
+            size += len(data)
+        process.wait()
+        process.stdout.close()
+        return size
+
+    def pty_cat():
+        session = PtySession(['cat', path], os.path.dirname(path))
+        size = sum(len(data) for data in session.output())
+        session.close()
+        return size
+
+    server, port = start_server()
+
+    def web_pty_cat():
+        cookie = open_session(port)
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        reply = json.loads(post_json(conn, '/execute', cookie, {
+            'command': f"pty cat {path}",
+            'size': {'rows': 50, 'cols': 200}
+        }))
+        conn.request('GET', f"/pty/{reply['pty']}/output", headers={'Cookie': cookie})
+        response = conn.getresponse()
+        size = 0
+        while True:
+            data = response.read1(65536)
+            if not data:
+                break
+            size += len(data)
+        conn.close()
+        return size
+
+    try:
+        throughput('pipe (subprocess)', pipe_cat)
+        throughput('pty (PtySession)', pty_cat)
+        throughput('web pty (/pty/<id>/output)', web_pty_cat)
+    finally:
+        server.shutdown()
+        os.unlink(path)
+
+
+def latency(name: str, func: Callable, repeat: int = 200):
+    """Print the median and p99 latency of func."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    print(f"{name:32s} p50 {statistics.median(samples) * 1000:8.3f} ms  p99 {percentile(samples, 99) * 1000:8.3f} ms")
+
+
+def synthetic_commands(count: int) -> List[str]:
+    """Build a shell-like command history with realistic repetition."""
+    rng = random.Random(42)
+    words = ['src', 'tests', 'build', 'docs', 'main', 'utils', 'config', 'data', 'app', 'server']
+    templates = [
+        lambda: f"git commit -m 'fix {rng.choice(words)} {rng.randrange(100000)}'",
+        lambda: f"git checkout feature/{rng.choice(words)}-{rng.randrange(5000)}",
+        lambda: f"cd {rng.choice(words)}/{rng.choice(words)}",
+        lambda: f"grep -rn {rng.choice(words)}_{rng.randrange(20000)} {rng.choice(words)}",
+        lambda: f"python {rng.choice(words)}.py --id {rng.randrange(100000)}",
+        lambda: rng.choice(['ls', 'ls -la', 'git status', 'git diff', 'pwd', 'make test']),
+    ]
+    return [rng.choice(templates)() for _ in range(count)]
+
+
+def bench_history(args):
+    """Time history search and paging over a large persistent store."""
+    from history_store import HistoryStore
+
+    root = tempfile.mkdtemp(prefix='terminal-bench-')
+    try:
+        store = HistoryStore(os.path.join(root, 'history.db'), 'bench')
+        store.batch_size = 10000
+        commands = synthetic_commands(args.entries)
+        start = time.perf_counter()
+        for command in commands:
+            store.add(command)
+        store.flush()
+        elapsed = time.perf_counter() - start
+        print(f"{len(store)} entries in {elapsed:.1f} s ({len(store) / elapsed:.0f} adds/s)")
+
+        latency('add (buffered)', lambda: store.add(f"echo {random.random()}"))
+        store.flush()
+        latency('prefix, common (git)', lambda: store.prefix('git', 10))
+        latency('prefix, rare', lambda: store.prefix('grep -rn data_1234', 10))
+        latency('substring, common (status)', lambda: store.substring('status', 10))
+        latency('substring, rare', lambda: store.substring('data_1234 ', 10))
+        latency('substring, short (zz)', lambda: store.substring('zz', 10))
+        store.fuzzy('x')
+        latency('fuzzy (gcf, warm window)', lambda: store.fuzzy('gcf', 10), repeat=20)
+        latency('page (newest 100)', lambda: store.page(None, 100))
+        latency('page (deep cursor)', lambda: store.page(1000, 100))
+        store.close()
+    finally:
+        shutil.rmtree(root)
+
+
+def web_session(cookie: str, tab: str = '1'):
+    """Return the in-process state of one tab of a web session cookie."""
+    import app
+
+    serializer = app.app.session_interface.get_signing_serializer(app.app)
+    session_id = serializer.loads(cookie.split('=', 1)[1])['session_id']
+    return app.sessions.get(f"{session_id}/{tab}")
+
+
+def get_history(port: int, cookie: str, query: str, encoding: str = 'identity'):
+    """GET /history and return (wire bytes, decoded payload)."""
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    conn.request('GET', '/history' + query, headers={'Cookie': cookie, 'Accept-Encoding': encoding})
+    response = conn.getresponse()
+    body = response.read()
+    conn.close()
+    if response.getheader('Content-Encoding') == 'gzip':
+        return len(body), json.loads(gzip.decompress(body))
+    return len(body), json.loads(body)
+
+
+def bench_history_api(args):
+    """Compare /history payloads and latency as a session's history grows."""
+    server, port = start_server()
+    try:
+        print(f"{'entries':>8s} {'full list':>12s} {'page':>10s} {'page gzip':>10s} "
+              f"{'since':>8s} {'page p50':>10s} {'since p50':>10s}")
+        for size in (int(value) for value in args.sizes.split(',')):
+            cookie = open_session(port)
+            history = web_session(cookie).terminal.history
+            for command in synthetic_commands(size):
+                history.add(command)
+            history.flush()
+            # What the route used to send: every command in one blob
+            full = len(json.dumps({'history': [command for _, command in history.page(None, size)]}))
+
+            page_bytes, page = get_history(port, cookie, '')
+            gzip_bytes, _ = get_history(port, cookie, '', 'gzip')
+            for i in range(10):
+                history.add(f"echo new {i}")
+            since_query = f"?since={page['last']}"
+            since_bytes, _ = get_history(port, cookie, since_query, 'gzip')
+
+            def timed(query):
+                samples = []
+                for _ in range(50):
+                    start = time.perf_counter()
+                    get_history(port, cookie, query, 'gzip')
+                    samples.append(time.perf_counter() - start)
+                return statistics.median(samples) * 1000
+
+            print(f"{size:8d} {full / 1024:10.1f}KB {page_bytes / 1024:8.1f}KB {gzip_bytes / 1024:8.1f}KB "
+                  f"{since_bytes:7d}B {timed(''):8.2f}ms {timed(since_query):8.2f}ms")
+    finally:
+        server.shutdown()
+
+
+def get_scrollback(port: int, cookie: str, tab: str, limit: int, encoding: str = 'identity') -> int:
+    """GET one tab's /scrollback window and return its wire size in bytes."""
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    conn.request('GET', f"/scrollback?limit={limit}",
+                 headers={'Cookie': cookie, 'X-Terminal-Tab': tab, 'Accept-Encoding': encoding})
+    body = conn.getresponse().read()
+    conn.close()
+    return len(body)
+
+
+def bench_tabs(args):
+    """Measure what switching to a tab costs as the tab's scrollback grows.
+
+    The page used to save every output element of the tab it left as HTML
+    and parse all of the other tab's back in; the 'all lines' column is the
+    size of that text for the same output. Now a switch fetches one window
+    of the scrollback, whatever the size of the tab's output.
+    """
+    server, port = start_server()
+    try:
+        cookie = open_session(port)
+        print(f"{'lines':>8s} {'all lines':>11s} {'window':>9s} {'gzip':>9s} {'p50':>8s} {'p99':>8s}")
+        for tab, size in enumerate(int(value) for value in args.lines.split(',')):
+            scrollback = web_session(cookie, str(tab)).scrollback
+            legacy = 0
+            for i in range(0, size, 10):
+                command = f"cat part{i}.log"
+                output = ''.join(f"{i + j:08d} INFO request served in {j}ms\n" for j in range(9))
+                scrollback.begin('user@host:~$ ', command)
+                scrollback.write(output)
+                scrollback.end(0)
+                legacy += len(f'<div class="terminal-line">user@host:~$ {command}</div><div class="terminal-output">{output}</div>')
+
+            window_bytes = get_scrollback(port, cookie, str(tab), args.window)
+            gzip_bytes = get_scrollback(port, cookie, str(tab), args.window, 'gzip')
+            samples = []
+            for _ in range(50):
+                start = time.perf_counter()
+                get_scrollback(port, cookie, str(tab), args.window, 'gzip')
+                samples.append((time.perf_counter() - start) * 1000)
+            print(f"{size:8d} {legacy / 1024:9.1f}KB {window_bytes / 1024:7.1f}KB {gzip_bytes / 1024:7.1f}KB "
+                  f"{statistics.median(samples):6.2f}ms {percentile(samples, 99):6.2f}ms")
+    finally:
+        server.shutdown()
+
+
+def bench_scrollback(args):
+    """Push a million lines of output into a tab's scrollback and read ranges of it back.
+
+    The ring buffer has to hold its line and byte caps however much output
+    arrives, and reading a range has to cost the same anywhere in it. The
+    deque column reads the same ranges the way a deque would, by copying it.
+    """
+    from collections import deque
+    from scrollback import Scrollback
+
+    lines = args.lines
+    scrollback = Scrollback()
+    chunks = []
+    chunk = []
+    for i in range(lines):
+        chunk.append(f"{i:08d} GET /api/items/{i % 977} 200 {i % 53}ms\n")
+        if len(chunk) == 1000:
+            chunks.append(''.join(chunk))
+            chunk = []
+    if chunk:
+        chunks.append(''.join(chunk))
+    size = sum(len(chunk) for chunk in chunks)
+
+    start = time.perf_counter()
+    scrollback.begin('user@host:~$ ', 'tail -n 1000000 access.log')
+    for chunk in chunks:
+        scrollback.write(chunk)
+    scrollback.end(0)
+    elapsed = time.perf_counter() - start
+    print(f"{'write':10s} {lines:,} lines ({size / 1024 / 1024:.1f}MB) in {elapsed:.2f}s: "
+          f"{lines / elapsed:,.0f} lines/s, {size / 1024 / 1024 / elapsed:.1f}MB/s")
+    print(f"{'kept':10s} {len(scrollback):,} lines, {scrollback.bytes / 1024 / 1024:.2f}MB "
+          f"(caps {scrollback.max_lines:,} lines, {scrollback.max_bytes / 1024 / 1024:.0f}MB)")
+
+    copy = deque((scrollback.read(scrollback.max_lines)['lines']), maxlen=scrollback.max_lines)
+    rng = random.Random(1)
+    oldest = scrollback.first
+    positions = [rng.randrange(oldest, scrollback.seq - 100) for _ in range(args.reads)]
+
+    def ring_read():
+        for position in positions:
+            scrollback.read(100, start=position)
+
+    def deque_read():
+        for position in positions:
+            list(copy)[position - oldest:position - oldest + 100]
+
+    for name, func in (('ring', ring_read), ('deque', deque_read)):
+        start = time.perf_counter()
+        func()
+        print(f"{name + ' read':10s} {(time.perf_counter() - start) / args.reads * 1e6:8.1f}us per 100-line range")
+
+    server, port = start_server()
+    try:
+        cookie = open_session(port)
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        command = f"python3 -c \"import sys; sys.stdout.writelines(f'{{i:08d}} line of output\\n' for i in range({lines}))\""
+        start = time.perf_counter()
+        body = post_json(conn, '/execute', cookie, {'command': command, 'stream': True})
+        elapsed = time.perf_counter() - start
+        conn.close()
+        tab = web_session(cookie).scrollback
+        print(f"{'web':10s} {lines:,} lines through /execute in {elapsed:.2f}s ({len(body) / 1024 / 1024:.1f}MB streamed), "
+              f"{len(tab):,} lines kept")
+        samples = []
+        for _ in range(50):
+            begin = time.perf_counter()
+            get_scrollback(port, cookie, '1', 500, 'gzip')
+            samples.append((time.perf_counter() - begin) * 1000)
+        print(f"{'/scrollback':10s} {statistics.median(samples):8.2f}ms p50 {percentile(samples, 99):8.2f}ms p99 for 500 lines")
+    finally:
+        server.shutdown()
+
+
+def bench_recording(args):
+    """Record a million lines of output, then seek into and replay the recording.
+
+    Recording has to keep up with the scrollback and leave a small file;
+    starting a replay late in a long recording has to cost about the same
+    as starting it at the beginning, and replaying it must not hold the
+    recording in memory.
+    """
+    from recording import Recorder, Recording, paced
+    from scrollback import Scrollback
+
+    directory = tempfile.mkdtemp(prefix='bench-recording-')
+    try:
+        chunks = []
+        chunk = []
+        for i in range(args.lines):
+            chunk.append(f"{i:08d} GET /api/items/{i % 977} 200 {i % 53}ms\n")
+            if len(chunk) == 1000:
+                chunks.append(''.join(chunk))
+                chunk = []
+        if chunk:
+            chunks.append(''.join(chunk))
+        size = sum(len(chunk) for chunk in chunks)
+
+        for name, recorder in (('unrecorded', None), ('recorded', Recorder(directory))):
+            scrollback = Scrollback()
+            scrollback.recorder = recorder
+            start = time.perf_counter()
+            scrollback.begin('user@host:~$ ', 'tail -n 1000000 access.log')
+            for chunk in chunks:
+                scrollback.write(chunk)
+            scrollback.end(0)
+            if recorder is not None:
+                recorder.close()
+            elapsed = time.perf_counter() - start
+            print(f"{name:10s} {args.lines:,} lines ({size / 1024 / 1024:.1f}MB) in {elapsed:.2f}s: "
+                  f"{args.lines / elapsed:,.0f} lines/s")
+
+        recording = Recording(directory, recorder.id)
+        stored = os.path.getsize(recording.path)
+        index = recording.index()
+        print(f"{'file':10s} {stored / 1024 / 1024:.2f}MB ({size / stored:.1f}x smaller), "
+              f"{len(index):,} blocks, index {os.path.getsize(recording.index_path) / 1024:.1f}KB")
+
+        def first_event_from_start(when: float):
+            for event in recording._lines(0):
+                if event[0] == '[' and json.loads(event)[0] >= when:
+                    return
+
+        def first_event_by_index(when: float):
+            next(recording.events(when), None)
+
+        rng = random.Random(1)
+        duration = recorder.duration
+        times = [rng.uniform(duration / 2, duration) for _ in range(args.seeks)]
+        for name, func in (('scan', first_event_from_start), ('index', first_event_by_index)):
+            start = time.perf_counter()
+            for when in times:
+                func(when)
+            print(f"{'seek ' + name:10s} {(time.perf_counter() - start) / args.seeks * 1000:8.2f}ms to the first event, "
+                  f"seeking into the second half")
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        replayed = 0
+        for _, kind, data in paced(recording.events(), speed=0):
+            replayed += len(data)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{'replay':10s} {replayed / 1024 / 1024:.1f}MB of events in {elapsed:.2f}s "
+              f"({replayed / 1024 / 1024 / elapsed:.1f}MB/s), peak memory {peak / 1024:.0f}KB")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def legacy_dispatch_table(terminal) -> Dict[str, Callable]:
+    """Build the dict of bound builtin methods the terminal used to rebuild on every lookup."""
+    return {name: getattr(terminal, terminal.commands.get(name).run.__name__) for name in terminal.commands}
+
+
+def per_call(name: str, func: Callable, calls: int):
+    """Print the mean time of one call to func."""
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"{name:40s} {elapsed / calls * 1e9:10.0f} ns/call")
+
+
+def bench_dispatch(args):
+    """Measure the cost of finding and calling a builtin."""
+    from terminal import TerminalBackend
+
+    terminal = TerminalBackend()
+    command = terminal.commands.get('pwd')
+    per_call('lookup: rebuilt dict (old property)', lambda: legacy_dispatch_table(terminal)['pwd'], args.calls)
+    per_call('lookup: registry', lambda: terminal.commands.get('pwd'), args.calls)
+    per_call('lookup + call: rebuilt dict', lambda: legacy_dispatch_table(terminal)['pwd']([]), args.calls)
+    per_call('lookup + call: registry', lambda: terminal.commands.get('pwd').run(terminal, []), args.calls)
+    per_call('call only', lambda: command.run(terminal, []), args.calls)
+    per_call('execute_command("pwd")', lambda: terminal.execute_command('pwd'), args.calls // 10)
+    terminal.close()
+
+
+# Heavy optional packages each entry point must not import at startup
+STARTUP_EXCLUDED = {
+    'terminal': ('openai', 'prompt_toolkit', 'psutil', 'colorama'),
+    'web_terminal': ('openai', 'prompt_toolkit', 'psutil', 'colorama'),
+    'cli': ('openai', 'psutil'),
+}
+
+
+def import_profile(module: str) -> Dict[str, int]:
+    """Import module in a fresh interpreter and return each module's cumulative import time in microseconds."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def bench_startup(args):
+    """Time importing each entry point and creating a session, failing when a budget is exceeded."""
+    failures = []
+    for module, excluded in STARTUP_EXCLUDED.items():
+        # The first run also compiles bytecode; keep the fastest of the rest
+        profiles = [import_profile(module) for _ in range(args.repeat + 1)][1:]
+        profile = min(profiles, key=lambda times: times.get(module, 0))
+        total = profile.get(module, 0) / 1000
+        heaviest = sorted(((us, name) for name, us in profile.items() if '.' not in name and name != module),
+                          reverse=True)[:5]
+        print(f"import {module:14s} {total:8.1f}ms  heaviest: "
+              + ', '.join(f"{name} {us / 1000:.1f}ms" for us, name in heaviest))
+        loaded = [name for name in excluded if name in profile]
+        if loaded:
+            failures.append(f"{module} imports {', '.join(loaded)}")
+        # The front ends' time is mostly Flask and prompt_toolkit; only the backend's own import is budgeted
+        if module == 'terminal' and total > args.import_budget:
+            failures.append(f"import {module} took {total:.1f}ms (budget {args.import_budget}ms)")
+
+    from sessions import WebSession
+    from terminal import TerminalBackend
+
+    def create_terminal():
+        TerminalBackend().close()
+
+    def create_session():
+        WebSession('benchmark').close()
+
+    for name, func in (('TerminalBackend()', create_terminal), ('WebSession()', create_session)):
+        func()
+        samples = []
+        for _ in range(args.sessions):
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1000)
+        median = statistics.median(samples)
+        print(f"{name:21s} {median:8.2f}ms median  {percentile(samples, 99):8.2f}ms p99")
+        if median > args.session_budget:
+            failures.append(f"{name} took {median:.2f}ms (budget {args.session_budget}ms)")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+AI_QUERIES = ['list files', 'show disk usage', 'find large files', 'show running processes',
+              'make a directory called build', 'count lines in all python files', 'show git status',
+              'compress the logs folder']
+# What the local model must answer, None meaning it leaves the request to
+# the remote model; a wrong local answer is run without asking that model
+AI_EXPECTED = [
+    ('list files in ./src', 'ls ./src'), ('go to ./src', 'cd ./src'), ('delete "database"', 'rm database'),
+    ('create a directory called ./foo', 'mkdir ./foo'), ('who am i', 'whoami'), ('kill process 1234', 'kill 1234'),
+    ('create a directory called foo', None), ('list python files', None), ('go to hell', None),
+    ('open google.com', None), ('who are you', None), ('make it faster', None), ('what is the weather', None),
+    ('delete the database', None),
+]
+
+
+def ai_workload(count: int, seed: int) -> List[str]:
+    """Return count queries drawn from a few requests, varied in case, spacing and punctuation."""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        query = rng.choice(AI_QUERIES)
+        if rng.random() < 0.5:
+            query = query.capitalize() + rng.choice(['', '.', '?', '  '])
+        queries.append(query)
+    return queries
+
+
+def bench_ai(args):
+    """Compare calling the model for every query with the cached, coalescing interpreter and the local model."""
+    from interpreter import FallbackModel, Interpreter, StubModel
+    from local_model import LocalModel
+
+    workloads = [ai_workload(args.queries, seed) for seed in range(args.clients)]
+
+    def run(name: str, interpret: Callable, model: StubModel):
+        latencies: List[float] = []
+        lock = threading.Lock()
+
+        def client(queries: List[str]):
+            for query in queries:
+                start = time.perf_counter()
+                interpret(query)
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+
+        threads = [threading.Thread(target=client, args=(queries,)) for queries in workloads]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        print(f"{name:12s} {elapsed:7.2f}s  model calls {model.calls:6d}  "
+              f"p50 {percentile(latencies, 50) * 1000:8.2f}ms  p99 {percentile(latencies, 99) * 1000:8.2f}ms")
+
+    print(f"{args.clients} clients x {args.queries} queries, model latency {args.latency:g}ms")
+    direct = StubModel(latency=args.latency / 1000)
+    run('uncached', lambda query: direct.complete(query, 15.0), direct)
+    model = StubModel(latency=args.latency / 1000)
+    interpreter = Interpreter(model)
+    run('interpreter', interpreter.interpret, model)
+    print(f"{'':12s} {interpreter.stats()}")
+    interpreter.close()
+
+    remote = StubModel(latency=args.latency / 1000)
+    interpreter = Interpreter(FallbackModel(LocalModel(), remote))
+    run('local+stub', interpreter.interpret, remote)
+    print(f"{'':12s} {interpreter.stats()}")
+    interpreter.close()
+
+    local = LocalModel()
+    local.match(AI_QUERIES[0])
+    for query in AI_QUERIES:
+        start = time.perf_counter()
+        for _ in range(1000):
+            match = local.match(query)
+        elapsed = (time.perf_counter() - start) / 1000
+        answer = f"{match.command} ({match.confidence:.2f})" if match else 'low confidence, asks the remote model'
+        print(f"  local {query:32s} {elapsed * 1e6:7.1f}us  {answer}")
+
+    failures = []
+    for query, expected in AI_EXPECTED:
+        match = local.match(query)
+        answer = match.command if match else None
+        if answer != expected:
+            failures.append(f"local model answered {query!r} with {answer!r}, expected {expected!r}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"OK: local model gave the expected answer to {len(AI_EXPECTED)} requests")
+
+
+def bench_gitstatus(args):
+    """Compare running git status for every poll with the cached status, alone and from many sessions at once."""
+    from git_status import GitStatusCache
+
+    root = tempfile.mkdtemp(prefix='bench-git-')
+    try:
+        for i in range(args.files):
+            directory = os.path.join(root, f"dir{i // 500:03d}")
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f"file{i:06d}.txt"), 'w') as file:
+                file.write(f"line {i}\n")
+
+        def git(*argv):
+            subprocess.run(['git', '-c', 'user.name=bench', '-c', 'user.email=bench@example.com', *argv],
+                           cwd=root, check=True, capture_output=True)
+
+        git('init', '-q')
+        git('add', '.')
+        git('commit', '-q', '-m', 'synthetic tree')
+        for i in range(0, args.files, 100):
+            with open(os.path.join(root, f"dir{i // 500:03d}", f"file{i:06d}.txt"), 'a') as file:
+                file.write('changed\n')
+        print(f"repository with {args.files:,} files, {len(range(0, args.files, 100))} modified")
+
+        def run_git():
+            subprocess.run(['git', '--no-optional-locks', 'status', '--porcelain=v2', '--branch', '-z'],
+                           cwd=root, check=True, capture_output=True)
+
+        cache = GitStatusCache()
+        latency('git status per poll', run_git, repeat=20)
+        latency('cached poll', lambda: cache.status(root), repeat=1000)
+
+        def burst(name: str):
+            results = []
+            barrier = threading.Barrier(args.clients)
+
+            def client():
+                barrier.wait()
+                results.append(cache.status(root))
+
+            before = cache.stats()
+            threads = [threading.Thread(target=client) for _ in range(args.clients)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            after = cache.stats()
+            print(f"{name:32s} {elapsed * 1000:8.2f} ms for {args.clients} sessions: "
+                  f"{after['runs'] - before['runs']} git runs, {after['coalesced'] - before['coalesced']} coalesced, "
+                  f"{after['hits'] - before['hits']} cache hits")
+
+        burst('burst, status cached')
+        # Staging a file rewrites the index, so the next polls need git again
+        git('add', os.path.join('dir000', 'file000000.txt'))
+        burst('burst after git add')
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def bench_coderunner(args):
+    """Compare starting a Python process per snippet with the warm pool, one user and many at once."""
+    from code_runner import CodeRunner
+
+    code = "import math\nprint(sum(math.sqrt(i) for i in range(10000)))"
+    cwd = tempfile.gettempdir()
+
+    def run(runner: CodeRunner):
+        stream = runner.run(code, cwd)
+        ''.join(stream)
+        assert stream.exit_code == 0, stream.exit_code
+
+    for name, warm in (('cold', 0), ('warm', args.warm)):
+        runner = CodeRunner(warm=warm)
+        runner.fill()
+        samples = []
+        for _ in range(args.runs):
+            # Snippets arrive seconds apart in use; give the pool time to refill, as it would have
+            time.sleep(0.1)
+            start = time.perf_counter()
+            run(runner)
+            samples.append(time.perf_counter() - start)
+        print(f"{name + ' (1 user)':20s} p50 {statistics.median(samples) * 1000:8.2f} ms  "
+              f"p99 {percentile(samples, 99) * 1000:8.2f} ms  {runner.stats()}")
+
+        latencies: List[float] = []
+        lock = threading.Lock()
+
+        def client():
+            for _ in range(args.runs // 4 or 1):
+                start = time.perf_counter()
+                run(runner)
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+
+        time.sleep(0.5)
+        threads = [threading.Thread(target=client) for _ in range(args.clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        print(f"{name + f' ({args.clients} users)':20s} p50 {statistics.median(latencies) * 1000:8.2f} ms  "
+              f"p99 {percentile(latencies, 99) * 1000:8.2f} ms  {len(latencies) / elapsed:6.1f} runs/s  {runner.stats()}")
+        runner.close()
+
+
+def synthetic_tree(root: str, dirs: int, files: int, size: int):
+    """Create dirs directories, two levels deep, each holding files files of size bytes."""
+    data = os.urandom(size)
+    for i in range(dirs):
+        directory = os.path.join(root, f"dir_{i // 10:03d}", f"sub_{i:05d}")
+        os.makedirs(directory)
+        for j in range(files):
+            with open(os.path.join(directory, f"file_{j:05d}.dat"), 'wb') as handle:
+                handle.write(data)
+
+
+def bench_fileops(args):
+    """Compare shutil with the parallel cp -r, rm -r and large-file cp on synthetic trees."""
+    from terminal import TerminalBackend
+
+    root = tempfile.mkdtemp(prefix='terminal-bench-', dir=args.dir)
+    try:
+        source = os.path.join(root, 'source')
+        synthetic_tree(source, args.dirs, args.files, args.size)
+        count = args.dirs * args.files
+        print(f"{count} files of {args.size} bytes in {args.dirs} directories under {root}")
+
+        def timed(name: str, func: Callable, target: str, files: int = count):
+            samples = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                func()
+                samples.append(time.perf_counter() - start)
+                if os.path.exists(target):
+                    shutil.rmtree(target)
+            elapsed = statistics.median(samples)
+            print(f"{name:28s} {elapsed:8.2f}s  {files / elapsed:10,.0f} files/s")
+
+        def copy_and_remove(func: Callable):
+            # Times removal of a fresh copy, so each sample removes the same tree
+            samples = []
+            for _ in range(args.repeat):
+                shutil.copytree(source, os.path.join(root, 'copy'))
+                start = time.perf_counter()
+                func()
+                samples.append(time.perf_counter() - start)
+            return statistics.median(samples)
+
+        terminal = TerminalBackend()
+        terminal.current_dir = root
+        timed('shutil.copytree', lambda: shutil.copytree(source, os.path.join(root, 'copy')), os.path.join(root, 'copy'))
+        for workers in map(int, args.workers.split(',')):
+            terminal.file_workers = workers
+            timed(f'cp -r ({workers} workers)', lambda: terminal.execute_command('timeout 0 cp -r source copy'),
+                  os.path.join(root, 'copy'))
+
+        elapsed = copy_and_remove(lambda: shutil.rmtree(os.path.join(root, 'copy')))
+        print(f"{'shutil.rmtree':28s} {elapsed:8.2f}s  {count / elapsed:10,.0f} files/s")
+        for workers in map(int, args.workers.split(',')):
+            terminal.file_workers = workers
+            elapsed = copy_and_remove(lambda: terminal.execute_command('timeout 0 rm -r copy'))
+            print(f"{f'rm -r ({workers} workers)':28s} {elapsed:8.2f}s  {count / elapsed:10,.0f} files/s")
+
+        big = os.path.join(root, 'big.dat')
+        with open(big, 'wb') as handle:
+            chunk = os.urandom(1024 * 1024)
+            for _ in range(args.mb):
+                handle.write(chunk)
+        for name, func in (('shutil.copyfile', lambda: shutil.copyfile(big, os.path.join(root, 'big.copy'))),
+                           ('cp (one large file)', lambda: terminal.execute_command('timeout 0 cp big.dat big.copy'))):
+            samples = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                func()
+                samples.append(time.perf_counter() - start)
+                os.remove(os.path.join(root, 'big.copy'))
+            elapsed = statistics.median(samples)
+            print(f"{name:28s} {elapsed:8.2f}s  {args.mb / elapsed:10,.0f} MB/s")
+
+        # A copy stopped part way, as Ctrl+C or /cancel would
+        terminal.file_workers = 8
+        stream = terminal.stream_command('timeout 0 cp -r source copy')
+        timer = threading.Timer(0.2, terminal.interrupt)
+        timer.start()
+        start = time.perf_counter()
+        output, exit_code = stream.read()
+        print(f"{'cancel after 0.2s':28s} {time.perf_counter() - start:8.2f}s  exit {exit_code}")
+        terminal.close()
+    finally:
+        shutil.rmtree(root)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Advanced Python Terminal Benchmarks')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    transport = subparsers.add_parser('transport', help='Compare web command transports')
+    transport.add_argument('--clients', type=int, default=8, help='Concurrent browser sessions (default: 8)')
+    transport.add_argument('--commands', type=int, default=300, help='Commands per session (default: 300)')
+    transport.set_defaults(func=bench_transport)
+
+    isolation = subparsers.add_parser('isolation', help='Check concurrent sessions keep their own working directories')
+    isolation.add_argument('--sessions', type=int, default=16, help='Sessions run at once (default: 16)')
+    isolation.add_argument('--rounds', type=int, default=50, help='cd/mkdir/ls rounds per session (default: 50)')
+    isolation.set_defaults(func=bench_isolation)
+
+    listing = subparsers.add_parser('listing', help='Time directory listings of a large directory')
+    listing.add_argument('--files', type=int, default=100000, help='Files in the synthetic directory (default: 100000)')
+    listing.set_defaults(func=bench_listing)
+
+    pty = subparsers.add_parser('pty', help='Measure terminal output throughput in MB/s')
+    pty.add_argument('--mb', type=int, default=100, help='Size of the file to cat in MB (default: 100)')
+    pty.set_defaults(func=bench_pty)
+
+    history = subparsers.add_parser('history', help='Time history search over a large store')
+    history.add_argument('--entries', type=int, default=1000000, help='Commands in the store (default: 1000000)')
+    history.set_defaults(func=bench_history)
+
+    history_api = subparsers.add_parser('history-api', help='Compare /history payload size and latency')
+    history_api.add_argument('--sizes', default='1000,10000,100000',
+                             help='Comma-separated history sizes (default: 1000,10000,100000)')
+    history_api.set_defaults(func=bench_history_api)
+
+    tabs = subparsers.add_parser('tabs', help='Measure the scrollback fetched when switching tabs')
+    tabs.add_argument('--lines', default='1000,10000,100000',
+                      help='Comma-separated lines of output per tab (default: 1000,10000,100000)')
+    tabs.add_argument('--window', type=int, default=500, help='Lines fetched per switch (default: 500)')
+    tabs.set_defaults(func=bench_tabs)
+
+    scrollback = subparsers.add_parser('scrollback', help='Push a million lines through the scrollback ring buffer')
+    scrollback.add_argument('--lines', type=int, default=1000000, help='Lines of output (default: 1000000)')
+    scrollback.add_argument('--reads', type=int, default=1000, help='Random ranges read (default: 1000)')
+    scrollback.set_defaults(func=bench_scrollback)
+
+    recording = subparsers.add_parser('recording', help='Measure recording overhead, file size, seeking and replay')
+    recording.add_argument('--lines', type=int, default=1000000, help='Lines of output recorded (default: 1000000)')
+    recording.add_argument('--seeks', type=int, default=20, help='Replays started at random times (default: 20)')
+    recording.set_defaults(func=bench_recording)
+
+    dispatch = subparsers.add_parser('dispatch', help='Measure builtin command dispatch overhead')
+    dispatch.add_argument('--calls', type=int, default=100000, help='Calls per measurement (default: 100000)')
+    dispatch.set_defaults(func=bench_dispatch)
+
+    startup = subparsers.add_parser('startup', help='Check import and session creation time against budgets')
+    startup.add_argument('--repeat', type=int, default=3, help='Fresh interpreters per module (default: 3)')
+    startup.add_argument('--sessions', type=int, default=50, help='Sessions created per measurement (default: 50)')
+    startup.add_argument('--import-budget', type=float, default=150,
+                         help='Most milliseconds importing terminal may take (default: 150)')
+    startup.add_argument('--session-budget', type=float, default=5,
+                         help='Most milliseconds creating a session may take (default: 5)')
+    startup.set_defaults(func=bench_startup)
+
+    ai = subparsers.add_parser('ai', help='Measure AI interpreter caching against a stub model')
+    ai.add_argument('--clients', type=int, default=16, help='Concurrent sessions (default: 16)')
+    ai.add_argument('--queries', type=int, default=25, help='Queries per session (default: 25)')
+    ai.add_argument('--latency', type=float, default=200, help='Stub model latency in ms (default: 200)')
+    ai.set_defaults(func=bench_ai)
+
+    gitstatus = subparsers.add_parser('gitstatus', help='Compare uncached and cached git status polls')
+    gitstatus.add_argument('--files', type=int, default=20000, help='Files in the synthetic repository (default: 20000)')
+    gitstatus.add_argument('--clients', type=int, default=32, help='Sessions polling at once (default: 32)')
+    gitstatus.set_defaults(func=bench_gitstatus)
+
+    coderunner = subparsers.add_parser('coderunner', help='Compare cold and warm-pool latency of editor snippets')
+    coderunner.add_argument('--runs', type=int, default=40, help='Snippets run one after another (default: 40)')
+    coderunner.add_argument('--clients', type=int, default=8, help='Users running snippets at once (default: 8)')
+    coderunner.add_argument('--warm', type=int, default=4, help='Warm workers in the pool (default: 4)')
+    coderunner.set_defaults(func=bench_coderunner)
+
+    fileops = subparsers.add_parser('fileops', help='Time parallel cp -r, rm -r and large-file cp against shutil')
+    fileops.add_argument('--dirs', type=int, default=200, help='Directories in the synthetic tree (default: 200)')
+    fileops.add_argument('--files', type=int, default=250, help='Files per directory (default: 250)')
+    fileops.add_argument('--size', type=int, default=4096, help='Bytes per file (default: 4096)')
+    fileops.add_argument('--mb', type=int, default=512, help='Size of the large file in MB (default: 512)')
+    fileops.add_argument('--workers', default='1,8', help='Comma-separated worker counts (default: 1,8)')
+    fileops.add_argument('--repeat', type=int, default=3, help='Runs per measurement (default: 3)')
+    fileops.add_argument('--dir', default=None, help='Where to create the tree (default: the temp directory)')
+    fileops.set_defaults(func=bench_fileops)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Session Channel
+A persistent Server-Sent-Events channel between a browser session and its terminal backend.
+"""
+
+import json
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+from scrollback import Scrollback
+
+
+class SessionChannel:
+    """Runs a session's commands in the background and pushes their output as events.
+
+    Commands arrive through ``submit()`` (the POST side channel) and are
+    executed one at a time by a worker thread. Output is placed in a bounded
+    outbox that the SSE response drains, so when the browser falls behind the
+    outbox fills, the worker blocks, and the child process stalls on its pipe.
+
+    Everything a command shows is also kept in the scrollback. While no
+    browser is attached (the tab is in the background) output events are
+    dropped rather than queued, so the command runs on; the page redraws
+    the tab from the scrollback when it comes back. Events carry the
+    scrollback version they leave behind, so the page can tell which ones
+    it has already drawn.
+    """
+
+    # Events buffered for a slow browser before the command is paused
+    outbox_size = 256
+    # Seconds between keep-alive comments on an idle event stream
+    keepalive_interval = 15
+    # Seconds a command may stay paused with no browser attached before it is stopped
+    detached_timeout = 60
+    # Seconds the worker thread waits for another command before exiting
+    worker_idle_timeout = 30
+
+    def __init__(self, terminal, scrollback: Optional[Scrollback] = None):
+        self.terminal = terminal
+        self.scrollback = scrollback if scrollback is not None else Scrollback()
+        self.inbox = queue.Queue()
+        self.outbox = queue.Queue(maxsize=self.outbox_size)
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._listener: Optional[object] = None
+        self._event_id = 0
+        self.closed = False
+
+    @property
+    def attached(self) -> bool:
+        """Whether a browser is reading the event stream."""
+        return self._listener is not None
+
+    def submit(self, command: str, size: Optional[Dict[str, int]] = None):
+        """Queue a command for execution on this session's worker.
+
+        size is the browser's terminal size ({'rows', 'cols'}); when given,
+        full-screen programs are started on a pseudo-terminal.
+        """
+        self.inbox.put((command, size))
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._work, daemon=True)
+                self._worker.start()
+
+    def events(self) -> Iterator[str]:
+        """Yield SSE-formatted events for the browser until it disconnects.
+
+        Opening a new stream detaches any older one for the same session, so a
+        reconnecting browser does not leave a stale reader competing for events.
+        """
+        listener = object()
+        self._listener = listener
+        try:
+            yield ': connected\n\n'
+            while self._listener is listener:
+                try:
+                    event = self.outbox.get(timeout=self.keepalive_interval)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                if event is not None:
+                    yield event
+        finally:
+            if self._listener is listener:
+                self._listener = None
+
+    def close(self):
+        """Detach the browser and stop publishing events."""
+        self.closed = True
+        self._listener = None
+        try:
+            # Wake a stream blocked waiting for events so it can finish
+            self.outbox.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def _work(self):
+        """Execute queued commands until the inbox stays empty."""
+        while not self.closed:
+            try:
+                command, size = self.inbox.get(timeout=self.worker_idle_timeout)
+            except queue.Empty:
+                with self._lock:
+                    if self.inbox.empty():
+                        self._worker = None
+                        return
+                continue
+
+            try:
+                self._run(command, size)
+            except Exception as e:
+                self.scrollback.write(f"Unexpected error: {str(e)}", 'error')
+                self._publish('exit', {
+                    'output': f"Unexpected error: {str(e)}",
+                    'exit_code': 1,
+                    'prompt': self.terminal.get_prompt(),
+                    'version': self.scrollback.end(1)
+                })
+
+    def _run(self, command: str, size: Optional[Dict[str, int]] = None):
+        """Execute one command, publishing its output and final status."""
+        terminal = self.terminal
+        scrollback = self.scrollback
+        scrollback.begin(terminal.get_prompt(), command)
+
+        # Handle AI interpretation
+        if command.startswith('ai '):
+            query = command[3:].strip()
+            if query:
+                try:
+                    interpreted_command = terminal.interpret_natural_language(query)
+                except RuntimeError as e:
+                    scrollback.write(str(e), 'error')
+                    self._publish('exit', {
+                        'output': str(e),
+                        'exit_code': 1,
+                        'prompt': terminal.get_prompt(),
+                        'version': scrollback.end(1)
+                    })
+                    return
+                scrollback.write(f"AI interpreted: {interpreted_command}", 'ai')
+                self._publish('exit', {
+                    'output': f"AI interpreted: {interpreted_command}",
+                    'exit_code': 0,
+                    'prompt': terminal.get_prompt(),
+                    'ai_interpreted': interpreted_command,
+                    'version': scrollback.end(0)
+                })
+                return
+
+        # Full-screen programs run on a pseudo-terminal the page attaches to
+        pty_argv = terminal.needs_pty(command) if size else None
+        if pty_argv:
+            try:
+                pty_id, _ = terminal.open_pty(command, pty_argv, size.get('rows', 24), size.get('cols', 80))
+            except FileNotFoundError:
+                scrollback.write(terminal.command_not_found(pty_argv[0]), 'error')
+                self._publish('exit', {
+                    'output': terminal.command_not_found(pty_argv[0]),
+                    'exit_code': 1,
+                    'prompt': terminal.get_prompt(),
+                    'version': scrollback.end(1)
+                })
+                return
+            # The full-screen program draws on a screen of its own, which is not kept
+            self._publish('pty', {'pty': pty_id, 'prompt': terminal.get_prompt(), 'version': scrollback.end(0)})
+            return
+
+        stream = terminal.stream_command(command)
+        try:
+            for chunk in stream:
+                if not self._publish('output', {'output': chunk, 'version': scrollback.write(chunk)}):
+                    # Nobody has been reading for too long; stop the command
+                    return
+        finally:
+            stream.close()
+            version = scrollback.end(stream.exit_code or 0)
+
+        self._publish('exit', {
+            'exit_code': stream.exit_code,
+            'prompt': terminal.get_prompt(),
+            'should_exit': stream.exit_code == -1,
+            'version': version
+        })
+
+    def _publish(self, event: str, data: Dict[str, Any]) -> bool:
+        """Place an event in the outbox, blocking while the browser catches up.
+
+        Returns False if the channel is closed, or if the outbox stayed full
+        with no browser attached for longer than ``detached_timeout``. Output
+        published with no browser attached is left to the scrollback.
+        """
+        if event == 'output' and self._listener is None:
+            return not self.closed
+        self._event_id += 1
+        message = f"id: {self._event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+        detached_since = None
+        while not self.closed:
+            try:
+                self.outbox.put(message, timeout=1)
+                return True
+            except queue.Full:
+                if self._listener is not None:
+                    detached_since = None
+                    continue
+                if detached_since is None:
+                    detached_since = time.monotonic()
+                elif time.monotonic() - detached_since > self.detached_timeout:
+                    return False
+        return False
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Terminal CLI
+The interactive prompt_toolkit front end for TerminalBackend.
+"""
+
+import getpass
+import os
+import sys
+from typing import Iterator, Optional
+
+from colorama import init, Fore
+from prompt_toolkit import PromptSession
+from prompt_toolkit.auto_suggest import AutoSuggestFromHistory, Suggestion
+from prompt_toolkit.completion import Completer, Completion
+from prompt_toolkit.history import History
+
+from completion import CompletionEngine
+from history_store import HistoryStore, default_history_path
+from pty_session import interact
+from terminal import TerminalBackend
+
+
+class PromptCompleter(Completer):
+    """prompt_toolkit completer backed by a CompletionEngine.
+
+    Run it with ``complete_in_thread=True`` so a slow directory listing
+    never holds up typing.
+    """
+
+    def __init__(self, engine: CompletionEngine):
+        self.engine = engine
+
+    def get_completions(self, document, complete_event):
+        text = document.text_before_cursor
+        start, candidates = self.engine.complete(text)
+        for candidate in candidates:
+            yield Completion(candidate.text, start_position=start - len(text),
+                             display=candidate.display, display_meta=candidate.kind)
+
+
+class PromptHistory(History):
+    """prompt_toolkit history read from a HistoryStore.
+
+    Commands are recorded by the terminal when they run, so strings the
+    prompt accepts are not stored a second time here.
+    """
+
+    def __init__(self, store: HistoryStore, size: int = 10000):
+        super().__init__()
+        self.store = store
+        self.size = size
+
+    def load_history_strings(self) -> Iterator[str]:
+        for _, command in self.store.page(limit=self.size):
+            yield command
+
+    def store_string(self, string: str):
+        pass
+
+
+class StoreAutoSuggest(AutoSuggestFromHistory):
+    """Suggest the most recent command that starts with the typed line, using the prefix index."""
+
+    def __init__(self, store: HistoryStore):
+        super().__init__()
+        self.store = store
+
+    def get_suggestion(self, buffer, document) -> Optional[Suggestion]:
+        text = document.text.rsplit('\n', 1)[-1]
+        if text.strip():
+            for command in self.store.prefix(text, 2):
+                if command != text:
+                    return Suggestion(command[len(text):])
+        return None
+
+
+def run(terminal: TerminalBackend):
+    """Read and run commands at an interactive prompt until the user exits."""
+    terminal.interactive = True
+    print(f"{Fore.CYAN}Welcome to Advanced Python Terminal!{Fore.RESET}")
+    print(f"{Fore.YELLOW}Type 'help' for available commands or 'exit' to quit.{Fore.RESET}")
+    print(f"{Fore.GREEN}AI-powered natural language interpretation is available!{Fore.RESET}")
+    print()
+
+    session = PromptSession(history=PromptHistory(terminal.history))
+    # Completions are computed in a thread so slow filesystems never block typing
+    completer = PromptCompleter(terminal.completer)
+    auto_suggest = StoreAutoSuggest(terminal.history)
+
+    while True:
+        try:
+            # Get user input with auto-completion and history
+            user_input = session.prompt(
+                terminal.get_prompt(),
+                completer=completer,
+                complete_in_thread=True,
+                auto_suggest=auto_suggest,
+                complete_while_typing=True
+            )
+
+            # Check for AI interpretation
+            if user_input.startswith('ai '):
+                query = user_input[3:].strip()
+                if query:
+                    try:
+                        interpreted_command = terminal.interpret_natural_language(query)
+                    except RuntimeError as e:
+                        print(f"{Fore.RED}{e}{Fore.RESET}")
+                        continue
+                    print(f"{Fore.MAGENTA}AI interpreted: {interpreted_command}{Fore.RESET}")
+                    user_input = interpreted_command
+
+            # Full-screen programs take over the real terminal
+            pty_argv = terminal.needs_pty(user_input) if sys.stdin.isatty() else None
+            if pty_argv:
+                size = os.get_terminal_size()
+                try:
+                    pty_id, pty_session = terminal.open_pty(user_input, pty_argv, size.lines, size.columns)
+                except FileNotFoundError:
+                    print(terminal.command_not_found(pty_argv[0]))
+                    continue
+                try:
+                    interact(pty_session)
+                finally:
+                    terminal.close_pty(pty_id)
+                continue
+
+            # Execute command, printing output as it arrives
+            stream = terminal.stream_command(user_input)
+            last_chunk = ''
+            try:
+                for chunk in stream:
+                    sys.stdout.write(chunk)
+                    sys.stdout.flush()
+                    last_chunk = chunk
+            finally:
+                stream.close()
+
+            if last_chunk and not last_chunk.endswith('\n'):
+                print()
+
+            exit_code = stream.exit_code
+
+            # Handle special exit code
+            if exit_code == -1:
+                break
+
+            # Show error for non-zero exit codes
+            if exit_code != 0 and not last_chunk:
+                print(f"{Fore.RED}Command failed with exit code {exit_code}{Fore.RESET}")
+
+        except KeyboardInterrupt:
+            print(f"\n{Fore.YELLOW}Use 'exit' to quit the terminal{Fore.RESET}")
+        except EOFError:
+            print(f"\n{Fore.YELLOW}Goodbye!{Fore.RESET}")
+            break
+        except Exception as e:
+            print(f"{Fore.RED}Unexpected error: {str(e)}{Fore.RESET}")
+
+
+def main():
+    """Start the CLI on the user's persistent history."""
+    init(autoreset=True)
+    terminal = TerminalBackend(HistoryStore(default_history_path(), getpass.getuser()))
+    try:
+        run(terminal)
+    finally:
+        terminal.close()
+        terminal.history.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Code Runner
+Runs editor snippets in pre-started, resource-limited Python processes and streams their output.
+"""
+
+import codecs
+import json
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, Generator, List, Optional
+
+from terminal import CommandStream
+
+# The program a worker runs: it starts, then waits on stdin for one job, so
+# the interpreter's startup is paid before the code arrives. Limits are set
+# only once the job is known, so the time spent waiting is not charged to it.
+WORKER_SOURCE = r'''
+import json, os, sys, traceback
+try:
+    import resource
+except ImportError:
+    resource = None
+line = sys.stdin.readline()
+if not line:
+    sys.exit(0)
+job = json.loads(line)
+sys.stdin.close()
+sys.stdin = open(os.devnull)
+os.chdir(job['cwd'])
+sys.path.insert(0, job['cwd'])
+if resource is not None:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = job['cpu'] + int(usage.ru_utime + usage.ru_stime + 1)
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (job['memory'], job['memory']))
+    except (ValueError, OSError):
+        # Not every platform can limit the address space
+        pass
+source, namespace = job['code'], {'__name__': '__main__', '__builtins__': __builtins__}
+del job, line
+try:
+    exec(compile(source, '<editor>', 'exec'), namespace)
+except SystemExit:
+    raise
+except BaseException as e:
+    # Leave this program's frame out of the traceback
+    traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+    sys.exit(1)
+'''
+
+
+class CodeRunner:
+    """Runs Python snippets, each in a fresh process taken from a warm pool.
+
+    ``warm`` interpreters, one per slot unless told otherwise, are started
+    in the background by ``fill`` and kept waiting, so a snippet only pays
+    for sending itself over a pipe; making a runner starts nothing. Each
+    process runs one snippet and is then thrown away, and a replacement is
+    started in the background once the snippet has finished.
+    A snippet runs in the session's working directory with its CPU time
+    and address space limited, is killed after ``timeout`` seconds or
+    ``max_output`` bytes of output, and at most ``max_running`` run at once
+    (later ones wait up to ``queue_timeout`` seconds for a slot). stdout and
+    stderr are streamed together, as the terminal streams a command's.
+    """
+
+    # Interpreters kept started and waiting for a snippet; None keeps one per
+    # slot, so snippets arriving together all start warm
+    warm: Optional[int] = None
+    # Snippets run at once; they are CPU-bound, so one per core by default
+    max_running = os.cpu_count() or 4
+    # Seconds a snippet waits for a free slot before it is turned away
+    queue_timeout = 10.0
+    # CPU seconds a snippet may use
+    cpu_seconds = 10
+    # Bytes of address space a snippet may use
+    memory = 512 * 1024 * 1024
+    # Seconds a snippet may run, sleeping included
+    timeout = 30.0
+    # Bytes of output a snippet may print before it is killed
+    max_output = 1024 * 1024
+    # Bytes read from a worker's pipe at a time
+    chunk_size = 4096
+    # Chunks buffered between the pipe reader and the consumer
+    queue_size = 256
+
+    def __init__(self, warm: Optional[int] = None, max_running: Optional[int] = None,
+                 python: str = sys.executable):
+        if warm is not None:
+            self.warm = warm
+        if max_running is not None:
+            self.max_running = max_running
+        if self.warm is None:
+            self.warm = self.max_running
+        self.python = python
+        self._idle: List[subprocess.Popen] = []
+        self._starting = 0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_running)
+        self.warm_starts = 0
+        self.cold_starts = 0
+        self.rejected = 0
+
+    def run(self, code: str, cwd: str) -> CommandStream:
+        """Run code in cwd and return a stream of its output; exit_code is set at the end."""
+        return CommandStream(self._run(code, cwd))
+
+    def _run(self, code: str, cwd: str) -> Generator[str, None, int]:
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self.rejected += 1
+            yield f"All {self.max_running} code runners are busy; try again shortly"
+            return 1
+        try:
+            process = self._take()
+            try:
+                return (yield from self._stream(process, code, cwd))
+            finally:
+                self._kill(process)
+                if process.stdout is not None:
+                    process.stdout.close()
+        finally:
+            self._slots.release()
+            # Replacements start once the snippet is done, so they do not compete with it for the CPU
+            self.fill()
+
+    def _stream(self, process: subprocess.Popen, code: str, cwd: str) -> Generator[str, None, int]:
+        """Hand code to a worker and relay its output until it exits or breaks a limit."""
+        job = {'code': code, 'cwd': cwd, 'cpu': self.cpu_seconds, 'memory': self.memory}
+        try:
+            process.stdin.write((json.dumps(job) + '\n').encode())
+            process.stdin.close()
+        except OSError:
+            yield "The code runner exited before it could start"
+            return 1
+
+        chunks = queue.Queue(maxsize=self.queue_size)
+        reader = threading.Thread(target=self._pump, args=(process.stdout, chunks), daemon=True)
+        reader.start()
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        deadline = time.monotonic() + self.timeout
+        output = 0
+        try:
+            while True:
+                try:
+                    data = chunks.get(timeout=min(max(deadline - time.monotonic(), 0), 0.5))
+                except queue.Empty:
+                    if time.monotonic() < deadline:
+                        # Processes the snippet left behind keep the pipe open after it exits
+                        if process.poll() is not None:
+                            self._kill(process)
+                        continue
+                    self._kill(process)
+                    yield f"\nTimed out after {self.timeout:g} seconds"
+                    return 1
+                if data is None:
+                    break
+                output += len(data)
+                if output > self.max_output:
+                    self._kill(process)
+                    yield f"\nOutput limit of {self.max_output // 1024}KB exceeded"
+                    return 1
+                text = decoder.decode(data)
+                if text:
+                    yield text
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                yield tail
+            exit_code = process.wait()
+            if hasattr(signal, 'SIGXCPU') and exit_code in (-signal.SIGXCPU, -signal.SIGKILL):
+                yield f"\nCPU time limit of {self.cpu_seconds} seconds exceeded"
+            return exit_code
+        finally:
+            self._kill(process)
+            # Unblock the reader if it is waiting on a full queue
+            while reader.is_alive():
+                try:
+                    chunks.get_nowait()
+                except queue.Empty:
+                    reader.join(0.05)
+
+    def _pump(self, pipe, chunks: queue.Queue):
+        """Copy raw reads from a pipe into a queue, ending with None."""
+        try:
+            while True:
+                data = os.read(pipe.fileno(), self.chunk_size)
+                if not data:
+                    break
+                chunks.put(data)
+        except (OSError, ValueError):
+            pass
+        finally:
+            chunks.put(None)
+
+    def _take(self) -> subprocess.Popen:
+        """Return a waiting worker, or start one if none is ready."""
+        process = None
+        with self._lock:
+            while self._idle:
+                candidate = self._idle.pop()
+                if candidate.poll() is None:
+                    process = candidate
+                    break
+        if process is not None:
+            self.warm_starts += 1
+        else:
+            self.cold_starts += 1
+            process = self._spawn()
+        return process
+
+    def fill(self):
+        """Start workers in the background until ``warm`` are waiting or starting."""
+        with self._lock:
+            missing = self.warm - len(self._idle) - self._starting
+            self._starting += max(missing, 0)
+        for _ in range(missing):
+            threading.Thread(target=self._add_idle, daemon=True).start()
+
+    def _add_idle(self):
+        try:
+            process = self._spawn()
+        except OSError:
+            process = None
+        with self._lock:
+            self._starting -= 1
+            if process is not None:
+                self._idle.append(process)
+
+    def _spawn(self) -> subprocess.Popen:
+        """Start a worker; -I keeps the environment and user site-packages from changing it."""
+        return subprocess.Popen(
+            [self.python, '-I', '-u', '-X', 'utf8', '-c', WORKER_SOURCE],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            # Its own process group, so whatever the snippet starts dies with it
+            start_new_session=os.name != 'nt'
+        )
+
+    def _kill(self, process: subprocess.Popen):
+        """Kill a worker and everything it started, which may outlive it."""
+        try:
+            if os.name != 'nt':
+                os.killpg(process.pid, signal.SIGKILL)
+            elif process.poll() is None:
+                process.kill()
+        except OSError:
+            pass
+        process.wait()
+
+    def stats(self) -> Dict[str, int]:
+        """Return snippets started on a warm worker, on a cold one, and turned away."""
+        return {'warm_starts': self.warm_starts, 'cold_starts': self.cold_starts, 'rejected': self.rejected,
+                'idle': len(self._idle)}
+
+    def close(self):
+        """Stop the waiting workers."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self.warm = 0
+        for process in idle:
+            self._kill(process)
+            process.stdout.close()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Command Registry
+Describes builtin commands once per class, with the metadata dispatch, help and completion are generated from.
+"""
+
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Help sections, in the order help lists them
+SECTIONS = ('File Operations', 'System Information', 'Jobs', 'Terminal')
+# Entry point group third-party packages register commands under
+PLUGIN_GROUP = 'terminal.commands'
+
+
+class Builtin:
+    """One builtin command.
+
+    ``run(terminal, args)`` returns (output, exit_code); ``stream(terminal,
+    args, stdin)``, when present, is a generator yielding output as it is
+    produced and returning the exit code. ``completion`` says what the
+    command's arguments complete to: 'paths', 'directories', 'commands',
+    'jobs' or 'none'. A ``pure`` command changes neither the session nor
+    the filesystem, so it is safe to run concurrently or repeat.
+    """
+
+    def __init__(self, names: Sequence[str], run: Callable, section: str = 'Terminal', help: str = '',
+                 synopsis: Optional[str] = None, completion: str = 'paths', pure: bool = False,
+                 stream: Optional[Callable] = None):
+        self.names = tuple(names)
+        self.run = run
+        self.stream = stream
+        self.section = section
+        self.help = help
+        self.synopsis = synopsis or ', '.join(self.names)
+        self.completion = completion
+        self.pure = pure
+
+    @property
+    def name(self) -> str:
+        return self.names[0]
+
+    def __repr__(self) -> str:
+        return f"Builtin({self.name!r}, section={self.section!r}, streams={self.stream is not None})"
+
+
+def builtin(*names: str, section: str = 'Terminal', help: str = '', synopsis: Optional[str] = None,
+            completion: str = 'paths', pure: bool = False):
+    """Mark a function as a builtin command.
+
+    Methods of a terminal class are collected into its registry; a plain
+    function taking (terminal, args) can be published as a plugin.
+    """
+    def decorate(func: Callable) -> Callable:
+        func._builtin = dict(names=names or (func.__name__.replace('cmd_', '', 1),), section=section,
+                             help=help, synopsis=synopsis, completion=completion, pure=pure)
+        return func
+    return decorate
+
+
+def streams(name: str):
+    """Mark a function as the streaming form of the builtin called name."""
+    def decorate(func: Callable) -> Callable:
+        func._streams = name
+        return func
+    return decorate
+
+
+class CommandRegistry:
+    """Builtin commands by name."""
+
+    def __init__(self):
+        self._commands: Dict[str, Builtin] = {}
+
+    def add(self, command: Builtin):
+        """Register a command under each of its names, replacing any earlier one."""
+        for name in command.names:
+            self._commands[name] = command
+
+    def get(self, name: str) -> Optional[Builtin]:
+        return self._commands.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._commands
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._commands)
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+    def commands(self) -> List[Builtin]:
+        """Return each command once, in registration order."""
+        return list(dict.fromkeys(self._commands.values()))
+
+    @classmethod
+    def from_class(cls, owner: type) -> 'CommandRegistry':
+        """Collect the @builtin and @streams methods of a class and its bases."""
+        registry = cls()
+        streaming: Dict[str, Callable] = {}
+        for klass in reversed(owner.__mro__):
+            for attribute, func in vars(klass).items():
+                # A subclass may override a command's method without repeating its decorator
+                spec = getattr(func, '_builtin', None)
+                if spec is not None:
+                    registry.add(Builtin(run=getattr(owner, attribute), **spec))
+                if getattr(func, '_streams', None):
+                    streaming[func._streams] = getattr(owner, attribute)
+        for name, func in streaming.items():
+            command = registry.get(name)
+            if command is not None:
+                command.stream = func
+        return registry
+
+    def load_plugins(self, group: str = PLUGIN_GROUP):
+        """Add the commands installed packages publish as entry points.
+
+        An entry point names either a Builtin or a function marked with
+        @builtin. A plugin that fails to load is skipped with a warning.
+        """
+        try:
+            from importlib.metadata import entry_points
+            found = entry_points(group=group)
+        except Exception:
+            return
+        for entry_point in found:
+            try:
+                plugin = entry_point.load()
+                if not isinstance(plugin, Builtin):
+                    plugin = Builtin(run=plugin, **plugin._builtin)
+            except Exception as e:
+                print(f"Warning: command plugin {entry_point.name} not loaded: {e}")
+                continue
+            self.add(plugin)
+
+    def help_text(self, aliases: Dict[str, str], extra: Sequence[Tuple[str, str, str, Optional[str]]] = ()) -> str:
+        """Describe every command by section, in registration order.
+
+        extra adds (section, synopsis, help, before) lines for syntax, each
+        listed ahead of the command named before, or last if that is None
+        or not in the section.
+        """
+        lines = ["Available commands:"]
+        commands = self.commands()
+        sections = list(SECTIONS) + [command.section for command in commands if command.section not in SECTIONS]
+        for section in dict.fromkeys(sections):
+            listed = [command for command in commands if command.section == section]
+            names = {name for command in listed for name in command.names}
+            syntax = [line for line in extra if line[0] == section]
+            entries = []
+            for command in listed:
+                entries += [(synopsis, text) for _, synopsis, text, before in syntax if before in command.names]
+                entries.append((command.synopsis, command.help))
+            entries += [(synopsis, text) for _, synopsis, text, before in syntax if before not in names]
+            if not entries:
+                continue
+            lines.append(f"  {section}:")
+            lines.extend(f"    {synopsis:15s}- {text}" for synopsis, text in entries)
+            lines.append("  ")
+        lines.append("  Aliases:")
+        lines.extend(f"    {alias} = {expansion}" for alias, expansion in aliases.items())
+        return '\n'.join(lines)
+
+
+class Registry:
+    """Class attribute holding the class's CommandRegistry, built on first use.
+
+    Each subclass gets its own registry, so it can add or replace
+    commands with @builtin methods of its own. An instance keeps a
+    reference to its class's registry after the first access, so dispatch
+    is a plain attribute read.
+    """
+
+    def __set_name__(self, owner: type, name: str):
+        self.name = name
+        self.attribute = '_' + name
+
+    def __get__(self, instance, owner: type) -> CommandRegistry:
+        registry = owner.__dict__.get(self.attribute)
+        if registry is None:
+            registry = CommandRegistry.from_class(owner)
+            registry.load_plugins()
+            setattr(owner, self.attribute, registry)
+        if instance is not None:
+            instance.__dict__[self.name] = registry
+        return registry
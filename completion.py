@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Command Completion
+Completes command names from builtins, aliases and $PATH, and paths relative to a session's directory.
+"""
+
+import os
+from typing import List, NamedTuple, Optional, Tuple
+
+from executables import path_index
+from pipeline import PipelineSyntaxError, tokenize
+
+# Operators after which a new command starts
+COMMAND_SEPARATORS = ('|', '||', '&&', '&', ';')
+# Characters that must be escaped for a completed word to stay one word
+SPECIAL_CHARS = set(' \t\'"\\|&;<>')
+# Words that run the command after them, and how many arguments they take first
+COMMAND_PREFIXES = {'timeout': 1, 'pty': 0}
+
+
+class Candidate(NamedTuple):
+    """One completion: the text that replaces the word, what to show, and what it names."""
+    text: str
+    display: str
+    kind: str
+
+
+def quote_word(word: str) -> str:
+    """Escape a word so the command line parser reads it back unchanged."""
+    if not any(char in SPECIAL_CHARS for char in word):
+        return word
+    if os.name == 'nt':
+        return '"' + word + '"'
+    return ''.join('\\' + char if char in SPECIAL_CHARS else char for char in word)
+
+
+def current_word(text: str) -> Tuple[int, str]:
+    """Return where the word being typed at the end of text starts, and its unquoted value.
+
+    The word may be an unfinished quoted string, which the parser would
+    reject, so its boundaries are found here with the same quoting rules.
+    """
+    start = 0
+    quote = None
+    escapes = os.name != 'nt'
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if quote:
+            if char == quote:
+                quote = None
+            elif char == '\\' and quote == '"' and escapes:
+                i += 1
+        elif char == '\\' and escapes:
+            i += 1
+        elif char in '\'"':
+            quote = char
+        elif char.isspace() or char in '|&;<>':
+            start = i + 1
+        i += 1
+
+    raw = text[start:]
+    try:
+        words = [value for kind, value in tokenize(raw + (quote or ''))]
+    except PipelineSyntaxError:
+        words = []
+    return start, words[0] if words else ''
+
+
+class CompletionEngine:
+    """Completes the word before the cursor in one terminal's command line.
+
+    A word in command position completes to builtins, aliases and programs
+    on $PATH. A builtin's arguments complete to whatever its registry entry
+    names (directories for cd, job specs for fg); any other word, and a
+    command typed as a path, completes to files relative to the terminal's
+    current directory.
+    """
+
+    # Most completions returned for one word
+    max_results = 200
+
+    def __init__(self, terminal):
+        self.terminal = terminal
+
+    def complete(self, line: str, cursor: Optional[int] = None) -> Tuple[int, List[Candidate]]:
+        """Return the offset of the word being completed and its candidates."""
+        text = line if cursor is None else line[:cursor]
+        start, word = current_word(text)
+        try:
+            tokens = tokenize(text[:start])
+        except PipelineSyntaxError:
+            return start, []
+
+        command_position = True
+        command = None
+        skip = 0
+        for kind, value in tokens:
+            if kind == 'op':
+                command_position = value in COMMAND_SEPARATORS
+                if command_position:
+                    command = None
+            elif skip:
+                skip -= 1
+            elif command_position:
+                command = value
+                command_position = value in COMMAND_PREFIXES
+                skip = COMMAND_PREFIXES.get(value, 0)
+
+        if command_position and skip == 0:
+            spec = 'commands'
+        else:
+            # A builtin says what its arguments are; anything else gets paths
+            if command in self.terminal.aliases:
+                command = self.terminal.aliases[command].split()[0]
+            builtin = self.terminal.commands.get(command) if command else None
+            spec = builtin.completion if builtin is not None else 'paths'
+
+        if spec == 'commands' and '/' not in word and os.sep not in word:
+            candidates = self._commands(word)
+        elif spec == 'jobs':
+            candidates = self._jobs(word)
+        elif spec == 'none':
+            candidates = []
+        else:
+            candidates = self._paths(word, directories_only=spec == 'directories')
+        return start, candidates[:self.max_results]
+
+    def _commands(self, word: str) -> List[Candidate]:
+        """Builtins, aliases and $PATH programs starting with word."""
+        seen = set()
+        candidates = []
+        for kind, names in (('builtin', sorted(self.terminal.commands)),
+                            ('alias', sorted(self.terminal.aliases)),
+                            ('command', path_index.complete(word))):
+            for name in names:
+                if name.startswith(word) and name not in seen:
+                    seen.add(name)
+                    candidates.append(Candidate(quote_word(name), name, kind))
+        return candidates
+
+    def _jobs(self, word: str) -> List[Candidate]:
+        """Background job specs (%N) starting with word."""
+        return [Candidate(f"%{job.id}", f"%{job.id}  {job.command}", 'job')
+                for job in self.terminal.jobs.list() if f"%{job.id}".startswith(word or '%')]
+
+    def _paths(self, word: str, directories_only: bool = False) -> List[Candidate]:
+        """Files and directories whose path starts with word."""
+        head, tail = os.path.split(word)
+        if head and not head.endswith(('/', os.sep)):
+            head += '/'
+        directory = self.terminal.resolve_path(head) if head else self.terminal.current_dir
+        candidates = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if not name.startswith(tail) or (name.startswith('.') and not tail.startswith('.')):
+                        continue
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if directories_only and not is_dir:
+                        continue
+                    display = name + '/' if is_dir else name
+                    candidates.append(Candidate(quote_word(head + display), display, 'directory' if is_dir else 'file'))
+                    if len(candidates) >= self.max_results:
+                        break
+        except OSError:
+            return []
+        candidates.sort(key=lambda candidate: candidate.display)
+        return candidates
+
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Executable Lookup
+Resolves command names against $PATH from a shared, self-invalidating index, with per-session hash tables and "did you mean" suggestions.
+"""
+
+import bisect
+import os
+import stat
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class ExecutableIndex:
+    """The programs on $PATH, by name.
+
+    Each directory is listed once and kept with its modification time;
+    a check, at most every ``check_interval`` seconds, stats the
+    directories and lists again only those that changed (a program was
+    installed or removed) or that $PATH newly mentions.
+    """
+
+    # Seconds between checks of the $PATH directories' modification times
+    check_interval = 1.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._path: Optional[str] = None
+        self._dirs: Dict[str, Tuple[int, Dict[str, str]]] = {}
+        self._paths: Dict[str, str] = {}
+        self._names: List[str] = []
+        self._checked = 0.0
+        self._deletes: Optional[Dict[str, List[str]]] = None
+
+    def names(self) -> List[str]:
+        """Return every program name on $PATH, sorted."""
+        with self._lock:
+            self._check()
+            return self._names
+
+    def which(self, name: str) -> Optional[str]:
+        """Return the absolute path $PATH gives for name, or None."""
+        with self._lock:
+            self._check()
+            return self._paths.get(name)
+
+    def complete(self, prefix: str) -> List[str]:
+        """Return the program names starting with prefix."""
+        names = self.names()
+        start = bisect.bisect_left(names, prefix)
+        end = bisect.bisect_left(names, prefix + '\U0010ffff', start)
+        return names[start:end]
+
+    def suggest(self, name: str, extra: Iterable[str] = (), limit: int = 3) -> List[str]:
+        """Return up to limit known names within a couple of typos of name, closest first.
+
+        Program names are looked up in an index of every name with one
+        character deleted, so only names that share such a variant with
+        name are compared in full; extra names (builtins, aliases) are few
+        and are compared directly.
+        """
+        with self._lock:
+            self._check()
+            if self._deletes is None:
+                self._deletes = {}
+                for known in self._names:
+                    for variant in deletions(known):
+                        self._deletes.setdefault(variant, []).append(known)
+            deletes = self._deletes
+
+        candidates: Set[str] = set(extra)
+        for variant in deletions(name):
+            candidates.update(deletes.get(variant, ()))
+        candidates.discard(name)
+        scored = []
+        for candidate in candidates:
+            distance = edit_distance(name, candidate)
+            if distance <= 2 and distance < len(name):
+                scored.append((distance, candidate))
+        return [candidate for _, candidate in sorted(scored)[:limit]]
+
+    def _check(self):
+        """Refresh the index if $PATH changed or the last check is stale; caller holds the lock."""
+        path = os.environ.get('PATH', '')
+        now = time.monotonic()
+        if path != self._path or now - self._checked >= self.check_interval:
+            self._refresh(path)
+            self._checked = now
+
+    def _refresh(self, path: str):
+        """Relist the $PATH directories whose modification time changed."""
+        changed = path != self._path
+        dirs: Dict[str, Tuple[int, Dict[str, str]]] = {}
+        for directory in path.split(os.pathsep):
+            if not directory or directory in dirs:
+                continue
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                continue
+            cached = self._dirs.get(directory)
+            if cached is None or cached[0] != mtime:
+                cached = (mtime, self._scan(directory))
+                changed = True
+            dirs[directory] = cached
+        changed = changed or dirs.keys() != self._dirs.keys()
+        self._dirs = dirs
+        self._path = path
+        if changed:
+            # Earlier directories win, as they do for the shell
+            paths: Dict[str, str] = {}
+            for directory, (_, files) in dirs.items():
+                for name, filename in files.items():
+                    paths.setdefault(name, os.path.join(directory, filename))
+            self._paths = paths
+            self._names = sorted(paths)
+            self._deletes = None
+
+    @staticmethod
+    def _scan(directory: str) -> Dict[str, str]:
+        """Map the command names in one directory to their file names."""
+        files = {}
+        if os.name == 'nt':
+            extensions = {ext.lower() for ext in os.environ.get('PATHEXT', '.COM;.EXE;.BAT;.CMD').split(';') if ext}
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if not entry.is_file():
+                            continue
+                        if os.name == 'nt':
+                            stem, ext = os.path.splitext(entry.name)
+                            if ext.lower() in extensions:
+                                files[entry.name] = entry.name
+                                files.setdefault(stem, entry.name)
+                        elif entry.stat().st_mode & (stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH):
+                            files[entry.name] = entry.name
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return files
+
+
+# Shared by every session
+path_index = ExecutableIndex()
+
+
+def deletions(word: str) -> List[str]:
+    """Return word and every string made by deleting one of its characters."""
+    return [word] + [word[:i] + word[i + 1:] for i in range(len(word))]
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Edits (insert, delete, substitute, swap neighbours) needed to turn a into b."""
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[len(b)]
+
+
+class CommandHash:
+    """A session's remembered command locations, like the shell's ``hash`` table.
+
+    Entries record the path a name resolved to and how often it was used.
+    Lookups go through the shared index, which notices a changed $PATH or
+    directory, so an entry follows a program that moved without
+    ``hash -r`` and starts counting again.
+    """
+
+    def __init__(self, index: ExecutableIndex = path_index):
+        self.index = index
+        self._entries: Dict[str, List] = {}
+
+    def lookup(self, name: str) -> Optional[str]:
+        """Return the absolute path for name, counting a hit, or None if it is not on $PATH."""
+        path = self.index.which(name)
+        if path is None:
+            self._entries.pop(name, None)
+            return None
+        entry = self._entries.get(name)
+        if entry is None or entry[0] != path:
+            entry = self._entries[name] = [path, 0]
+        entry[1] += 1
+        return path
+
+    def remember(self, name: str) -> Optional[str]:
+        """Resolve name and keep it without counting a hit."""
+        path = self.lookup(name)
+        if path is not None:
+            self._entries[name][1] -= 1
+        return path
+
+    def forget(self, name: Optional[str] = None) -> bool:
+        """Drop one remembered name, or all of them; return False if name was not remembered."""
+        if name is None:
+            self._entries.clear()
+            return True
+        return self._entries.pop(name, None) is not None
+
+    def entries(self) -> List[Tuple[str, str, int]]:
+        """Return (name, path, hits) for every remembered command, by name."""
+        return [(name, entry[0], entry[1]) for name, entry in sorted(self._entries.items())]
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+File Operations
+Parallel, cancellable copying, moving and removal of directory trees, with progress counters.
+"""
+
+import errno
+import os
+import shutil
+import stat
+import sys
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+# Errors from copy_file_range or sendfile meaning "not for these files", not a failed copy
+UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF, errno.ENOTSOCK}
+
+# Kinds of file cp will not copy; opening a FIFO blocks until something writes to it
+SPECIAL_FILES = (
+    (stat.S_ISFIFO, 'named pipe'),
+    (stat.S_ISSOCK, 'socket'),
+    (stat.S_ISCHR, 'character device'),
+    (stat.S_ISBLK, 'block device'),
+)
+
+# A unit of work for the pool; it returns the work it uncovered
+Task = Tuple[Callable, tuple]
+
+
+class OperationCancelled(Exception):
+    """Raised inside workers once their operation has been cancelled or has run out of time."""
+
+
+class FileOperation:
+    """Progress and cancellation for one cp, mv or rm.
+
+    Workers count files and bytes as they go and check ``cancelled``
+    between files and between chunks of a large file, so a cancelled
+    operation stops within one chunk. Errors are collected rather than
+    stopping the work, as cp and rm report each failure and carry on.
+    """
+
+    # Bytes copied per system call, and between cancellation checks
+    chunk_size = 8 * 1024 * 1024
+    # Directory entries handed to one worker task
+    batch_size = 256
+    # Error messages kept; later ones are only counted
+    max_errors = 100
+
+    def __init__(self, verb: str, workers: int = 8, timeout: Optional[float] = None, base: str = ''):
+        self.verb = verb
+        self.workers = workers
+        self.base = base
+        self.started = time.monotonic()
+        self.deadline = None if timeout is None else self.started + timeout
+        self.timeout = timeout
+        self.files = 0
+        self.bytes = 0
+        self.errors: List[str] = []
+        self.failures = 0
+        self.reason: Optional[str] = None
+        self.expired = False
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def cancelled(self) -> bool:
+        if not self._cancel.is_set() and self.deadline is not None and time.monotonic() > self.deadline:
+            self.expired = True
+            self.cancel(f"timed out after {self.timeout:g} seconds")
+        return self._cancel.is_set()
+
+    def cancel(self, reason: str = 'interrupted'):
+        """Ask the workers to stop; the first reason given is kept."""
+        with self._lock:
+            if self.reason is None:
+                self.reason = reason
+        self._cancel.set()
+
+    def check(self):
+        """Raise OperationCancelled if the operation should stop."""
+        if self.cancelled:
+            raise OperationCancelled(self.reason)
+
+    def count(self, files: int = 0, size: int = 0):
+        with self._lock:
+            self.files += files
+            self.bytes += size
+
+    def fail(self, action: str, path: str, error: OSError):
+        """Record that action (copy, remove) failed for path, shown relative to the session directory."""
+        if self.base and path.startswith(self.base.rstrip(os.sep) + os.sep):
+            path = os.path.relpath(path, self.base)
+        with self._lock:
+            self.failures += 1
+            if len(self.errors) < self.max_errors:
+                self.errors.append(f"cannot {action} '{path}': {error.strerror or error}")
+
+    def start(self, work: Callable[['FileOperation'], None]):
+        """Run work(self) on a thread of its own; wait() tells when it is done."""
+        def run():
+            try:
+                work(self)
+            except OperationCancelled:
+                pass
+            finally:
+                self._done.set()
+        self._thread = threading.Thread(target=run, daemon=True, name=f"{self.verb}-operation")
+        self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait up to timeout seconds for the operation to finish; return whether it has."""
+        return self._done.wait(timeout)
+
+    def progress(self) -> str:
+        """Describe how much has been done and how fast."""
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        text = f"{self.verb}: {self.files:,} files"
+        rates = f"{self.files / elapsed:,.0f} files/s"
+        if self.bytes:
+            text += f", {format_bytes(self.bytes)}"
+            rates += f", {format_bytes(self.bytes / elapsed)}/s"
+        return f"{text} in {elapsed:.1f}s ({rates})"
+
+    def run_tasks(self, tasks: List[Task]):
+        """Run tasks, and the tasks they return, on the worker pool until none are left.
+
+        Stops handing out work once the operation is cancelled, then
+        raises OperationCancelled after the running tasks have finished.
+        """
+        # concurrent.futures is slow to import and only needed once a file operation runs
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.verb) as pool:
+            pending = {pool.submit(func, *args) for func, args in tasks}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        found = future.result()
+                    except OperationCancelled:
+                        continue
+                    if found and not self.cancelled:
+                        pending.update(pool.submit(func, *args) for func, args in found)
+        self.check()
+
+
+def format_bytes(size: float) -> str:
+    """Format a byte count with a binary unit, as the progress line shows it."""
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if size < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}PB"
+
+
+def _copy_data(source: int, target: int, operation: FileOperation):
+    """Copy one open file to another in chunks, in the kernel where it can be done there.
+
+    copy_file_range lets the filesystem share or clone blocks; sendfile
+    still avoids copying through user space; plain reads and writes are the
+    last resort, for platforms and file pairs that support neither.
+    """
+    methods = []
+    if hasattr(os, 'copy_file_range'):
+        methods.append(lambda count: os.copy_file_range(source, target, count))
+    if hasattr(os, 'sendfile') and sys.platform.startswith('linux'):
+        methods.append(lambda count: os.sendfile(target, source, None, count))
+    chunk = operation.chunk_size
+    for method in methods:
+        try:
+            while True:
+                operation.check()
+                copied = method(chunk)
+                if not copied:
+                    return
+                operation.count(size=copied)
+        except OSError as e:
+            # Nothing is written by a call that fails this way, so the next method resumes at the same offset
+            if e.errno not in UNSUPPORTED:
+                raise
+    while True:
+        operation.check()
+        data = os.read(source, chunk)
+        if not data:
+            return
+        view = memoryview(data)
+        while view:
+            view = view[os.write(target, view):]
+        operation.count(size=len(data))
+
+
+def copy_file(source: str, target: str, operation: FileOperation):
+    """Copy one file's data, permission bits and timestamps, like shutil.copy2.
+
+    Raises OSError for a FIFO, socket or device rather than opening it.
+    """
+    mode = os.stat(source).st_mode
+    for test, kind in SPECIAL_FILES:
+        if test(mode):
+            raise OSError(f"is a {kind}")
+    reader = os.open(source, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        writer = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o666)
+        try:
+            _copy_data(reader, writer, operation)
+        finally:
+            os.close(writer)
+    finally:
+        os.close(reader)
+    shutil.copystat(source, target)
+    operation.count(files=1)
+
+
+def copy_tree(source: str, target: str, operation: FileOperation):
+    """Copy a directory tree, keeping symbolic links as links, as ``cp -r`` does.
+
+    Every directory is listed by one task; the files it holds are copied by
+    further tasks in batches, so a single huge directory is spread across
+    the pool too. Directory timestamps are copied last, once nothing more
+    is written into them.
+    """
+    directories: List[Tuple[str, str]] = []
+    lock = threading.Lock()
+
+    def copy_batch(entries: List[Tuple[str, str]]):
+        for entry_source, entry_target in entries:
+            operation.check()
+            try:
+                copy_file(entry_source, entry_target, operation)
+            except OperationCancelled:
+                raise
+            except OSError as e:
+                operation.fail('copy', entry_source, e)
+
+    def visit(directory: str, destination: str) -> List[Task]:
+        operation.check()
+        try:
+            os.makedirs(destination, exist_ok=True)
+            with lock:
+                directories.append((directory, destination))
+            with os.scandir(directory) as entries:
+                listing = list(entries)
+        except OSError as e:
+            operation.fail('copy', directory, e)
+            return []
+        tasks: List[Task] = []
+        batch: List[Tuple[str, str]] = []
+        for entry in listing:
+            entry_target = os.path.join(destination, entry.name)
+            try:
+                if entry.is_symlink():
+                    os.symlink(os.readlink(entry.path), entry_target)
+                    operation.count(files=1)
+                elif entry.is_dir():
+                    tasks.append((visit, (entry.path, entry_target)))
+                else:
+                    batch.append((entry.path, entry_target))
+                    if len(batch) >= operation.batch_size:
+                        tasks.append((copy_batch, (batch,)))
+                        batch = []
+            except OSError as e:
+                operation.fail('copy', entry.path, e)
+        if batch:
+            tasks.append((copy_batch, (batch,)))
+        return tasks
+
+    operation.run_tasks([(visit, (source, target))])
+    for directory, destination in reversed(directories):
+        try:
+            shutil.copystat(directory, destination)
+        except OSError:
+            pass
+
+
+def remove_tree(path: str, operation: FileOperation):
+    """Remove a directory tree, like ``rm -r``.
+
+    Directories are listed and their files unlinked in parallel; the
+    emptied directories are then removed deepest first, one level at a
+    time, each level in parallel.
+    """
+    levels: List[List[str]] = []
+    lock = threading.Lock()
+
+    def unlink_batch(paths: List[str]):
+        for entry_path in paths:
+            operation.check()
+            try:
+                os.unlink(entry_path)
+                operation.count(files=1)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                operation.fail('remove', entry_path, e)
+
+    def visit(directory: str, depth: int) -> List[Task]:
+        operation.check()
+        with lock:
+            while len(levels) <= depth:
+                levels.append([])
+            levels[depth].append(directory)
+        try:
+            with os.scandir(directory) as entries:
+                listing = list(entries)
+        except OSError as e:
+            operation.fail('remove', directory, e)
+            return []
+        tasks: List[Task] = []
+        batch: List[str] = []
+        for entry in listing:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    tasks.append((visit, (entry.path, depth + 1)))
+                    continue
+            except OSError:
+                pass
+            batch.append(entry.path)
+            if len(batch) >= operation.batch_size:
+                tasks.append((unlink_batch, (batch,)))
+                batch = []
+        if batch:
+            tasks.append((unlink_batch, (batch,)))
+        return tasks
+
+    def remove_directory(directory: str):
+        operation.check()
+        try:
+            os.rmdir(directory)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            # A failure below already explains why a parent is not empty
+            if e.errno != errno.ENOTEMPTY or not operation.failures:
+                operation.fail('remove', directory, e)
+
+    operation.run_tasks([(visit, (path, 0))])
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=operation.workers, thread_name_prefix=operation.verb) as pool:
+        for level in reversed(levels):
+            list(pool.map(remove_directory, level))
+            operation.check()
+
+
+def move(source: str, target: str, operation: FileOperation):
+    """Move source to target, renaming when both are on one filesystem.
+
+    Across filesystems the source is copied and then removed, so it keeps
+    progress and cancellation; a cancelled move leaves the source intact.
+    """
+    try:
+        os.rename(source, target)
+        operation.count(files=1)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    if os.path.islink(source):
+        os.symlink(os.readlink(source), target)
+        os.unlink(source)
+        operation.count(files=1)
+    elif os.path.isdir(source):
+        copy_tree(source, target, operation)
+        if operation.failures:
+            return
+        # Each file was counted as it was copied
+        files = operation.files
+        remove_tree(source, operation)
+        operation.files = files
+    else:
+        copy_file(source, target, operation)
+        os.unlink(source)
+
+
+def is_directory(path: str) -> bool:
+    """Whether path is a directory itself, not a link to one."""
+    try:
+        return stat.S_ISDIR(os.lstat(path).st_mode)
+    except OSError:
+        return False
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+File View
+Memory-mapped, slice-at-a-time access to files of any size for cat and the web viewer.
+"""
+
+import mmap
+import os
+import stat
+from typing import Iterator, Optional, Tuple
+
+
+class FileView:
+    """Read-only memory-mapped view of a file.
+
+    Only the slices that are actually read are copied out of the mapping,
+    so looking at the end or a small range of a huge file costs no more
+    than reading that range. Files that cannot be mapped (pseudo-files in
+    /proc and /sys, which report no size, pipes and devices) are read into
+    memory instead, up to ``max_read`` bytes.
+    """
+
+    # Bytes inspected when deciding whether a file is binary
+    binary_sample_size = 8192
+    # Bytes read at a time from a file that cannot be mapped
+    read_chunk_size = 65536
+    # Bytes kept from a file that cannot be mapped; a device may never end
+    max_read = 64 * 1024 * 1024
+
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+        try:
+            info = os.fstat(self._file.fileno())
+            self._map = None
+            if stat.S_ISREG(info.st_mode) and info.st_size:
+                try:
+                    self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                except (OSError, ValueError):
+                    pass
+            if self._map is None:
+                self._map = self._read_all()
+            self.size = len(self._map)
+        except Exception:
+            self._file.close()
+            raise
+
+    def _read_all(self) -> bytes:
+        """Read the file in chunks, stopping at its end or ``max_read`` bytes."""
+        chunks = []
+        remaining = self.max_read
+        while remaining > 0:
+            data = self._file.read(min(self.read_chunk_size, remaining))
+            if not data:
+                break
+            chunks.append(data)
+            remaining -= len(data)
+        return b''.join(chunks)
+
+    def __enter__(self) -> 'FileView':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Unmap and close the file."""
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def is_binary(self) -> bool:
+        """Guess whether the file is binary from a NUL byte near its start."""
+        return self._map.find(b'\0', 0, self.binary_sample_size) != -1
+
+    def head_offset(self, lines: int) -> int:
+        """Return the offset just past the first lines lines."""
+        position = 0
+        for _ in range(lines):
+            newline = self._map.find(b'\n', position)
+            if newline == -1:
+                return self.size
+            position = newline + 1
+        return position
+
+    def tail_offset(self, lines: int) -> int:
+        """Return the offset where the last lines lines begin."""
+        if lines <= 0:
+            return self.size
+        position = self.size
+        # A trailing newline ends the last line rather than starting a new one
+        if self._map[position - 1:position] == b'\n':
+            position -= 1
+        for _ in range(lines):
+            newline = self._map.rfind(b'\n', 0, position)
+            if newline == -1:
+                return 0
+            position = newline
+        return position + 1
+
+    def read(self, start: int, length: int) -> bytes:
+        """Return up to length bytes starting at start."""
+        start = max(0, min(start, self.size))
+        return self._map[start:min(self.size, start + length)]
+
+    def read_text(self, start: int, length: int) -> Tuple[str, int]:
+        """Decode up to length bytes from start and return (text, next offset).
+
+        The slice is shortened so it never ends inside a UTF-8 character,
+        which lets a viewer fetch consecutive pages without garbling text.
+        """
+        data = self.read(start, length)
+        end = len(data)
+        if start + end < self.size:
+            # Find the last lead byte and drop its character if it is incomplete
+            lead = end - 1
+            while lead > 0 and end - lead < 4 and (data[lead] & 0xC0) == 0x80:
+                lead -= 1
+            if end > 0 and data[lead] >= 0xC0:
+                needed = 2 if data[lead] < 0xE0 else 3 if data[lead] < 0xF0 else 4
+                # Keep a lone partial character so callers always make progress
+                if end - lead < needed and lead > 0:
+                    end = lead
+        return data[:end].decode('utf-8', errors='replace'), max(0, min(start, self.size)) + end
+
+    def chunks(self, start: int = 0, end: Optional[int] = None, chunk_size: int = 65536) -> Iterator[bytes]:
+        """Yield the bytes in [start, end) as slices of at most chunk_size."""
+        end = self.size if end is None else min(end, self.size)
+        position = max(0, start)
+        while position < end:
+            length = min(chunk_size, end - position)
+            yield self.read(position, length)
+            position += length
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Git Status
+The branch and change counts of the repository a directory is in, cached per repository and shared by sessions.
+"""
+
+import os
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+
+def find_repository(path: str) -> Optional[Tuple[str, str]]:
+    """Return the work tree root and git directory of the repository path is in, or None."""
+    path = os.path.abspath(path)
+    while True:
+        dot_git = os.path.join(path, '.git')
+        if os.path.isdir(dot_git):
+            return path, dot_git
+        if os.path.isfile(dot_git):
+            # A linked worktree or submodule: .git names the real git directory
+            try:
+                with open(dot_git, encoding='utf-8') as file:
+                    line = file.readline().strip()
+            except OSError:
+                line = ''
+            if line.startswith('gitdir:'):
+                return path, os.path.normpath(os.path.join(path, line[len('gitdir:'):].strip()))
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def parse_status(output: str) -> Dict[str, Any]:
+    """Count the changes in ``git status --porcelain=v2 --branch -z`` output.
+
+    A change that deletes a file counts as deleted, a file new to the index
+    as added, any other staged or unstaged change (including conflicts) as
+    modified, and files git does not track as untracked.
+    """
+    status = {'branch': None, 'modified': 0, 'added': 0, 'deleted': 0, 'untracked': 0, 'ahead': 0, 'behind': 0}
+    oid = None
+    records = iter(output.split('\0'))
+    for record in records:
+        if record.startswith('# branch.oid '):
+            oid = record[len('# branch.oid '):]
+        elif record.startswith('# branch.head '):
+            status['branch'] = record[len('# branch.head '):]
+        elif record.startswith('# branch.ab '):
+            ahead, behind = record[len('# branch.ab '):].split()
+            status['ahead'], status['behind'] = int(ahead), -int(behind)
+        elif record.startswith(('1 ', '2 ')):
+            xy = record[2:4]
+            if 'D' in xy:
+                status['deleted'] += 1
+            elif xy[0] == 'A':
+                status['added'] += 1
+            else:
+                status['modified'] += 1
+            if record[0] == '2':
+                # A rename or copy is followed by the path it came from
+                next(records, None)
+        elif record.startswith('u '):
+            status['modified'] += 1
+        elif record.startswith('? '):
+            status['untracked'] += 1
+    if status['branch'] == '(detached)' and oid and oid != '(initial)':
+        status['branch'] = oid[:7]
+    return status
+
+
+class GitStatusCache:
+    """Git status per repository, reused until the repository changes.
+
+    A status is keyed by the modification times of the repository's index
+    and HEAD, which git rewrites when files are staged, committed, checked
+    out or reset, so a poll that finds them unchanged costs a few stat
+    calls instead of a ``git status`` process. Polls for a repository whose
+    status is being worked out wait for that answer instead of starting
+    another. Failures are not cached.
+    """
+
+    # Repositories whose status is kept; the least recently polled is forgotten first
+    size = 256
+    # Seconds a status is reused even though its key is unchanged; editing a
+    # tracked file does not touch the index, so such edits show up this late
+    max_age = 30.0
+    # Seconds git status may run
+    timeout = 10.0
+
+    def __init__(self, size: Optional[int] = None, max_age: Optional[float] = None):
+        if size is not None:
+            self.size = size
+        if max_age is not None:
+            self.max_age = max_age
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._inflight: Dict[str, 'Future'] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.runs = 0
+        self.coalesced = 0
+
+    def status(self, path: str) -> Dict[str, Any]:
+        """Return the status of the repository path is in; 'repository' is None outside one."""
+        # concurrent.futures is slow to import and only needed once a repository is polled
+        from concurrent.futures import Future
+        found = find_repository(path)
+        if found is None:
+            return {'repository': None}
+        root, git_dir = found
+        key = self._key(git_dir)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(root)
+            if entry is not None and entry[0] == key and now - entry[1] < self.max_age:
+                self._entries.move_to_end(root)
+                self.hits += 1
+                return entry[2]
+            future = self._inflight.get(root)
+            owner = future is None
+            if owner:
+                self.runs += 1
+                future = self._inflight[root] = Future()
+            else:
+                self.coalesced += 1
+        if owner:
+            self._resolve(root, key, now, future)
+        return future.result()
+
+    def _resolve(self, root: str, key: Tuple[int, int], started: float, future: 'Future'):
+        """Run git status, cache a good answer, then release the waiting callers."""
+        try:
+            status = self._run(root)
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(root, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._inflight.pop(root, None)
+            if 'error' not in status:
+                # Keyed by the times read before git ran, so a change made meanwhile is noticed next poll
+                self._entries[root] = (key, started, status)
+                self._entries.move_to_end(root)
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+        future.set_result(status)
+
+    def _run(self, root: str) -> Dict[str, Any]:
+        """Work out the status of the repository at root with git."""
+        try:
+            # --no-optional-locks keeps git from refreshing the index, which would change the key
+            result = subprocess.run(
+                ['git', '--no-optional-locks', 'status', '--porcelain=v2', '--branch', '-z'],
+                cwd=root, capture_output=True, text=True, errors='replace', timeout=self.timeout
+            )
+        except FileNotFoundError:
+            return {'repository': root, 'error': 'git is not installed'}
+        except subprocess.TimeoutExpired:
+            return {'repository': root, 'error': f"git status took longer than {self.timeout:g}s"}
+        if result.returncode != 0:
+            return {'repository': root, 'error': result.stderr.strip() or f"git status exited with {result.returncode}"}
+        status = parse_status(result.stdout)
+        status['repository'] = root
+        return status
+
+    def _key(self, git_dir: str) -> Tuple[int, int]:
+        """Return the modification times of the index and HEAD, 0 for a missing one."""
+        times = []
+        for name in ('index', 'HEAD'):
+            try:
+                times.append(os.stat(os.path.join(git_dir, name)).st_mtime_ns)
+            except OSError:
+                times.append(0)
+        return times[0], times[1]
+
+    def stats(self) -> Dict[str, int]:
+        """Return polls answered from the cache, git runs and polls that shared another's run."""
+        return {'hits': self.hits, 'runs': self.runs, 'coalesced': self.coalesced, 'cached': len(self._entries)}
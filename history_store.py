@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+History Store
+Persistent, deduplicated command history with indexed prefix, substring and fuzzy search.
+"""
+
+import bisect
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user TEXT NOT NULL,
+    command TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_user ON entries (user, id);
+CREATE TABLE IF NOT EXISTS commands (
+    id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    command TEXT NOT NULL,
+    last_used INTEGER NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS commands_prefix ON commands (user, command, last_used);
+CREATE INDEX IF NOT EXISTS commands_recent ON commands (user, last_used);
+CREATE VIRTUAL TABLE IF NOT EXISTS commands_text USING fts5 (
+    command, content='commands', content_rowid='id', tokenize='trigram'
+);
+"""
+
+# Sorts after every other character, closing a prefix range
+PREFIX_END = '\U0010ffff'
+
+
+def default_history_path() -> str:
+    """Where the CLI keeps its history unless TERMINAL_HISTORY_FILE says otherwise."""
+    return os.environ.get('TERMINAL_HISTORY_FILE', os.path.expanduser('~/.terminal_history.db'))
+
+
+class HistoryStore:
+    """One user's command history in an SQLite database.
+
+    Every command is appended to a log used for paging, and also kept once
+    in a deduplicated table whose covering (user, command, last_used) index
+    answers prefix queries and whose trigram full-text index answers
+    substring queries. Writes are buffered and committed in batches, at most
+    ``flush_interval`` seconds after they are made. Pass ':memory:' as the
+    path for a history that is not kept.
+    """
+
+    # Commands buffered before they are written in one transaction
+    batch_size = 100
+    # Seconds a buffered command may wait before it is written
+    flush_interval = 1.0
+    # Index matches ranked by recency before falling back to a recency scan
+    scan_limit = 500
+    # Most recent distinct commands considered by fuzzy search
+    fuzzy_window = 50000
+
+    def __init__(self, path: str = ':memory:', user: str = 'default'):
+        self.path = path
+        self.user = user
+        self._lock = threading.RLock()
+        self._pending: List[Tuple[str, float]] = []
+        self._timer: Optional[threading.Timer] = None
+        self._window: Optional[Tuple[str, List[int], List[str]]] = None
+
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ':memory:':
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute('PRAGMA busy_timeout=5000')
+        self._db.executescript(SCHEMA)
+
+        row = self._db.execute(
+            'SELECT count(*), (SELECT command FROM entries WHERE user = ? ORDER BY id DESC LIMIT 1) '
+            'FROM entries WHERE user = ?', (user, user)
+        ).fetchone()
+        self._count, self._last = row
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, command: str):
+        """Record a command that was run, skipping an immediate repeat."""
+        if not command.strip():
+            return
+        with self._lock:
+            if command == self._last or self._db is None:
+                return
+            self._last = command
+            self._count += 1
+            self._pending.append((command, time.time()))
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Write buffered commands now."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        """Write buffered commands in one transaction; caller holds the lock."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending or self._db is None:
+            return
+        batch, self._pending = self._pending, []
+        db = self._db
+        # Take the write lock up front so concurrent writers cannot both add a command
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            for command, created in batch:
+                entry_id = db.execute(
+                    'INSERT INTO entries (user, command, created) VALUES (?, ?, ?)',
+                    (self.user, command, created)
+                ).lastrowid
+                updated = db.execute(
+                    'UPDATE commands SET last_used = ?, uses = uses + 1 WHERE user = ? AND command = ?',
+                    (entry_id, self.user, command)
+                ).rowcount
+                if not updated:
+                    command_id = db.execute(
+                        'INSERT INTO commands (user, command, last_used) VALUES (?, ?, ?)',
+                        (self.user, command, entry_id)
+                    ).lastrowid
+                    db.execute('INSERT INTO commands_text (rowid, command) VALUES (?, ?)', (command_id, command))
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        self._window = None
+
+    def _query(self, sql: str, params: tuple) -> List[tuple]:
+        """Run a read query after writing anything still buffered."""
+        with self._lock:
+            # A closed store (its session was evicted meanwhile) has nothing to find
+            if self._db is None:
+                return []
+            self._flush()
+            return self._db.execute(sql, params).fetchall()
+
+    def page(self, before: Optional[int] = None, limit: int = 100) -> List[Tuple[int, str]]:
+        """Return up to limit (id, command) entries older than before, newest first."""
+        if before is None:
+            return self._query(
+                'SELECT id, command FROM entries WHERE user = ? ORDER BY id DESC LIMIT ?',
+                (self.user, limit)
+            )
+        return self._query(
+            'SELECT id, command FROM entries WHERE user = ? AND id < ? ORDER BY id DESC LIMIT ?',
+            (self.user, before, limit)
+        )
+
+    def since(self, after: int, limit: int = 100) -> List[Tuple[int, str]]:
+        """Return up to limit (id, command) entries newer than after, oldest first.
+
+        Entry ids only ever grow, even across clear(), so a client can keep
+        the last id it has seen and ask for what followed.
+        """
+        return self._query(
+            'SELECT id, command FROM entries WHERE user = ? AND id > ? ORDER BY id LIMIT ?',
+            (self.user, after, limit)
+        )
+
+    def recent(self, count: int = 20) -> List[Tuple[int, str]]:
+        """Return the last count (id, command) entries, oldest first."""
+        return self.page(limit=count)[::-1]
+
+    def prefix(self, text: str, limit: int = 10) -> List[str]:
+        """Return distinct commands starting with text, most recently used first.
+
+        A rare prefix is answered from the command index and ranked in
+        Python; a common one is answered by walking commands from the most
+        recent, which finds matches almost immediately.
+        """
+        if not text:
+            return []
+        bounds = (self.user, text, text + PREFIX_END)
+        rows = self._query(
+            'SELECT command, last_used FROM commands WHERE user = ? AND command >= ? AND command < ? LIMIT ?',
+            bounds + (self.scan_limit + 1,)
+        )
+        if len(rows) <= self.scan_limit:
+            return [command for command, _ in sorted(rows, key=lambda row: -row[1])[:limit]]
+        return [command for command, in self._query(
+            'SELECT command FROM commands INDEXED BY commands_recent '
+            'WHERE user = ? AND command >= ? AND command < ? ORDER BY last_used DESC LIMIT ?',
+            bounds + (limit,)
+        )]
+
+    def substring(self, text: str, limit: int = 10) -> List[str]:
+        """Return distinct commands containing text (case-insensitive), most recently used first."""
+        if not text:
+            return []
+        if len(text) >= 3:
+            # The trigram index needs at least three characters
+            phrase = '"' + text.replace('"', '""') + '"'
+            rows = self._query(
+                # CROSS JOIN keeps the full-text index as the driving table
+                'SELECT c.command, c.last_used FROM commands_text CROSS JOIN commands c ON c.id = commands_text.rowid '
+                'WHERE commands_text MATCH ? AND c.user = ? LIMIT ?',
+                (phrase, self.user, self.scan_limit + 1)
+            )
+            if len(rows) <= self.scan_limit:
+                return [command for command, _ in sorted(rows, key=lambda row: -row[1])[:limit]]
+        pattern = '%' + text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        return [command for command, in self._query(
+            "SELECT command FROM commands INDEXED BY commands_recent "
+            "WHERE user = ? AND command LIKE ? ESCAPE '\\' ORDER BY last_used DESC LIMIT ?",
+            (self.user, pattern, limit)
+        )]
+
+    def fuzzy(self, text: str, limit: int = 10) -> List[str]:
+        """Return commands containing text's characters in order, best match first.
+
+        Matches with the tightest span win, then the most recently used. The
+        search covers the ``fuzzy_window`` most recent distinct commands,
+        joined into one string so a single regular-expression pass finds
+        every candidate.
+        """
+        if not text:
+            return []
+        joined, starts, commands = self._fuzzy_window()
+        pattern = re.compile('[^\n]*?'.join(map(re.escape, text)), re.IGNORECASE)
+        best = {}
+        for match in pattern.finditer(joined):
+            line = bisect.bisect_right(starts, match.start()) - 1
+            span = match.end() - match.start()
+            if line not in best or span < best[line]:
+                best[line] = span
+        ranked = sorted(best, key=lambda line: (best[line], line))
+        return [commands[line] for line in ranked[:limit]]
+
+    def _fuzzy_window(self) -> Tuple[str, List[int], List[str]]:
+        """Return the recent commands joined by newlines, with each line's offset."""
+        with self._lock:
+            if self._db is None:
+                return '', [], []
+            self._flush()
+            if self._window is None:
+                commands = [command for command, in self._db.execute(
+                    'SELECT command FROM commands WHERE user = ? ORDER BY last_used DESC LIMIT ?',
+                    (self.user, self.fuzzy_window)
+                )]
+                starts = []
+                position = 0
+                for command in commands:
+                    starts.append(position)
+                    position += len(command) + 1
+                self._window = ('\n'.join(command.replace('\n', ' ') for command in commands), starts, commands)
+            return self._window
+
+    def clear(self):
+        """Forget this user's history."""
+        with self._lock:
+            self._pending = []
+            self._flush()
+            db = self._db
+            if db is None:
+                return
+            db.execute('BEGIN IMMEDIATE')
+            db.execute(
+                "INSERT INTO commands_text (commands_text, rowid, command) "
+                "SELECT 'delete', id, command FROM commands WHERE user = ?", (self.user,)
+            )
+            db.execute('DELETE FROM commands WHERE user = ?', (self.user,))
+            db.execute('DELETE FROM entries WHERE user = ?', (self.user,))
+            db.execute('COMMIT')
+            self._count = 0
+            self._last = None
+            self._window = None
+
+    def close(self):
+        """Write buffered commands and close the database; later lookups find nothing."""
+        with self._lock:
+            self._flush()
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Natural Language Interpreter
+Turns 'ai ...' queries into commands through a pluggable model, with a shared cache and coalescing of identical queries.
+"""
+
+import os
+import shlex
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ThreadPoolExecutor
+
+SYSTEM_PROMPT = ("You are a terminal command interpreter. Convert natural language requests into appropriate "
+                 "terminal commands. Only respond with the command, no explanations.")
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS interpretations (
+    key TEXT PRIMARY KEY,
+    command TEXT NOT NULL,
+    created REAL NOT NULL
+);
+"""
+
+
+def normalize_query(query: str) -> str:
+    """Reduce a query to the form cached answers are keyed by.
+
+    Case, runs of whitespace and trailing punctuation do not change what
+    command a request means, so "List files." and "list  files" share one
+    answer.
+    """
+    return ' '.join(query.lower().split()).rstrip('.?! ')
+
+
+class Model:
+    """A backend that turns one natural-language request into one command.
+
+    Subclasses implement ``complete``; ``name`` keeps the answers of
+    different models apart in a shared cache.
+    """
+
+    name = 'model'
+
+    def available(self) -> bool:
+        """Whether the model can answer; an unavailable model is never called."""
+        return True
+
+    def answer_now(self, query: str) -> Optional[str]:
+        """Return a confident answer that costs next to nothing to compute, or None to call complete."""
+        return None
+
+    def complete(self, query: str, timeout: float) -> str:
+        """Return the command for query, raising if it cannot be answered within timeout seconds."""
+        raise NotImplementedError
+
+
+class OpenAIModel(Model):
+    """The OpenAI chat completions API; needs OPENAI_API_KEY.
+
+    openai is slow to import, so neither it nor the client is loaded
+    until the first interpretation is asked for.
+    """
+
+    def __init__(self, model: str = 'gpt-3.5-turbo'):
+        self.model = model
+        self.name = f"openai:{model}"
+        self._client = None
+        self._checked = False
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        return self.client is not None
+
+    @property
+    def client(self):
+        with self._lock:
+            if not self._checked:
+                self._checked = True
+                try:
+                    # You'll need to set OPENAI_API_KEY environment variable
+                    if os.getenv('OPENAI_API_KEY'):
+                        import openai
+                        self._client = openai.OpenAI(max_retries=1)
+                except Exception as e:
+                    print(f"Warning: OpenAI not available: {e}")
+            return self._client
+
+    def complete(self, query: str, timeout: float) -> str:
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": f"Convert this to a terminal command: {query}"}
+            ],
+            max_tokens=100,
+            temperature=0.1,
+            timeout=timeout
+        )
+        return response.choices[0].message.content.strip()
+
+
+class StubModel(Model):
+    """A local stand-in for a real model, for benchmarks and offline use.
+
+    Answers from responses (keyed by normalized query) and otherwise
+    echoes the query back, after sleeping ``latency`` seconds to mimic a
+    network round trip. ``calls`` counts the queries it answered.
+    """
+
+    name = 'stub'
+
+    def __init__(self, responses: Optional[Dict[str, str]] = None, latency: float = 0.0):
+        self.responses = {normalize_query(query): command for query, command in (responses or {}).items()}
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def complete(self, query: str, timeout: float) -> str:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self.responses.get(normalize_query(query), f"echo {shlex.quote(query)}")
+
+
+class FallbackModel(Model):
+    """Answers from a local model when it can, and asks a remote one otherwise."""
+
+    def __init__(self, local: Model, remote: Model):
+        self.local = local
+        self.remote = remote
+        self.name = f"{local.name}+{remote.name}"
+
+    def available(self) -> bool:
+        return self.local.available() or self.remote.available()
+
+    def answer_now(self, query: str) -> Optional[str]:
+        return self.local.answer_now(query)
+
+    def complete(self, query: str, timeout: float) -> str:
+        if self.remote.available():
+            return self.remote.complete(query, timeout)
+        try:
+            return self.local.complete(query, timeout)
+        except LookupError:
+            raise LookupError(f"no built-in command matches the request and {self.remote.name} is not available") from None
+
+
+class InterpretationCache:
+    """Recent interpretations by key, least recently used evicted first.
+
+    Entries expire ``ttl`` seconds after they were made. With a path, every
+    entry is also written to an SQLite database, so answers survive a
+    restart and are shared by processes using the same file.
+    """
+
+    def __init__(self, size: int = 1024, ttl: float = 86400.0, path: Optional[str] = None):
+        self.size = size
+        self.ttl = ttl
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA busy_timeout=5000')
+            self._db.executescript(CACHE_SCHEMA)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the live entry for key, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._db is not None:
+                entry = self._db.execute(
+                    'SELECT command, created FROM interpretations WHERE key = ?', (key,)
+                ).fetchone()
+                if entry is not None:
+                    self._remember(key, entry)
+            if entry is None:
+                return None
+            if now - entry[1] >= self.ttl:
+                self._entries.pop(key, None)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: str, command: str):
+        """Store command under key."""
+        entry = (command, time.time())
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO interpretations (key, command, created) VALUES (?, ?, ?)',
+                    (key,) + entry
+                )
+
+    def _remember(self, key: str, entry: tuple):
+        """Keep entry in memory, evicting the least recently used; caller holds the lock."""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Forget every entry."""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute('DELETE FROM interpretations')
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class Interpreter:
+    """Answers natural-language queries from a cache in front of a model.
+
+    A query the model can answer at once (see Model.answer_now) is
+    answered on the caller's thread. Otherwise a miss is sent to the model on a small shared thread pool, and
+    identical queries that arrive while it is in flight wait for the same
+    answer instead of calling the model again. ``submit`` returns a Future
+    so a caller can do other work meanwhile; ``interpret`` waits at most
+    ``timeout`` seconds. Failed answers are not cached.
+    """
+
+    # Seconds a caller waits for the model before giving up
+    timeout = 15.0
+    # Model calls allowed to run at once
+    workers = 4
+
+    def __init__(self, model: Optional[Model] = None, cache: Optional[InterpretationCache] = None):
+        self.model = model if model is not None else OpenAIModel()
+        self.cache = cache if cache is not None else InterpretationCache()
+        self._inflight: Dict[str, 'Future'] = {}
+        self._lock = threading.Lock()
+        self._pool: Optional['ThreadPoolExecutor'] = None
+        self.answered_now = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @property
+    def available(self) -> bool:
+        return self.model.available()
+
+    def submit(self, query: str) -> 'Future':
+        """Return a Future for the command query means."""
+        # concurrent.futures is slow to import and only needed once a query is made
+        from concurrent.futures import Future, ThreadPoolExecutor
+        command = self.model.answer_now(query)
+        if command is not None:
+            self.answered_now += 1
+            future = Future()
+            future.set_result(command)
+            return future
+        key = f"{self.model.name}\n{normalize_query(query)}"
+        command = self.cache.get(key)
+        with self._lock:
+            if command is not None:
+                self.hits += 1
+                future = Future()
+                future.set_result(command)
+                return future
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future
+            self.misses += 1
+            future = self._inflight[key] = Future()
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='interpreter')
+        self._pool.submit(self._resolve, key, query, future)
+        return future
+
+    def _resolve(self, key: str, query: str, future: 'Future'):
+        """Ask the model, cache a good answer, then release the waiting callers."""
+        try:
+            command = self.model.complete(query, self.timeout)
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            return
+        self.cache.put(key, command)
+        with self._lock:
+            self._inflight.pop(key, None)
+        future.set_result(command)
+
+    def interpret(self, query: str, timeout: Optional[float] = None) -> str:
+        """Return the command for query, waiting at most timeout seconds (default ``timeout``).
+
+        A late answer still reaches the cache, so asking again finds it.
+        """
+        from concurrent.futures import TimeoutError as FutureTimeout
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return self.submit(query).result(timeout)
+        except FutureTimeout:
+            raise TimeoutError(f"no answer within {timeout:g}s")
+
+    def stats(self) -> Dict[str, int]:
+        """Return immediate answers, cache hits, model calls and callers that shared another's call."""
+        return {'answered_now': self.answered_now, 'hits': self.hits, 'misses': self.misses, 'coalesced': self.coalesced, 'cached': len(self.cache)}
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+        self.cache.close()
+
+
+def default_interpreter() -> Interpreter:
+    """Build the interpreter the environment configures.
+
+    By default a request the local template matcher recognises is answered
+    offline and the rest go to OpenAI. TERMINAL_AI_MODEL picks the OpenAI
+    model, 'local' for the template matcher alone or 'stub' for the echoing
+    stand-in; TERMINAL_AI_CACHE_FILE keeps answers in a database;
+    TERMINAL_AI_CACHE_TTL and TERMINAL_AI_TIMEOUT are in seconds.
+    """
+    name = os.environ.get('TERMINAL_AI_MODEL', 'gpt-3.5-turbo')
+    from local_model import LocalModel
+    if name == 'stub':
+        model = StubModel()
+    elif name == 'local':
+        model = LocalModel()
+    else:
+        model = FallbackModel(LocalModel(), OpenAIModel(name))
+    cache = InterpretationCache(
+        ttl=float(os.environ.get('TERMINAL_AI_CACHE_TTL', 86400)),
+        path=os.environ.get('TERMINAL_AI_CACHE_FILE')
+    )
+    interpreter = Interpreter(model, cache)
+    interpreter.timeout = float(os.environ.get('TERMINAL_AI_TIMEOUT', Interpreter.timeout))
+    return interpreter
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Job Control
+Background jobs with bounded output buffers, watched by one shared reaper thread.
+"""
+
+import codecs
+import os
+import selectors
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+
+def exit_status(returncode: int) -> int:
+    """Return a process's exit code as a shell reports it: 128+N for one killed by signal N.
+
+    Popen reports a signal death as -N, and -1 is the terminal's exit request.
+    """
+    return 128 - returncode if returncode < 0 else returncode
+
+
+class RingBuffer:
+    """Keeps the most recent max_chars characters written to it.
+
+    Offsets count every character ever written, so a reader can follow the
+    output with read(offset) and learn how much it missed if the buffer
+    wrapped in between.
+    """
+
+    def __init__(self, max_chars: int = 256 * 1024):
+        self.max_chars = max_chars
+        self.start = 0
+        self.end = 0
+        self.closed = False
+        self._chunks: deque = deque()
+        self._cond = threading.Condition()
+
+    def write(self, text: str):
+        """Append text, dropping the oldest output beyond max_chars."""
+        if not text:
+            return
+        with self._cond:
+            self.end += len(text)
+            if len(text) > self.max_chars:
+                text = text[-self.max_chars:]
+                self._chunks.clear()
+                self.start = self.end - len(text)
+            self._chunks.append(text)
+            while self.end - self.start > self.max_chars:
+                overflow = self.end - self.start - self.max_chars
+                oldest = self._chunks[0]
+                if len(oldest) <= overflow:
+                    self._chunks.popleft()
+                    self.start += len(oldest)
+                else:
+                    self._chunks[0] = oldest[overflow:]
+                    self.start += overflow
+            self._cond.notify_all()
+
+    def read(self, offset: int = 0) -> Tuple[str, int]:
+        """Return the retained output from offset on and the offset to read from next."""
+        with self._cond:
+            text = ''.join(self._chunks)
+            return text[max(offset - self.start, 0):], self.end
+
+    def wait(self, offset: int, timeout: Optional[float] = None) -> bool:
+        """Wait until output past offset arrives or the buffer is closed."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.end > offset or self.closed, timeout)
+
+    def close(self):
+        """Mark the output as complete and wake any waiting readers."""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class Job:
+    """A pipeline running in the background.
+
+    Every stage writes its stdout and stderr into one pipe, which the
+    reaper drains into the job's ring buffer. The job is done once that pipe
+    reaches EOF and all of its processes have exited.
+    """
+
+    def __init__(self, job_id: int, command: str, processes: List[subprocess.Popen],
+                 output_fd: int, timeout: Optional[float] = None, buffer_size: int = 256 * 1024,
+                 resources: Optional[list] = None):
+        self.id = job_id
+        self.command = command
+        self.processes = processes
+        self.output_fd = output_fd
+        # Files and streams the stages read from, closed when the job ends
+        self.resources = resources or []
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.buffer = RingBuffer(buffer_size)
+        self.state = 'Running'
+        self.exit_code: Optional[int] = None
+        # Exit code of a builtin last stage, set by the thread that runs it
+        self.builtin_exit_code: Optional[int] = None
+        self.reported = False
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._output_open = True
+        self._done = threading.Event()
+
+    @property
+    def pids(self) -> List[int]:
+        return [process.pid for process in self.processes]
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the job to finish; return False if timeout passed first."""
+        return self._done.wait(timeout)
+
+    def signal(self, sig: int) -> bool:
+        """Send a signal to every live process in the job."""
+        sent = False
+        for process in self.processes:
+            if process.poll() is None:
+                try:
+                    process.send_signal(sig)
+                    sent = True
+                except (OSError, ValueError):
+                    pass
+        if sent and hasattr(signal, 'SIGSTOP'):
+            if sig in (signal.SIGSTOP, signal.SIGTSTP):
+                self.state = 'Stopped'
+            elif sig == signal.SIGCONT:
+                self.state = 'Running'
+        return sent
+
+    def kill(self, state: str = 'Killed'):
+        """Kill every process in the job."""
+        for process in self.processes:
+            if process.poll() is None:
+                try:
+                    process.kill()
+                except (OSError, ValueError):
+                    pass
+        self.state = state
+
+    def feed(self, data: bytes):
+        """Decode raw output into the ring buffer."""
+        self.buffer.write(self._decoder.decode(data))
+
+    def close_output(self):
+        """Record EOF on the job's output pipe."""
+        self.buffer.write(self._decoder.decode(b'', final=True))
+        self._output_open = False
+        try:
+            os.close(self.output_fd)
+        except OSError:
+            pass
+
+    def check(self, now: float) -> bool:
+        """Enforce the deadline and finish the job once it has ended; return True when done."""
+        if self.deadline is not None and now > self.deadline and self.state in ('Running', 'Stopped'):
+            self.kill(f'Timed out ({self.timeout:g}s)')
+        if self._output_open or any(process.poll() is None for process in self.processes):
+            return False
+        returncode = self.processes[-1].returncode if self.processes else self.builtin_exit_code or 0
+        self.exit_code = exit_status(returncode)
+        if self.state in ('Running', 'Stopped'):
+            if returncode < 0:
+                self.state = self._signal_state(-returncode)
+            else:
+                self.state = 'Done' if returncode == 0 else f'Exit {returncode}'
+        for resource in self.resources:
+            try:
+                resource.close()
+            except Exception:
+                pass
+        self.buffer.close()
+        self._done.set()
+        return True
+
+    @staticmethod
+    def _signal_state(signum: int) -> str:
+        """Describe a job that was ended by a signal, as a shell would ('Hangup', 'Killed', 'Terminated')."""
+        try:
+            description = signal.strsignal(signum)
+        except ValueError:
+            description = None
+        return description or f'Signal {signum}'
+
+
+class JobReaper:
+    """One thread that drains every job's output pipe and reaps finished jobs.
+
+    Output pipes are multiplexed with a selector, so any number of jobs in
+    any number of sessions share this thread. Only that thread touches the
+    selector: watch() queues a new job's pipe and wakes it through a pipe of
+    its own, so the job's output is read at once. Windows cannot select on
+    pipes, so there each job gets a small reader thread instead.
+    """
+
+    # Seconds between exit and deadline checks when no output arrives
+    poll_interval = 0.2
+    # Bytes read from a job's output pipe at a time
+    chunk_size = 65536
+
+    def __init__(self):
+        self._jobs = set()
+        self._pending: List[Job] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._selector = None
+        if os.name != 'nt':
+            self._selector = selectors.DefaultSelector()
+            self._wake_read, self._wake_write = os.pipe()
+            os.set_blocking(self._wake_read, False)
+            os.set_blocking(self._wake_write, False)
+            self._selector.register(self._wake_read, selectors.EVENT_READ, None)
+
+    def watch(self, job: Job):
+        """Start draining and reaping a job."""
+        with self._lock:
+            self._jobs.add(job)
+            if self._selector is not None:
+                self._pending.append(job)
+                try:
+                    os.write(self._wake_write, b'\0')
+                except BlockingIOError:
+                    # The pipe is full of wake-ups the thread has yet to see
+                    pass
+            else:
+                threading.Thread(target=self._read_job, args=(job,), daemon=True).start()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        """Drain ready pipes and check jobs until none are left."""
+        while True:
+            if self._selector is not None:
+                with self._lock:
+                    pending, self._pending = self._pending, []
+                for job in pending:
+                    self._selector.register(job.output_fd, selectors.EVENT_READ, job)
+                for key, _ in self._selector.select(self.poll_interval):
+                    if key.data is None:
+                        self._drain_wake()
+                    else:
+                        self._read(key.data)
+            else:
+                time.sleep(self.poll_interval)
+
+            now = time.monotonic()
+            with self._lock:
+                for job in list(self._jobs):
+                    if job.check(now):
+                        self._jobs.discard(job)
+                if not self._jobs:
+                    self._thread = None
+                    return
+
+    def _read(self, job: Job):
+        """Move one read from a job's pipe into its buffer."""
+        try:
+            data = os.read(job.output_fd, self.chunk_size)
+        except OSError:
+            data = b''
+        if data:
+            job.feed(data)
+        else:
+            self._selector.unregister(job.output_fd)
+            job.close_output()
+
+    def _drain_wake(self):
+        """Empty the wake-up pipe; the queued jobs are registered on the next pass."""
+        try:
+            while os.read(self._wake_read, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _read_job(self, job: Job):
+        """Drain one job's pipe on platforms without select() for pipes."""
+        while True:
+            try:
+                data = os.read(job.output_fd, self.chunk_size)
+            except OSError:
+                data = b''
+            if not data:
+                break
+            job.feed(data)
+        job.close_output()
+
+
+# Shared by every session's job table
+reaper = JobReaper()
+
+
+class JobTable:
+    """A session's background jobs, numbered like a shell's %1, %2, ..."""
+
+    def __init__(self, buffer_size: int = 256 * 1024):
+        self.buffer_size = buffer_size
+        self._jobs: Dict[int, Job] = {}
+        self._next_id = 1
+
+    def start(self, command: str, processes: List[subprocess.Popen], output_fd: int,
+              timeout: Optional[float] = None, resources: Optional[list] = None) -> Job:
+        """Register a new job and hand it to the reaper."""
+        if not self._jobs:
+            self._next_id = 1
+        job = Job(self._next_id, command, processes, output_fd, timeout, self.buffer_size, resources)
+        self._jobs[job.id] = job
+        self._next_id += 1
+        reaper.watch(job)
+        return job
+
+    def get(self, spec: Optional[str] = None) -> Optional[Job]:
+        """Look up a job by %n, n, or the current job for None, % , %% and %+."""
+        if spec in (None, '%', '%%', '%+'):
+            return self._jobs[max(self._jobs)] if self._jobs else None
+        if spec == '%-':
+            ids = sorted(self._jobs)
+            return self._jobs[ids[-2]] if len(ids) > 1 else None
+        try:
+            return self._jobs.get(int(spec[1:] if spec.startswith('%') else spec))
+        except ValueError:
+            return None
+
+    def list(self) -> List[Job]:
+        """Return the jobs in start order."""
+        return [self._jobs[job_id] for job_id in sorted(self._jobs)]
+
+    def forget(self, job: Job):
+        """Drop a finished job from the table."""
+        self._jobs.pop(job.id, None)
+
+    def forget_reported(self):
+        """Drop finished jobs whose completion has been shown to the user."""
+        for job in self.list():
+            if job.done and job.reported:
+                self.forget(job)
+
+    def close(self):
+        """Kill every job that is still running."""
+        for job in self.list():
+            if not job.done:
+                job.kill()
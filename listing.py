@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Directory Listing
+Lazy, stat-once directory scanning shared by the ls builtin and the file explorer.
+"""
+
+import heapq
+import itertools
+import os
+from operator import attrgetter
+from typing import Iterator, List, Optional
+
+
+def iter_entries(path: str, show_all: bool = False) -> Iterator[os.DirEntry]:
+    """Yield directory entries in the order the filesystem returns them."""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if show_all or not entry.name.startswith('.'):
+                yield entry
+
+
+def sorted_page(entries: Iterator[os.DirEntry], offset: int = 0,
+                limit: Optional[int] = None) -> List[os.DirEntry]:
+    """Return one page of entries in name order.
+
+    A bounded page only keeps the first offset + limit names in a heap
+    instead of sorting the whole directory.
+    """
+    if limit is None:
+        page = sorted(entries, key=attrgetter('name'))
+    else:
+        page = heapq.nsmallest(offset + limit, entries, key=attrgetter('name'))
+    return page[offset:]
+
+
+def unsorted_page(entries: Iterator[os.DirEntry], offset: int = 0,
+                  limit: Optional[int] = None) -> List[os.DirEntry]:
+    """Return one page of entries in directory order, reading no further than needed."""
+    stop = None if limit is None else offset + limit
+    return list(itertools.islice(entries, offset, stop))
+
+
+def entry_stat(entry: os.DirEntry) -> Optional[os.stat_result]:
+    """Return the entry's stat data, cached on the entry, or None if it vanished."""
+    try:
+        return entry.stat()
+    except OSError:
+        return None
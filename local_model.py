@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Local Interpreter Model
+Matches natural-language requests to command templates offline, by TF-IDF nearest neighbour over example phrasings.
+"""
+
+import math
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from completion import quote_word
+from interpreter import Model
+
+# Command templates and phrasings that ask for them. {path} and {path2} take
+# the names a request mentions, in order, and {n} the numbers.
+TEMPLATES: List[Tuple[str, List[str]]] = [
+    ('cd {path}', ['go to {path}', 'change directory to {path}', 'open folder {path}', 'enter directory {path}',
+                   'switch to folder {path}', 'move into directory {path}']),
+    ('cd ..', ['go up', 'go to the parent directory', 'go back one level', 'up one directory', 'leave this folder']),
+    ('cd ~', ['go home', 'go to my home directory', 'change to home folder']),
+    ('ls', ['list files', 'show files', 'what files are here', 'show directory contents', 'what is in this folder',
+            'list directory']),
+    ('ls {path}', ['list files in {path}', 'show contents of folder {path}', 'what is in directory {path}',
+                   'list directory {path}']),
+    ('ls -la', ['show hidden files', 'list all files including hidden ones', 'show detailed file list',
+                'long listing with permissions and sizes', 'list all files with details']),
+    ('pwd', ['where am i', 'show current directory', 'print working directory', 'which folder am i in',
+             'current path']),
+    ('mkdir {path}', ['create a directory called {path}', 'make a new folder {path}', 'new directory {path}',
+                      'create folder named {path}']),
+    ('rm {path}', ['delete file {path}', 'remove {path}', 'erase the file {path}', 'get rid of {path}']),
+    ('rm -r {path}', ['delete folder {path} and everything in it', 'remove directory {path} recursively',
+                      'delete the whole directory {path}']),
+    ('rmdir {path}', ['remove empty directory {path}', 'delete empty folder {path}']),
+    ('cp {path} {path2}', ['copy {path} to {path2}', 'duplicate file {path} as {path2}',
+                           'make a copy of {path} called {path2}', 'back up {path} to {path2}']),
+    ('cp -r {path} {path2}', ['copy folder {path} to {path2}', 'copy directory {path} and its contents to {path2}']),
+    ('mv {path} {path2}', ['move {path} to {path2}', 'rename {path} to {path2}', 'move file {path} into {path2}']),
+    ('cat {path}', ['show contents of file {path}', 'display file {path}', 'read {path}', 'print file {path}',
+                    'what does file {path} say']),
+    ('cat --head {n} {path}', ['show first {n} lines of {path}', 'print the top {n} lines of file {path}',
+                               'head {n} lines {path}']),
+    ('cat --tail {n} {path}', ['show last {n} lines of {path}', 'print the final {n} lines of file {path}',
+                               'tail {n} lines {path}', 'end of file {path} {n} lines']),
+    ('echo {path}', ['print text {path}', 'say {path}', 'echo {path}']),
+    ('clear', ['clear the screen', 'clean the terminal', 'wipe screen', 'clear terminal']),
+    ('history', ['show command history', 'what commands did i run', 'previous commands', 'list past commands']),
+    ('history {n}', ['show last {n} commands', 'previous {n} commands in history']),
+    ('history -s {path}', ['search history for {path}', 'find commands containing {path} in history']),
+    ('history -c', ['clear history', 'delete command history', 'forget all previous commands']),
+    ('ps', ['show running processes', 'list processes', 'what is running', 'process list']),
+    ('top', ['show top processes by cpu', 'what is using the most cpu', 'which processes use most cpu',
+             'busiest processes']),
+    ('jobs', ['list background jobs', 'show jobs', 'what jobs are running in the background']),
+    ('fg %{n}', ['bring job {n} to foreground', 'resume job {n} in foreground', 'follow job {n}']),
+    ('kill {n}', ['kill process {n}', 'stop process {n}', 'terminate pid {n}', 'end process {n}']),
+    ('kill -9 {n}', ['force kill process {n}', 'kill process {n} forcefully', 'hard kill pid {n}']),
+    ('kill %{n}', ['kill job {n}', 'stop background job {n}', 'terminate job {n}']),
+    ('wait', ['wait for background jobs to finish', 'wait for jobs', 'block until jobs complete']),
+    ('df', ['show disk space', 'how much disk space is free', 'disk usage', 'free space on disk', 'storage left']),
+    ('free', ['show memory usage', 'how much memory is free', 'ram usage', 'available memory']),
+    ('whoami', ['who am i', 'show current user', 'what is my username', 'which user am i logged in as']),
+    ('date', ['what time is it', 'show date', 'today date', 'current date and time', 'what day is it']),
+    ('uptime', ['how long has the system been running', 'show uptime', 'time since boot']),
+    ('help', ['show help', 'what commands are available', 'list available commands', 'how do i use this']),
+    ('exit', ['exit', 'quit the terminal', 'close the terminal', 'leave the shell']),
+]
+
+# Words that carry no meaning for matching and are never taken as names
+STOPWORDS = frozenset('a an the of in into to for with and please me my i is are it on at this that these '
+                      'those here there can could would you some be do does called named as from by its'.split())
+# Words folded into one before matching
+SYNONYMS = {
+    'folder': 'directory', 'dir': 'directory', 'directories': 'directory', 'folders': 'directory',
+    'delete': 'remove', 'erase': 'remove', 'del': 'remove', 'destroy': 'remove',
+    'make': 'create', 'new': 'create', 'mk': 'create',
+    'display': 'show', 'print': 'show', 'view': 'show', 'see': 'show', 'output': 'show',
+    'ram': 'memory', 'mem': 'memory', 'duplicate': 'copy', 'quit': 'exit', 'terminate': 'kill',
+    'processes': 'process', 'procs': 'process', 'pid': 'process', 'top': 'first',
+}
+# Characters that mark a word as a file name rather than an English word
+PATH_CHARS = re.compile(r'[./\\~*]')
+WORD = re.compile(r'"([^"]*)"|\'([^\']*)\'|(\S+)')
+
+
+def stem(word: str) -> str:
+    """Fold a word onto its synonym group and strip common English suffixes."""
+    word = SYNONYMS.get(word, word)
+    if len(word) > 4 and word.endswith('ies'):
+        word = word[:-3] + 'y'
+    elif len(word) > 5 and word.endswith('ing'):
+        word = word[:-3]
+    elif len(word) > 4 and word.endswith('ed'):
+        word = word[:-2]
+    elif len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        word = word[:-1]
+    return SYNONYMS.get(word, word)
+
+
+class Request(NamedTuple):
+    """A request split up for matching.
+
+    ``words`` counts the known words, ``names`` (quoted or path-like words)
+    and ``numbers`` are the values for the template's slots, and
+    ``unknown`` holds the plain words the templates do not know.
+    """
+    words: Dict[str, float]
+    names: List[str]
+    numbers: List[str]
+    unknown: List[str]
+
+
+class Match(NamedTuple):
+    """The command a request was matched to, and the cosine similarity of the match."""
+    command: str
+    confidence: float
+
+
+class LocalModel(Model):
+    """Answers requests from TEMPLATES without leaving the machine.
+
+    Every example phrasing becomes a TF-IDF vector, indexed by word. A
+    request's words are scored against the examples that share them; its
+    names (quoted or path-like words) and numbers fill the slots of the
+    best example whose template takes exactly that many.
+
+    A request with a word the templates do not know is left to another
+    model: in "list python files" or "go to hell" the word is as likely
+    part of what is asked as a file name, and taking it as either would
+    give a wrong command. So "create a directory called foo" is not
+    answered here, while "create a directory called ./foo" is.
+
+    Only matches scoring ``min_confidence`` or above are given, and
+    ``single_word_confidence`` for a request that shares just one word
+    with the templates ("who are you" is not "who am i"); a wrong guess
+    would be run as a command, so anything less is left to another model.
+    """
+
+    name = 'local'
+
+    # Similarity at which a match is trusted
+    min_confidence = 0.6
+    # Similarity at which a match on a single known word is trusted
+    single_word_confidence = 0.95
+
+    def __init__(self, templates: List[Tuple[str, List[str]]] = TEMPLATES):
+        self.templates = templates
+        self._index: Optional[Dict[str, List[Tuple[int, float]]]] = None
+        self._examples: List[Tuple[str, int, int]] = []
+        self._vocabulary = set()
+
+    def _build(self):
+        """Compute the example vectors and the word index."""
+        documents = []
+        for command, phrasings in self.templates:
+            paths = command.count('{path')
+            numbers = command.count('{n}')
+            for phrasing in phrasings:
+                words = [stem(word) for word in phrasing.lower().split()
+                         if not word.startswith('{') and word not in STOPWORDS]
+                documents.append(words)
+                self._examples.append((command, paths, numbers))
+        frequency: Dict[str, int] = {}
+        for words in documents:
+            for word in set(words):
+                frequency[word] = frequency.get(word, 0) + 1
+        index: Dict[str, List[Tuple[int, float]]] = {}
+        for number, words in enumerate(documents):
+            weights: Dict[str, float] = {}
+            for word in words:
+                weights[word] = weights.get(word, 0) + math.log(len(documents) / frequency[word]) + 1
+            norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+            for word, weight in weights.items():
+                index.setdefault(word, []).append((number, weight / norm))
+        self._vocabulary = set(frequency)
+        self._index = index
+
+    def parse(self, query: str) -> Request:
+        """Split a request into its known words, names, numbers and unknown words."""
+        if self._index is None:
+            self._build()
+        words: Dict[str, float] = {}
+        names: List[str] = []
+        numbers: List[str] = []
+        unknown: List[str] = []
+        for quoted, single, plain in WORD.findall(query):
+            if quoted or single:
+                names.append(quoted or single)
+                continue
+            word = plain.rstrip(',;:!?') if len(plain) > 1 else plain
+            if word.endswith('.') and not PATH_CHARS.search(word[:-1]):
+                word = word[:-1]
+            digits = word.lstrip('%#')
+            if digits.isdigit():
+                numbers.append(digits)
+            elif PATH_CHARS.search(word):
+                names.append(word)
+            elif word.lower() not in STOPWORDS:
+                stemmed = stem(word.lower())
+                if stemmed in self._vocabulary:
+                    words[stemmed] = words.get(stemmed, 0) + 1
+                else:
+                    unknown.append(word)
+        return Request(words, names, numbers, unknown)
+
+    def match(self, query: str) -> Optional[Match]:
+        """Return the best command for query, or None if nothing is similar enough."""
+        words, names, numbers, unknown = self.parse(query)
+        if not words or unknown:
+            return None
+        norm = math.sqrt(sum(count * count for count in words.values()))
+        scores: Dict[int, float] = {}
+        for word, count in words.items():
+            for number, weight in self._index[word]:
+                scores[number] = scores.get(number, 0) + weight * count / norm
+        threshold = self.single_word_confidence if len(words) == 1 else self.min_confidence
+        for number, score in sorted(scores.items(), key=lambda item: -item[1]):
+            if score < threshold:
+                break
+            command, paths, slots = self._examples[number]
+            if paths != len(names) or slots != len(numbers):
+                continue
+            values = {'n': numbers[0] if numbers else ''}
+            for slot, name in zip(('path', 'path2'), names):
+                values[slot] = quote_word(name)
+            return Match(command.format(**values), score)
+        return None
+
+    def answer_now(self, query: str) -> Optional[str]:
+        match = self.match(query)
+        return match.command if match is not None else None
+
+    def complete(self, query: str, timeout: float) -> str:
+        match = self.match(query)
+        if match is None:
+            raise LookupError("no built-in command matches the request")
+        return match.command
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Metrics Sampler
+Collects system statistics on a background thread so requests never wait for them.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+class MetricsSampler:
+    """Samples CPU, memory, disk, process count and uptime at a fixed interval.
+
+    The latest sample is kept pre-serialized together with an ETag, so
+    serving it is a lock-free attribute read and unchanged samples keep the
+    same tag for conditional requests.
+    """
+
+    def __init__(self, interval: float = 1.0, disk_path: str = '/'):
+        self.interval = interval
+        self.disk_path = disk_path
+        self._snapshot: Tuple[bytes, str] = self._encode(self._empty())
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start the sampler thread if it is not already running."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            # psutil is loaded with the first request for statistics, not at startup
+            import psutil
+            # Prime the CPU counter; the first non-blocking reading is meaningless
+            psutil.cpu_percent(interval=None)
+            self._snapshot = self._encode(self.sample())
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the sampler thread."""
+        self._stop.set()
+
+    def snapshot(self) -> Tuple[bytes, str]:
+        """Return the latest sample as (JSON body, ETag), starting the sampler if needed."""
+        if self._thread is None:
+            self.start()
+        return self._snapshot
+
+    def _run(self):
+        """Refresh the snapshot every interval until stopped."""
+        while not self._stop.wait(self.interval):
+            self._snapshot = self._encode(self.sample())
+
+    def sample(self) -> Dict[str, Any]:
+        """Collect one set of system statistics without blocking."""
+        import psutil
+        try:
+            # CPU usage since the previous sample
+            cpu_percent = psutil.cpu_percent(interval=None)
+
+            # Memory usage
+            memory_percent = psutil.virtual_memory().percent
+
+            # Disk usage
+            disk = psutil.disk_usage(self.disk_path)
+            disk_percent = (disk.used / disk.total) * 100
+
+            # Process count
+            process_count = len(psutil.pids())
+
+            # Uptime
+            uptime_seconds = time.time() - psutil.boot_time()
+            uptime_str = f"{int(uptime_seconds // 3600)}h {int((uptime_seconds % 3600) // 60)}m"
+
+            return {
+                'cpu': round(cpu_percent, 1),
+                'memory': round(memory_percent, 1),
+                'disk': round(disk_percent, 1),
+                'processes': process_count,
+                'uptime': uptime_str
+            }
+        except Exception as e:
+            stats = self._empty()
+            stats['error'] = str(e)
+            return stats
+
+    def _empty(self) -> Dict[str, Any]:
+        """Statistics reported before the first sample or when sampling fails."""
+        return {
+            'cpu': 0,
+            'memory': 0,
+            'disk': 0,
+            'processes': 0,
+            'uptime': '0s'
+        }
+
+    def _encode(self, stats: Dict[str, Any]) -> Tuple[bytes, str]:
+        """Serialize a sample and derive its ETag from the content."""
+        body = json.dumps(stats, sort_keys=True).encode()
+        return body, hashlib.blake2b(body, digest_size=8).hexdigest()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Command Line Parser
+Tokenizes shell-style command lines into chained pipelines of simple commands.
+"""
+
+import os
+from typing import List, Optional, Tuple
+
+# Operators, longest first so '&&' wins over '&'
+OPERATORS = ('&&', '||', '>>', '|', '&', ';', '<', '>')
+OPERATOR_CHARS = set(''.join(OPERATORS))
+
+
+class PipelineSyntaxError(ValueError):
+    """Raised when a command line cannot be parsed."""
+
+
+class Pipeline(list):
+    """A list of SimpleCommand stages, optionally run as a background job."""
+
+    def __init__(self, stages=()):
+        super().__init__(stages)
+        self.background = False
+
+
+class SimpleCommand:
+    """One stage of a pipeline: its words and any file redirections."""
+
+    def __init__(self):
+        self.argv: List[str] = []
+        self.stdin: Optional[str] = None
+        self.stdout: Optional[str] = None
+        self.append = False
+
+    def __repr__(self) -> str:
+        return f"SimpleCommand({self.argv!r}, stdin={self.stdin!r}, stdout={self.stdout!r}, append={self.append})"
+
+
+def tokenize(command: str) -> List[Tuple[str, str]]:
+    """Split a command line into ('word', text) and ('op', operator) tokens.
+
+    Single quotes are literal, double quotes allow backslash escapes of
+    ``"`` and ``\\``, and outside quotes a backslash escapes the next
+    character (except on Windows, where it is a path separator).
+    """
+    tokens: List[Tuple[str, str]] = []
+    word: List[str] = []
+    in_word = False
+    escapes = os.name != 'nt'
+    i = 0
+
+    while i < len(command):
+        char = command[i]
+
+        if char.isspace():
+            if in_word:
+                tokens.append(('word', ''.join(word)))
+                word, in_word = [], False
+            i += 1
+        elif char in OPERATOR_CHARS:
+            if in_word:
+                tokens.append(('word', ''.join(word)))
+                word, in_word = [], False
+            operator = next(op for op in OPERATORS if command.startswith(op, i))
+            tokens.append(('op', operator))
+            i += len(operator)
+        elif char == "'":
+            end = command.find("'", i + 1)
+            if end == -1:
+                raise PipelineSyntaxError("syntax error: unterminated single quote")
+            word.append(command[i + 1:end])
+            in_word = True
+            i = end + 1
+        elif char == '"':
+            i += 1
+            while True:
+                if i >= len(command):
+                    raise PipelineSyntaxError("syntax error: unterminated double quote")
+                if command[i] == '"':
+                    break
+                if command[i] == '\\' and escapes and i + 1 < len(command) and command[i + 1] in '"\\':
+                    i += 1
+                word.append(command[i])
+                i += 1
+            in_word = True
+            i += 1
+        elif char == '\\' and escapes and i + 1 < len(command):
+            word.append(command[i + 1])
+            in_word = True
+            i += 2
+        else:
+            word.append(char)
+            in_word = True
+            i += 1
+
+    if in_word:
+        tokens.append(('word', ''.join(word)))
+    return tokens
+
+
+def split_words(command: str) -> List[str]:
+    """Return the words of a command line that contains no operators."""
+    return [value for kind, value in tokenize(command) if kind == 'word']
+
+
+def parse(command: str) -> List[Tuple[str, Pipeline]]:
+    """Parse a command line into (connector, pipeline) pairs.
+
+    The connector says when the pipeline runs: ';' always, '&&' after a
+    success and '||' after a failure. The first pipeline's connector is ';'.
+    A pipeline followed by '&' is marked to run in the background.
+    """
+    chain: List[Tuple[str, Pipeline]] = []
+    pipeline = Pipeline()
+    current = SimpleCommand()
+    connector = ';'
+
+    def finish_command(operator: str):
+        if not current.argv:
+            raise PipelineSyntaxError(f"syntax error near unexpected token '{operator}'")
+        pipeline.append(current)
+
+    tokens = tokenize(command)
+    i = 0
+    while i < len(tokens):
+        kind, value = tokens[i]
+        if kind == 'word':
+            current.argv.append(value)
+        elif value in ('<', '>', '>>'):
+            if i + 1 >= len(tokens) or tokens[i + 1][0] != 'word':
+                raise PipelineSyntaxError(f"syntax error near unexpected token '{value}'")
+            i += 1
+            if value == '<':
+                current.stdin = tokens[i][1]
+            else:
+                current.stdout = tokens[i][1]
+                current.append = value == '>>'
+        elif value == '|':
+            finish_command(value)
+            current = SimpleCommand()
+        elif value in ('&&', '||', ';'):
+            if value == ';' and connector == ';' and not current.argv and not pipeline:
+                # Allow empty statements such as 'ls;' or ';;'
+                i += 1
+                continue
+            finish_command(value)
+            chain.append((connector, pipeline))
+            pipeline, current, connector = Pipeline(), SimpleCommand(), value
+        elif value == '&':
+            finish_command(value)
+            pipeline.background = True
+            chain.append((connector, pipeline))
+            pipeline, current, connector = Pipeline(), SimpleCommand(), ';'
+        i += 1
+
+    if current.argv:
+        pipeline.append(current)
+    elif pipeline or current.stdin or current.stdout or connector in ('&&', '||'):
+        raise PipelineSyntaxError("syntax error: unexpected end of command")
+    if pipeline:
+        chain.append((connector, pipeline))
+    return chain
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Process Table
+A shared, short-lived cache of the system process list with real CPU percentages.
+"""
+
+import heapq
+import threading
+import time
+from typing import Any, Dict, List
+
+
+class ProcessTable:
+    """Caches one walk of the process list for ``ttl`` seconds.
+
+    psutil only reports a meaningful ``cpu_percent`` for a Process object it
+    has sampled before, so the table keeps one object per PID between
+    refreshes. Every session reads the same cached rows, which means many
+    sessions running ``ps`` or ``top`` cost one walk per ``ttl``.
+    """
+
+    # Delay used to take a second CPU sample when the table is first filled
+    prime_interval = 0.1
+
+    def __init__(self, ttl: float = 1.0):
+        self.ttl = ttl
+        self._procs: Dict[int, Any] = {}
+        self._rows: List[Dict[str, Any]] = []
+        self._refreshed = 0.0
+        self._lock = threading.Lock()
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Return the cached process rows, refreshing them if they are stale."""
+        with self._lock:
+            if time.monotonic() - self._refreshed > self.ttl:
+                if not self._procs:
+                    # Without a previous sample every CPU reading would be 0.0
+                    self._refresh()
+                    time.sleep(self.prime_interval)
+                self._rows = self._refresh()
+                self._refreshed = time.monotonic()
+            return self._rows
+
+    def top(self, count: int = 10, key: str = 'cpu_percent') -> List[Dict[str, Any]]:
+        """Return the count rows with the largest key, without sorting the whole table."""
+        return heapq.nlargest(count, self.rows(), key=lambda row: row[key])
+
+    def _refresh(self) -> List[Dict[str, Any]]:
+        """Sample every live process, reusing Process objects for CPU deltas."""
+        import psutil
+        procs = {}
+        rows = []
+        for pid in psutil.pids():
+            proc = self._procs.get(pid)
+            try:
+                if proc is None:
+                    proc = psutil.Process(pid)
+                with proc.oneshot():
+                    rows.append({
+                        'pid': pid,
+                        'name': proc.name(),
+                        'cpu_percent': proc.cpu_percent(interval=None),
+                        'memory_percent': proc.memory_percent()
+                    })
+                procs[pid] = proc
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+        self._procs = procs
+        return rows
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+PTY Session
+Runs a program on a pseudo-terminal so full-screen and interactive programs work.
+"""
+
+import os
+import select
+import shutil
+import signal
+import struct
+import subprocess
+import sys
+from typing import Iterator, List, Optional
+
+from jobs import exit_status
+
+try:
+    import fcntl
+    import termios
+    import tty
+except ImportError:
+    # Windows has no pseudo-terminals
+    fcntl = termios = tty = None
+
+PTY_SUPPORTED = termios is not None and hasattr(os, 'openpty')
+
+# Run between fork and the program: makes stdin, the PTY slave, the
+# controlling terminal of the new session and execs the program. preexec_fn
+# would do the same in the forked child, which is unsafe in a threaded server.
+PTY_LAUNCHER = "import fcntl, os, sys, termios; fcntl.ioctl(0, termios.TIOCSCTTY, 0); os.execv(sys.argv[1], sys.argv[2:])"
+
+
+class PtySession:
+    """A program attached to the slave side of a new pseudo-terminal.
+
+    The master side is non-blocking and read() waits on it with select(),
+    so whoever consumes the output (an HTTP response or the CLI's copy loop)
+    sets the pace; a slow reader stalls the program on a full terminal
+    buffer instead of growing one here.
+    """
+
+    # Bytes read from the terminal at a time
+    chunk_size = 65536
+
+    def __init__(self, argv: List[str], cwd: str, rows: int = 24, cols: int = 80,
+                 term: str = 'xterm-256color', executable: Optional[str] = None):
+        if not PTY_SUPPORTED:
+            raise OSError("pseudo-terminals are not supported on this platform")
+        executable = executable or shutil.which(argv[0])
+        if executable is None:
+            raise FileNotFoundError(f"No such program: {argv[0]}")
+        self.argv = argv
+        self.exit_code: Optional[int] = None
+        master, slave = os.openpty()
+        try:
+            self._set_size(slave, rows, cols)
+            env = dict(os.environ, TERM=term)
+            # A new session with the slave as controlling terminal gives the
+            # program job control signals and window-size changes
+            self.process = subprocess.Popen(
+                [sys.executable, '-I', '-S', '-c', PTY_LAUNCHER, executable] + argv,
+                cwd=cwd,
+                stdin=slave,
+                stdout=slave,
+                stderr=slave,
+                env=env,
+                start_new_session=True
+            )
+        except Exception:
+            os.close(master)
+            raise
+        finally:
+            os.close(slave)
+        os.set_blocking(master, False)
+        self.fd: Optional[int] = master
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    def read(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """Return available output, b'' if none arrived within timeout, or None at EOF."""
+        if self.fd is None:
+            return None
+        try:
+            data = os.read(self.fd, self.chunk_size)
+        except BlockingIOError:
+            if not select.select([self.fd], [], [], timeout)[0]:
+                return b''
+            try:
+                data = os.read(self.fd, self.chunk_size)
+            except BlockingIOError:
+                return b''
+            except OSError:
+                # Linux reports EIO once every slave descriptor is closed
+                data = b''
+        except OSError:
+            data = b''
+        if not data:
+            return None
+        # The terminal hands out a few KB per read; gather what is already
+        # waiting so consumers see fewer, larger chunks
+        chunks = [data]
+        size = len(data)
+        while size < self.chunk_size:
+            try:
+                data = os.read(self.fd, self.chunk_size - size)
+            except OSError:
+                break
+            if not data:
+                break
+            chunks.append(data)
+            size += len(data)
+        return b''.join(chunks)
+
+    def output(self, poll_interval: float = 1.0) -> Iterator[bytes]:
+        """Yield output chunks until the program closes the terminal."""
+        while True:
+            data = self.read(poll_interval)
+            if data is None:
+                return
+            if data:
+                yield data
+
+    def write(self, data: bytes):
+        """Send keystrokes to the program."""
+        view = memoryview(data)
+        while view and self.fd is not None:
+            try:
+                written = os.write(self.fd, view)
+            except BlockingIOError:
+                select.select([], [self.fd], [], 1.0)
+                continue
+            view = view[written:]
+
+    def resize(self, rows: int, cols: int):
+        """Change the terminal size; the kernel sends the program SIGWINCH."""
+        if self.fd is not None:
+            self._set_size(self.fd, rows, cols)
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        """Wait for the program to exit and return its exit code, 128+N if signal N killed it."""
+        self.exit_code = exit_status(self.process.wait(timeout))
+        return self.exit_code
+
+    def close(self) -> Optional[int]:
+        """Hang up the terminal, stopping the program if it is still running."""
+        if self.process.poll() is None:
+            try:
+                os.killpg(self.process.pid, signal.SIGHUP)
+                self.process.wait(1)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+        return self.wait()
+
+    @staticmethod
+    def _set_size(fd: int, rows: int, cols: int):
+        fcntl.ioctl(fd, termios.TIOCSWINSZ, struct.pack('HHHH', max(rows, 1), max(cols, 1), 0, 0))
+
+
+def interact(session: PtySession, stdin_fd: int = 0, stdout_fd: int = 1) -> int:
+    """Connect the real terminal to a PTY session until its program exits.
+
+    The local terminal is put in raw mode so every keystroke, including
+    Ctrl+C and arrow keys, goes straight to the program, and local window
+    size changes are passed on.
+    """
+    saved = termios.tcgetattr(stdin_fd)
+
+    def on_resize(signum, frame):
+        size = os.get_terminal_size(stdout_fd)
+        session.resize(size.lines, size.columns)
+
+    previous_handler = signal.signal(signal.SIGWINCH, on_resize)
+    try:
+        tty.setraw(stdin_fd)
+        on_resize(None, None)
+        while True:
+            try:
+                ready = select.select([stdin_fd, session.fd], [], [])[0]
+            except InterruptedError:
+                continue
+            if session.fd in ready:
+                data = session.read(0)
+                if data is None:
+                    break
+                os.write(stdout_fd, data)
+            if stdin_fd in ready:
+                data = os.read(stdin_fd, session.chunk_size)
+                if not data:
+                    break
+                session.write(data)
+    finally:
+        termios.tcsetattr(stdin_fd, termios.TCSAFLUSH, saved)
+        signal.signal(signal.SIGWINCH, previous_handler)
+    return session.close()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Session Recording
+Append-only, compressed asciicast v2 recordings of terminal sessions, with a seek index for replay.
+"""
+
+import bisect
+import gzip
+import json
+import os
+import re
+import threading
+import time
+import uuid
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Recording ids are the hex of a random uuid, which also keeps them safe as file names
+RECORDING_ID = re.compile(r'^[0-9a-f]{32}$')
+
+# One asciicast event: seconds since the start, 'o' (output) or 'i' (input), and the text
+Event = Tuple[float, str, str]
+
+
+def recording_paths(directory: str, recording_id: str) -> Tuple[str, str]:
+    """Return the event file and index file of a recording."""
+    if not RECORDING_ID.match(recording_id):
+        raise ValueError(f"invalid recording id: {recording_id!r}")
+    return os.path.join(directory, f"{recording_id}.cast.gz"), os.path.join(directory, f"{recording_id}.idx")
+
+
+class Recorder:
+    """Writes one session's input and output events to an asciicast v2 file.
+
+    The file is a series of gzip members, each holding whole event lines;
+    concatenated members are one valid gzip stream, so ``zcat`` gives back
+    a plain .cast file any asciicast player can read. Events are buffered
+    and compressed a block at a time, once ``block_size`` bytes are waiting
+    or the oldest has waited ``flush_interval`` seconds when the next one
+    arrives, and nothing written is rewritten. For each block the time of
+    its first event and its offset in the file are appended to the index,
+    so replay can start at any time by decompressing from the block that
+    covers it.
+    """
+
+    # Bytes of event lines compressed into one block
+    block_size = 64 * 1024
+    # Seconds an event may wait in the buffer before its block is written
+    flush_interval = 1.0
+    # zlib level of each block; 6 is gzip's default balance of size and speed
+    compress_level = 6
+
+    def __init__(self, directory: str, width: int = 80, height: int = 24, title: Optional[str] = None):
+        os.makedirs(directory, exist_ok=True)
+        self.id = uuid.uuid4().hex
+        self.path, self.index_path = recording_paths(directory, self.id)
+        self.started = time.time()
+        self._clock = time.monotonic()
+        self._lock = threading.Lock()
+        self._buffer: List[str] = []
+        self._buffered = 0
+        self._buffer_time: Optional[float] = None
+        self.events = 0
+        self.duration = 0.0
+        self.closed = False
+        self._file = open(self.path, 'ab')
+        self._index = open(self.index_path, 'a', encoding='utf-8')
+        header = {'version': 2, 'width': width, 'height': height, 'timestamp': int(self.started),
+                  'env': {'SHELL': os.environ.get('SHELL', ''), 'TERM': 'xterm-256color'}}
+        if title:
+            header['title'] = title
+        # The header is a block of its own, ahead of every block the index points to
+        self._file.write(gzip.compress((json.dumps(header) + '\n').encode(), self.compress_level))
+        self._file.flush()
+
+    def output(self, data: str):
+        """Record text the terminal displayed."""
+        self._record('o', data)
+
+    def input(self, data: str):
+        """Record text typed into the terminal."""
+        self._record('i', data)
+
+    def _record(self, kind: str, data: str):
+        if not data:
+            return
+        with self._lock:
+            if self.closed:
+                return
+            now = round(time.monotonic() - self._clock, 6)
+            line = json.dumps([now, kind, data]) + '\n'
+            if self._buffer_time is None:
+                self._buffer_time = now
+            self._buffer.append(line)
+            self._buffered += len(line)
+            self.events += 1
+            self.duration = now
+            if self._buffered >= self.block_size or now - self._buffer_time >= self.flush_interval:
+                self._flush()
+
+    def flush(self):
+        """Write the buffered events out as a block."""
+        with self._lock:
+            if not self.closed:
+                self._flush()
+
+    def _flush(self):
+        """Compress the buffer into a block and index it; caller holds the lock."""
+        if not self._buffer:
+            return
+        offset = self._file.tell()
+        self._file.write(gzip.compress(''.join(self._buffer).encode(), self.compress_level))
+        self._file.flush()
+        self._index.write(f"{self._buffer_time:.6f} {offset}\n")
+        self._index.flush()
+        self._buffer = []
+        self._buffered = 0
+        self._buffer_time = None
+
+    def close(self):
+        """Write what is buffered and close the files; later events are ignored."""
+        with self._lock:
+            if self.closed:
+                return
+            self._flush()
+            self.closed = True
+            self._file.close()
+            self._index.close()
+
+    def info(self) -> Dict:
+        return {'recording': self.id, 'events': self.events, 'duration': self.duration,
+                'bytes': os.path.getsize(self.path)}
+
+
+class Recording:
+    """A recording on disk, read a block at a time so it is never loaded whole."""
+
+    # Compressed bytes read from the file at once
+    read_size = 64 * 1024
+
+    def __init__(self, directory: str, recording_id: str):
+        self.id = recording_id
+        self.path, self.index_path = recording_paths(directory, recording_id)
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"no such recording: {recording_id}")
+
+    def index(self) -> List[Tuple[float, int]]:
+        """Return (time of first event, file offset) for every block."""
+        entries = []
+        try:
+            with open(self.index_path, encoding='utf-8') as index:
+                for line in index:
+                    fields = line.split()
+                    # A line cut short by a crash is ignored
+                    if len(fields) == 2:
+                        entries.append((float(fields[0]), int(fields[1])))
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def header(self) -> Dict:
+        """Return the asciicast header."""
+        for line in self._lines(0):
+            return json.loads(line)
+        return {}
+
+    def events(self, start: float = 0.0) -> Iterator[Event]:
+        """Yield the events from time start on, decompressing from the block that covers it."""
+        index = self.index()
+        if not index:
+            return
+        position = max(bisect.bisect_right([time for time, _ in index], start) - 1, 0)
+        for line in self._lines(index[position][1]):
+            try:
+                event = json.loads(line)
+            except ValueError:
+                # The last block of a recording still being written may be incomplete
+                return
+            if event[0] >= start:
+                yield event[0], event[1], event[2]
+
+    def _lines(self, offset: int) -> Iterator[str]:
+        """Yield the lines of every gzip member from offset to the end of the file."""
+        decompressor = zlib.decompressobj(wbits=31)
+        pending = b''
+        with open(self.path, 'rb') as file:
+            file.seek(offset)
+            while True:
+                data = file.read(self.read_size)
+                if not data:
+                    return
+                while data:
+                    pending += decompressor.decompress(data)
+                    if decompressor.eof:
+                        # A member ended; the rest of the data starts the next one
+                        data = decompressor.unused_data
+                        decompressor = zlib.decompressobj(wbits=31)
+                    else:
+                        data = b''
+                    *lines, pending = pending.split(b'\n')
+                    for line in lines:
+                        yield line.decode('utf-8', 'replace')
+
+
+def paced(events: Iterator[Event], speed: float = 1.0, idle_limit: Optional[float] = None,
+          start: float = 0.0) -> Iterator[Event]:
+    """Yield events at the times they were recorded, speed times faster.
+
+    A speed of 0 or less yields them as fast as they are read. Pauses
+    longer than idle_limit seconds are shortened to it, as asciinema's
+    idle time limit does. Waits are measured from the start, so small
+    delays do not add up to drift.
+    """
+    clock = time.monotonic()
+    previous = start
+    elapsed = 0.0
+    for event in events:
+        wait = max(event[0] - previous, 0.0)
+        previous = event[0]
+        if idle_limit is not None:
+            wait = min(wait, idle_limit)
+        if speed > 0:
+            elapsed += wait / speed
+            delay = clock + elapsed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        yield event
@@ -23,7 +23,7 @@ def main():
         print("Starting CLI Terminal...")
         print("=" * 50)
         try:
-            from terminal import main as cli_main
+            from cli import main as cli_main
             cli_main()
         except ImportError as e:
             print(f"Error importing terminal module: {e}")
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Scrollback
+The bounded record of what a terminal tab has shown, so a browser can redraw and scroll a tab from the server.
+"""
+
+import threading
+from typing import Dict, List, Optional
+
+
+class Scrollback:
+    """The last lines a tab displayed, each numbered in order, in a ring buffer.
+
+    A line is [seq, kind, text]: kind is 'command' for an entered command
+    line, 'output' or 'error' for what the command printed (its output
+    lines become 'error' if it exits non-zero, as the page shows them), or
+    'ai' for an interpretation. Output arrives in chunks that need not end
+    at a newline, so the last line stays open until one does; a line longer
+    than ``line_length`` continues on the next one, as a terminal wraps it.
+
+    At most ``max_lines`` lines and ``max_bytes`` bytes of text are kept,
+    the oldest dropped first. The lines sit in a fixed ring of slots, so a
+    line is found from its number without walking the others.
+
+    ``version`` counts every change; a page that drew the tab at one
+    version skips the live events at or below it. ``running`` says a
+    command is still executing, so the page knows to wait for it. While
+    ``recorder`` is set, commands and output are also recorded with it.
+    """
+
+    # Lines kept per tab; older lines are dropped first
+    max_lines = 10000
+    # Bytes of text (UTF-8) kept per tab
+    max_bytes = 4 * 1024 * 1024
+    # Characters in a line before it wraps onto the next
+    line_length = 4096
+
+    def __init__(self, max_lines: Optional[int] = None, max_bytes: Optional[int] = None):
+        if max_lines is not None:
+            self.max_lines = max(1, max_lines)
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+        # Slots are [seq, kind, text, size]; the ring grows to max_lines and then wraps
+        self._ring: List[Optional[list]] = []
+        self._start = 0
+        self._count = 0
+        self._lock = threading.Lock()
+        self._open = False
+        self._output_from = 0
+        self.bytes = 0
+        self.seq = 0
+        self.version = 0
+        self.running = False
+        self.recorder = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def first(self) -> int:
+        """The number of the oldest line kept (one past ``seq`` when none are)."""
+        return self.seq - self._count + 1
+
+    def begin(self, prompt: str, command: str) -> int:
+        """Record a command line as it starts to run; return the new version."""
+        with self._lock:
+            if self.recorder is not None:
+                self.recorder.input(command + '\r')
+                self.recorder.output(prompt + command + '\r\n')
+            self._extend(self._append('command'), (prompt + command)[:self.line_length])
+            self._open = False
+            self._output_from = self.seq + 1
+            self._trim()
+            self.running = True
+            self.version += 1
+            return self.version
+
+    def write(self, text: str, kind: str = 'output') -> int:
+        """Record a chunk of output, continuing the last line if it was left open; return the new version."""
+        with self._lock:
+            if not text:
+                return self.version
+            if self.recorder is not None:
+                # Recordings are played back on terminals, which need a carriage return to start a line
+                self.recorder.output(text.replace('\r\n', '\n').replace('\n', '\r\n'))
+            parts = text.split('\n')
+            # A chunk ending in a newline leaves an empty last part, which is not a line yet
+            ends_line = parts[-1] == ''
+            if ends_line:
+                parts.pop()
+            first = 0
+            if parts and self._open and self._count:
+                last = self._line(self._count - 1)
+                if last[1] == kind:
+                    self._continue(last, parts[0], kind)
+                    first = 1
+            # The common case, a line that fits, is inlined: this runs for every line of output
+            ring = self._ring
+            slots = self.max_lines
+            length = self.line_length
+            for index in range(first, len(parts)):
+                part = parts[index]
+                if len(part) > length:
+                    self._continue(self._append(kind), part, kind)
+                    continue
+                if self._count == slots:
+                    self._drop()
+                self.seq += 1
+                size = len(part) if part.isascii() else len(part.encode('utf-8', 'replace'))
+                line = [self.seq, kind, part, size]
+                position = (self._start + self._count) % slots
+                if position == len(ring):
+                    ring.append(line)
+                else:
+                    ring[position] = line
+                self._count += 1
+                self.bytes += size
+            self._open = not ends_line
+            self._trim()
+            self.version += 1
+            return self.version
+
+    def end(self, exit_code: int) -> int:
+        """Record that the running command exited, marking its output as an error if it failed; return the new version."""
+        with self._lock:
+            if exit_code != 0:
+                for index in range(self._count - 1, -1, -1):
+                    line = self._line(index)
+                    if line[0] < self._output_from:
+                        break
+                    if line[1] == 'output':
+                        line[1] = 'error'
+            if self._open and self.recorder is not None:
+                # The next prompt starts on a line of its own, as the page shows it
+                self.recorder.output('\r\n')
+            self._open = False
+            self.running = False
+            self.version += 1
+            return self.version
+
+    def read(self, limit: int, start: Optional[int] = None, before: Optional[int] = None) -> Dict:
+        """Return up to limit lines: from line start on, those just before line before, or else the newest.
+
+        'first' and 'last' number the lines returned, 'oldest' and 'newest'
+        the lines kept. 'more' says whether older lines are kept than the
+        ones returned, and 'open' whether the newest line may still grow.
+        """
+        with self._lock:
+            oldest = self.first
+            end = self.seq + 1
+            if start is not None:
+                begin = max(start, oldest)
+                end = min(begin + limit, end)
+            else:
+                if before is not None:
+                    end = max(min(before, end), oldest)
+                begin = max(end - limit, oldest)
+            lines = [self._line(seq - oldest)[:3] for seq in range(begin, end)]
+            return {
+                'lines': lines,
+                'first': lines[0][0] if lines else None,
+                'last': lines[-1][0] if lines else None,
+                'oldest': oldest,
+                'newest': self.seq,
+                'more': begin > oldest,
+                'open': self._open,
+                'version': self.version,
+                'running': self.running
+            }
+
+    def _line(self, index: int) -> list:
+        """Return the index-th oldest line kept; caller holds the lock."""
+        return self._ring[(self._start + index) % self.max_lines]
+
+    def _append(self, kind: str) -> list:
+        """Start an empty line, dropping the oldest if every slot is taken; caller holds the lock."""
+        if self._count == self.max_lines:
+            self._drop()
+        self.seq += 1
+        line = [self.seq, kind, '', 0]
+        position = (self._start + self._count) % self.max_lines
+        if position == len(self._ring):
+            self._ring.append(line)
+        else:
+            self._ring[position] = line
+        self._count += 1
+        return line
+
+    def _continue(self, line: list, text: str, kind: str):
+        """Add text to a line, wrapping onto new lines at line_length; caller holds the lock."""
+        while len(line[2]) + len(text) > self.line_length:
+            room = self.line_length - len(line[2])
+            self._extend(line, text[:room])
+            text = text[room:]
+            line = self._append(kind)
+        self._extend(line, text)
+
+    def _extend(self, line: list, text: str):
+        """Add text to a line and to the byte count; caller holds the lock."""
+        if text:
+            size = len(text) if text.isascii() else len(text.encode('utf-8', 'replace'))
+            line[2] += text
+            line[3] += size
+            self.bytes += size
+
+    def _drop(self):
+        """Forget the oldest line; caller holds the lock."""
+        line = self._ring[self._start]
+        self._ring[self._start] = None
+        self.bytes -= line[3]
+        self._start = (self._start + 1) % self.max_lines
+        self._count -= 1
+
+    def _trim(self):
+        """Drop the oldest lines until the text fits in max_bytes, always keeping the newest; caller holds the lock."""
+        while self.bytes > self.max_bytes and self._count > 1:
+            self._drop()
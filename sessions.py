@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Session Manager
+A bounded store of per-tab terminal sessions with LRU and idle eviction.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from terminal import TerminalBackend
+from channel import SessionChannel
+from history_store import HistoryStore
+from recording import Recorder
+from scrollback import Scrollback
+
+
+class WebSession:
+    """Server-side state for one terminal tab of a browser session.
+
+    Every tab has a backend of its own, so its working directory, history
+    and jobs are its own too. The history lives in history_path under the
+    session id; the default ':memory:' keeps it only for the life of the
+    session. The scrollback lets the page redraw the tab when it returns
+    to it, and while a recording runs everything it keeps is recorded too.
+    """
+
+    def __init__(self, session_id: str, history_path: str = ':memory:', scrollback: Optional[Scrollback] = None):
+        self.terminal = TerminalBackend(HistoryStore(history_path, user=session_id))
+        self.scrollback = scrollback if scrollback is not None else Scrollback()
+        self.channel = SessionChannel(self.terminal, self.scrollback)
+        self.recorder: Optional[Recorder] = None
+        self.last_used = time.monotonic()
+
+    @property
+    def busy(self) -> bool:
+        """Whether the tab is in use however long ago its last request was.
+
+        A command (or a cp, mv or rm) still running, a full-screen program
+        still open or a page still reading its event stream all count.
+        """
+        terminal = self.terminal
+        return (self.scrollback.running or self.channel.attached
+                or bool(terminal.processes or terminal.operations or terminal.ptys))
+
+    def start_recording(self, directory: str, width: int = 80, height: int = 24) -> Recorder:
+        """Start recording the tab into directory, or return the recording already running."""
+        if self.recorder is None:
+            self.recorder = Recorder(directory, width, height)
+            self.scrollback.recorder = self.recorder
+        return self.recorder
+
+    def stop_recording(self) -> Optional[Recorder]:
+        """Finish the running recording, if any, and return it."""
+        recorder, self.recorder = self.recorder, None
+        self.scrollback.recorder = None
+        if recorder is not None:
+            recorder.close()
+        return recorder
+
+    def close(self):
+        """Stop the session's event stream, its recording and any commands it is running."""
+        self.stop_recording()
+        self.channel.close()
+        self.terminal.close()
+        self.terminal.history.close()
+
+
+class SessionManager:
+    """Keeps at most ``max_sessions`` sessions, dropping idle ones first.
+
+    Sessions are kept in least-recently-used order, so both the idle sweep
+    and LRU eviction only ever look at the front of the store. A session
+    that is busy (see WebSession.busy) is never idle: the sweep counts it as
+    used just now, and LRU eviction passes over it unless every session is
+    busy.
+    """
+
+    def __init__(self, max_sessions: int = 100, idle_ttl: float = 1800,
+                 factory: Callable[[str], Any] = WebSession):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.factory = factory
+        self._sessions: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+
+    def get(self, session_id: str):
+        """Return the session for session_id, creating it if needed."""
+        now = time.monotonic()
+        with self._lock:
+            evicted = self._sweep(now)
+
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self.factory(session_id)
+                self._sessions[session_id] = session
+                self.created += 1
+                while len(self._sessions) > self.max_sessions:
+                    evicted.append(self._pop_least_recent(session_id))
+                    self.evicted_lru += 1
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_used = now
+
+        self._close(evicted)
+        return session
+
+    def close(self, session_id: str) -> bool:
+        """Close and forget the session for session_id; return whether there was one."""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        self._close([session])
+        return True
+
+    def sweep(self):
+        """Evict every session that has been idle longer than idle_ttl."""
+        with self._lock:
+            evicted = self._sweep(time.monotonic())
+        self._close(evicted)
+
+    def _sweep(self, now: float) -> List[Any]:
+        """Remove idle sessions from the front of the store; caller holds the lock."""
+        evicted = []
+        for _ in range(len(self._sessions)):
+            session_id, oldest = next(iter(self._sessions.items()))
+            if now - oldest.last_used <= self.idle_ttl:
+                break
+            if getattr(oldest, 'busy', False):
+                oldest.last_used = now
+                self._sessions.move_to_end(session_id)
+                continue
+            del self._sessions[session_id]
+            evicted.append(oldest)
+            self.evicted_idle += 1
+        return evicted
+
+    def _pop_least_recent(self, keep: str) -> Any:
+        """Remove the least recently used session that is not busy, or the least recent of all; caller holds the lock."""
+        for session_id, session in self._sessions.items():
+            if session_id != keep and not getattr(session, 'busy', False):
+                break
+        else:
+            session_id = next(iter(self._sessions))
+        return self._sessions.pop(session_id)
+
+    def _close(self, evicted: List[Any]):
+        """Release evicted sessions outside the lock."""
+        for session in evicted:
+            try:
+                session.close()
+            except Exception as e:
+                print(f"Warning: failed to close session: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        """Return resident-session and eviction counters."""
+        with self._lock:
+            return {
+                'resident': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'created': self.created,
+                'evicted_idle': self.evicted_idle,
+                'evicted_lru': self.evicted_lru,
+                'evicted': self.evicted_idle + self.evicted_lru
+            }
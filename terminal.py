@@ -6,33 +6,130 @@ A fully functioning command terminal that mimics real system terminal behavior.
 
 import os
 import sys
+import stat
 import subprocess
-import shutil
 import platform
 import time
-import json
+import queue
+import codecs
+import errno
+import shlex
+import signal
+import tempfile
 import threading
-from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
-import psutil
-from colorama import init, Fore, Back, Style
-from prompt_toolkit import prompt, PromptSession
-from prompt_toolkit.completion import WordCompleter, PathCompleter
-from prompt_toolkit.history import InMemoryHistory
-from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
-import openai
+import itertools
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Generator
+from process_table import ProcessTable
+from listing import iter_entries, sorted_page, entry_stat
+from fileview import FileView
+from pipeline import parse, split_words, PipelineSyntaxError, Pipeline, SimpleCommand
+from jobs import Job, JobTable, exit_status
+from pty_session import PtySession, PTY_SUPPORTED
+from commands import Builtin, Registry, builtin, streams
+from completion import CompletionEngine
+from executables import CommandHash, path_index
+from history_store import HistoryStore
+from interpreter import default_interpreter
+from fileops import FileOperation, copy_file, copy_tree, is_directory, move, remove_tree
 
-# Initialize colorama for cross-platform colored output
-init(autoreset=True)
+class CommandStream:
+    """Iterator over the output chunks of a command.
+    
+    The exit code is only known once the command has finished, so it is
+    available as ``exit_code`` after the stream has been exhausted.
+    """
+    
+    def __init__(self, chunks: Generator[str, None, int]):
+        self._chunks = chunks
+        self.exit_code: Optional[int] = None
+    
+    def __iter__(self) -> Iterator[str]:
+        return self
+    
+    def __next__(self) -> str:
+        try:
+            return next(self._chunks)
+        except StopIteration as stop:
+            self.exit_code = stop.value
+            raise
+    
+    def close(self):
+        """Stop the command early and release its resources."""
+        self._chunks.close()
+    
+    def read(self) -> Tuple[str, int]:
+        """Consume the whole stream and return output and exit code."""
+        output = ''.join(self)
+        return output, self.exit_code
+
+# Help lines for shell syntax that is not a builtin command, each listed ahead of the builtin named last
+SYNTAX_HELP = (
+    ('Jobs', 'cmd &', "Run a command in the background", 'jobs'),
+    ('Jobs', 'timeout', "Limit one command's run time (timeout SECONDS cmd, 0 for none)", 'pty'),
+)
 
 class TerminalBackend:
     """Core terminal backend that processes and executes commands."""
     
-    def __init__(self):
+    # Builtin commands, collected from the @builtin methods below and installed plugins
+    commands = Registry()
+    # Seconds an external command may run before it is killed
+    command_timeout = 30
+    # Seconds a background job may run before it is killed (None for no limit)
+    job_timeout = None
+    # Characters of output kept for each background job
+    job_buffer_size = 256 * 1024
+    # Programs that only work on a terminal; they always run on a PTY
+    pty_programs = frozenset({
+        'vi', 'vim', 'nvim', 'nano', 'emacs', 'less', 'more', 'man',
+        'htop', 'watch', 'ssh', 'tmux', 'screen'
+    })
+    # Interpreters that start an interactive prompt when given no arguments
+    repl_programs = frozenset({
+        'python', 'python3', 'ipython', 'node', 'irb', 'bash', 'sh', 'zsh',
+        'sqlite3', 'psql', 'mysql'
+    })
+    # Bytes read from a child process pipe at a time
+    stream_chunk_size = 4096
+    # Chunks buffered between the pipe reader and the consumer
+    stream_queue_size = 256
+    # Threads copying or removing files for one cp, mv or rm
+    file_workers = 8
+    # Seconds between progress reports from a long cp, mv or rm
+    progress_interval = 1.0
+    # Seconds a cancelled cp, mv or rm is given to stop; a worker stuck in a
+    # system call is left behind after that rather than hanging the session
+    cancel_grace = 5.0
+    # Process list shared by every session's ps and top
+    process_table = ProcessTable(ttl=1.0)
+    # Natural-language interpreter, its cache shared by every session
+    interpreter = default_interpreter()
+    # Lines per output chunk when a builtin streams a long listing
+    stream_batch_size = 1000
+    # Bytes per output chunk when cat streams a file
+    cat_chunk_size = 65536
+    
+    def __init__(self, history: Optional[HistoryStore] = None):
         self.current_dir = os.getcwd()
-        self.history = []
-        self.session = PromptSession(history=InMemoryHistory())
-        self.command_history = []
+        # Commands run in this terminal; kept only in memory unless a store is given
+        self.history = history if history is not None else HistoryStore(':memory:')
+        self.completer = CompletionEngine(self)
+        # Where this session found each external command, like the shell's hash table
+        self.command_hash = CommandHash()
+        self.processes = set()
+        # cp, mv and rm operations running now, which interrupt() cancels
+        self.operations = set()
+        # Time limit of the pipeline being started, for builtins that honour one
+        self.time_limit: Optional[float] = None
+        # The limit the user gave it with 'timeout N', if any; cp, mv and rm
+        # can be cancelled, so they only stop at a limit that was asked for
+        self.explicit_time_limit: Optional[float] = None
+        self.jobs = JobTable(self.job_buffer_size)
+        self.ptys: Dict[int, PtySession] = {}
+        self._pty_ids = itertools.count(1)
+        # Set by the CLI loop; enables output that redraws the screen
+        self.interactive = False
         self.aliases = {
             'll': 'ls -la',
             'la': 'ls -la',
@@ -41,18 +138,10 @@ class TerminalBackend:
             'h': 'history',
             'c': 'clear'
         }
-        
-        # Initialize OpenAI for AI-driven commands (optional)
-        self.openai_client = None
-        try:
-            # You'll need to set OPENAI_API_KEY environment variable
-            if os.getenv('OPENAI_API_KEY'):
-                self.openai_client = openai.OpenAI()
-        except Exception as e:
-            print(f"Warning: OpenAI not available: {e}")
     
     def get_prompt(self) -> str:
         """Generate the terminal prompt with current directory and user info."""
+        from colorama import Fore
         user = os.getenv('USER', os.getenv('USERNAME', 'user'))
         hostname = platform.node()
         cwd = os.path.basename(self.current_dir) if self.current_dir != '/' else '/'
@@ -62,192 +151,735 @@ class TerminalBackend:
         return prompt_text
     
     def parse_command(self, command: str) -> Tuple[str, List[str]]:
-        """Parse command string into command and arguments."""
-        parts = command.strip().split()
-        if not parts:
-            return "", []
-        
-        cmd = parts[0]
-        args = parts[1:] if len(parts) > 1 else []
+        """Parse command string into command and arguments.
         
-        # Handle aliases
-        if cmd in self.aliases:
-            alias_command = self.aliases[cmd]
-            return self.parse_command(alias_command)
+        Returns the words of the first simple command, with aliases expanded.
+        """
+        try:
+            chain = parse(command)
+        except PipelineSyntaxError:
+            return "", []
+        if not chain:
+            return "", []
         
-        return cmd, args
+        argv = self._expand_aliases(chain[0][1][0].argv)
+        return argv[0], argv[1:]
+    
+    def _expand_aliases(self, argv: List[str]) -> List[str]:
+        """Replace a leading alias with its words, keeping the other arguments."""
+        seen = set()
+        while argv and argv[0] in self.aliases and argv[0] not in seen:
+            seen.add(argv[0])
+            argv = split_words(self.aliases[argv[0]]) + argv[1:]
+        return argv
     
     def execute_command(self, command: str) -> Tuple[str, int]:
         """Execute a command and return output and exit code."""
+        return self.stream_command(command).read()
+    
+    def stream_command(self, command: str) -> CommandStream:
+        """Execute a command and return a stream of its output chunks."""
+        return CommandStream(self._run_command(command))
+    
+    def _run_command(self, command: str) -> Generator[str, None, int]:
+        """Run a command line of pipelines joined by ;, && and ||."""
         if not command.strip():
-            return "", 0
+            return 0
         
         # Add to history
-        self.command_history.append(command)
-        self.history.append(command)
+        self.history.add(command)
         
-        cmd, args = self.parse_command(command)
+        try:
+            chain = parse(command)
+        except PipelineSyntaxError as e:
+            yield str(e)
+            return 2
         
-        # Built-in commands
-        if cmd in self.builtin_commands:
-            return self.builtin_commands[cmd](args)
+        exit_code = 0
+        open_line = False
+        for connector, pipeline in chain:
+            if (connector == '&&' and exit_code != 0) or (connector == '||' and exit_code == 0):
+                continue
+            
+            if pipeline.background:
+                stream = CommandStream(self._start_job(pipeline))
+            else:
+                stream = CommandStream(self._run_pipeline(pipeline))
+            try:
+                first = True
+                for chunk in stream:
+                    # Keep each command's output on its own lines
+                    if first and open_line:
+                        yield '\n'
+                    first = False
+                    yield chunk
+                    open_line = not chunk.endswith('\n')
+            finally:
+                stream.close()
+            
+            exit_code = stream.exit_code
+            if exit_code == -1:
+                return exit_code
         
-        # External commands
+        # Report background jobs that finished since the last command
+        notices = self._job_notices()
+        if notices:
+            if open_line:
+                yield '\n'
+            yield '\n'.join(notices)
+        return exit_code
+    
+    def _prepare_stages(self, commands: List[SimpleCommand]) -> Tuple[Optional[float], List[List[str]]]:
+        """Expand aliases in every stage and take off a leading 'timeout SECONDS'.
+        
+        Returns the requested time limit (None if not given, 0 for no limit)
+        and each stage's words.
+        """
+        argvs = [self._expand_aliases(command.argv) for command in commands]
+        first = argvs[0]
+        if len(first) > 2 and first[0] == 'timeout':
+            try:
+                limit = float(first[1])
+            except ValueError:
+                # Not our form, e.g. 'timeout -s KILL 5 cmd'; leave it to the system
+                return None, argvs
+            if limit >= 0:
+                argvs[0] = first[2:]
+                return limit, argvs
+        return None, argvs
+    
+    def _run_pipeline(self, commands: List[SimpleCommand]) -> Generator[str, None, int]:
+        """Run one pipeline and stream the output of its last stage.
+        
+        Adjacent external stages are joined by OS pipes, builtin stages hand
+        their output generator to the next stage, and builtin output feeding
+        an external stage is written into its pipe by a pump thread. Nothing
+        is collected between stages.
+        """
+        limit, argvs = self._prepare_stages(commands)
+        timeout = self.command_timeout if limit is None else limit or None
+        self.time_limit = timeout
+        self.explicit_time_limit = limit or None
+        processes = []
+        resources = []
+        errors = None
+        source = None
+        exit_code = 0
+        last_chunk = ''
         try:
-            result = subprocess.run(
-                [cmd] + args,
-                cwd=self.current_dir,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            return result.stdout + result.stderr, result.returncode
-        except subprocess.TimeoutExpired:
-            return "Command timed out after 30 seconds", 1
-        except FileNotFoundError:
-            return f"Command not found: {cmd}", 1
-        except Exception as e:
-            return f"Error executing command: {str(e)}", 1
-    
-    @property
-    def builtin_commands(self):
-        """Dictionary of built-in commands."""
-        return {
-            'cd': self.cmd_cd,
-            'ls': self.cmd_ls,
-            'pwd': self.cmd_pwd,
-            'mkdir': self.cmd_mkdir,
-            'rm': self.cmd_rm,
-            'rmdir': self.cmd_rmdir,
-            'cp': self.cmd_cp,
-            'mv': self.cmd_mv,
-            'cat': self.cmd_cat,
-            'echo': self.cmd_echo,
-            'clear': self.cmd_clear,
-            'history': self.cmd_history,
-            'ps': self.cmd_ps,
-            'top': self.cmd_top,
-            'df': self.cmd_df,
-            'free': self.cmd_free,
-            'whoami': self.cmd_whoami,
-            'date': self.cmd_date,
-            'uptime': self.cmd_uptime,
-            'help': self.cmd_help,
-            'exit': self.cmd_exit,
-            'quit': self.cmd_exit
-        }
+            for index, command in enumerate(commands):
+                last = index == len(commands) - 1
+                argv = argvs[index]
+                cmd, args = argv[0], argv[1:]
+                
+                # File redirections
+                sink = None
+                redirect = command.stdin
+                try:
+                    if command.stdin is not None:
+                        source = self._open_redirect(command.stdin, 'rb', resources)
+                    redirect = command.stdout
+                    if command.stdout is not None:
+                        sink = self._open_redirect(command.stdout, 'ab' if command.append else 'wb', resources)
+                except OSError as e:
+                    yield f"{redirect}: {e.strerror}"
+                    return 1
+                
+                # Built-in stages
+                if cmd in self.commands:
+                    stream = self._builtin_stream(cmd, args, self._text_input(source, resources))
+                    resources.append(stream)
+                    if sink is not None:
+                        exit_code = self._write_stream(stream, sink)
+                        source = None
+                    elif last:
+                        for chunk in stream:
+                            yield chunk
+                            last_chunk = chunk
+                        exit_code = stream.exit_code
+                    else:
+                        source = CommandStream(self._line_terminated(stream))
+                        resources.append(source)
+                    continue
+                
+                # External stages
+                if last and sink is None:
+                    stdout, stderr = subprocess.PIPE, subprocess.STDOUT
+                elif last:
+                    stdout, stderr = sink, subprocess.PIPE
+                else:
+                    # Earlier stages' errors are shown once the pipeline ends
+                    if errors is None:
+                        errors = tempfile.TemporaryFile()
+                    stdout, stderr = sink if sink is not None else subprocess.PIPE, errors
+                
+                try:
+                    process = self._spawn(argv, source, stdout, stderr)
+                except FileNotFoundError:
+                    yield self.command_not_found(cmd)
+                    return 1
+                except Exception as e:
+                    yield f"Error executing command: {str(e)}"
+                    return 1
+                processes.append(process)
+                source = process.stdout
+                
+                if last:
+                    pipe = process.stdout if sink is None else process.stderr
+                    output = CommandStream(self._stream_process(process, pipe, timeout))
+                    for chunk in output:
+                        yield chunk
+                        last_chunk = chunk
+                    exit_code = output.exit_code
+            
+            # Let earlier stages finish; they end on EOF or a broken pipe
+            for process in processes[:-1]:
+                try:
+                    process.wait(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+            
+            if errors is not None and errors.tell():
+                errors.seek(0)
+                if last_chunk and not last_chunk.endswith('\n'):
+                    yield '\n'
+                yield errors.read().decode('utf-8', errors='replace')
+            
+            return exit_code
+        finally:
+            for process in processes:
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+                self.processes.discard(process)
+            for resource in resources:
+                resource.close()
+            if errors is not None:
+                errors.close()
     
-    def cmd_cd(self, args: List[str]) -> Tuple[str, int]:
-        """Change directory command."""
-        if not args:
-            new_dir = os.path.expanduser("~")
-        else:
-            new_dir = args[0]
+    def _start_job(self, commands: Pipeline) -> Generator[str, None, int]:
+        """Start a pipeline in the background and report its job number.
         
+        Stages are connected as in the foreground, but every stage's output
+        and errors go into one pipe owned by the job, which the shared reaper
+        drains into the job's ring buffer. A builtin last stage is written
+        into that pipe by a pump thread.
+        """
+        limit, argvs = self._prepare_stages(commands)
+        timeout = self.job_timeout if limit is None else limit or None
+        self.time_limit = timeout
+        self.explicit_time_limit = limit or None
+        description = ' | '.join(self._describe_stage(command) for command in commands)
+        processes = []
+        resources = []
+        source = None
+        builtin_stream = None
+        builtin_exit_code = None
+        read_fd, write_fd = os.pipe()
+        job = None
         try:
-            # Handle special directory references
-            if new_dir == "~":
-                new_dir = os.path.expanduser("~")
-            elif new_dir == "-":
-                # Go to previous directory
-                if hasattr(self, 'prev_dir'):
-                    new_dir = self.prev_dir
+            for index, command in enumerate(commands):
+                last = index == len(commands) - 1
+                argv = argvs[index]
+                cmd, args = argv[0], argv[1:]
+                
+                # File redirections
+                sink = None
+                redirect = command.stdin
+                try:
+                    if command.stdin is not None:
+                        source = self._open_redirect(command.stdin, 'rb', resources)
+                    redirect = command.stdout
+                    if command.stdout is not None:
+                        sink = self._open_redirect(command.stdout, 'ab' if command.append else 'wb', resources)
+                except OSError as e:
+                    yield f"{redirect}: {e.strerror}"
+                    return 1
+                
+                # Built-in stages
+                if cmd in self.commands:
+                    stream = self._builtin_stream(cmd, args, self._text_input(source, resources))
+                    resources.append(stream)
+                    if sink is not None:
+                        builtin_exit_code = self._write_stream(stream, sink)
+                        source = None
+                    elif last:
+                        builtin_stream = stream
+                    else:
+                        source = CommandStream(self._line_terminated(stream))
+                        resources.append(source)
+                    continue
+                
+                # External stages
+                if sink is not None:
+                    stdout = sink
                 else:
-                    return "No previous directory", 1
+                    stdout = write_fd if last else subprocess.PIPE
+                try:
+                    process = self._spawn(argv, source, stdout, write_fd)
+                except FileNotFoundError:
+                    yield self.command_not_found(cmd)
+                    return 1
+                except Exception as e:
+                    yield f"Error executing command: {str(e)}"
+                    return 1
+                # The job owns its processes from here on
+                self.processes.discard(process)
+                processes.append(process)
+                source = process.stdout
             
-            # Store current directory as previous
-            self.prev_dir = self.current_dir
+            job = self.jobs.start(description, processes, read_fd, timeout, resources)
+            job.builtin_exit_code = builtin_exit_code
+            if builtin_stream is not None:
+                threading.Thread(target=self._feed_job, args=(job, builtin_stream, write_fd), daemon=True).start()
+            else:
+                os.close(write_fd)
             
-            # Change directory
-            os.chdir(new_dir)
-            self.current_dir = os.getcwd()
-            return "", 0
-        except FileNotFoundError:
-            return f"Directory not found: {new_dir}", 1
-        except PermissionError:
-            return f"Permission denied: {new_dir}", 1
-        except Exception as e:
-            return f"Error changing directory: {str(e)}", 1
+            yield f"[{job.id}] {job.pids[-1]}" if job.pids else f"[{job.id}]"
+            return 0
+        finally:
+            if job is None:
+                for process in processes:
+                    if process.poll() is None:
+                        process.kill()
+                        process.wait()
+                for resource in resources:
+                    resource.close()
+                os.close(read_fd)
+                os.close(write_fd)
+    
+    @staticmethod
+    def _describe_stage(command: SimpleCommand) -> str:
+        """Rebuild a pipeline stage's command text for job listings."""
+        words = [shlex.quote(word) for word in command.argv]
+        if command.stdin is not None:
+            words += ['<', shlex.quote(command.stdin)]
+        if command.stdout is not None:
+            words += ['>>' if command.append else '>', shlex.quote(command.stdout)]
+        return ' '.join(words)
+    
+    def _feed_job(self, job: Job, stream: CommandStream, write_fd: int):
+        """Write a background job's builtin output into the job's pipe."""
+        try:
+            with open(write_fd, 'wb') as pipe:
+                for chunk in stream:
+                    pipe.write(chunk.encode('utf-8'))
+                job.builtin_exit_code = stream.exit_code
+        except (OSError, ValueError):
+            pass
+        finally:
+            stream.close()
+    
+    def _open_redirect(self, path: str, mode: str, resources: list):
+        """Open a redirection target relative to the session directory."""
+        redirect = open(self.resolve_path(path), mode)
+        resources.append(redirect)
+        return redirect
+    
+    def _builtin_stream(self, cmd: str, args: List[str], stdin: Optional[CommandStream]) -> CommandStream:
+        """Run a builtin as a pipeline stage."""
+        command = self.commands.get(cmd)
+        if command.stream is not None:
+            return CommandStream(command.stream(self, args, stdin))
+        return CommandStream(self._builtin_output(command, args))
+    
+    def _builtin_output(self, command: Builtin, args: List[str]) -> Generator[str, None, int]:
+        """Adapt a builtin that returns its whole output to the stream interface."""
+        output, exit_code = command.run(self, args)
+        if output:
+            yield output
+        return exit_code
+    
+    def _line_terminated(self, stream: CommandStream) -> Generator[str, None, int]:
+        """Relay builtin output, ending it with a newline as files and pipes expect."""
+        last_chunk = ''
+        try:
+            for chunk in stream:
+                yield chunk
+                last_chunk = chunk
+        finally:
+            stream.close()
+        if last_chunk and not last_chunk.endswith('\n'):
+            yield '\n'
+        return stream.exit_code
+    
+    def _write_stream(self, stream: CommandStream, sink) -> int:
+        """Write builtin output to a redirection target and return its exit code."""
+        terminated = CommandStream(self._line_terminated(stream))
+        for chunk in terminated:
+            sink.write(chunk.encode('utf-8'))
+        return terminated.exit_code
+    
+    def _text_input(self, source, resources: list) -> Optional[CommandStream]:
+        """Present a stage's input to a builtin as a stream of text chunks."""
+        if source is None or isinstance(source, CommandStream):
+            return source
+        resources.append(source)
+        return CommandStream(self._read_text(source))
+    
+    def _read_text(self, pipe) -> Generator[str, None, int]:
+        """Decode a binary pipe or file as it is read."""
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        while True:
+            data = os.read(pipe.fileno(), self.stream_chunk_size)
+            if not data:
+                break
+            text = decoder.decode(data)
+            if text:
+                yield text
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+        return 0
+    
+    def _spawn(self, argv: List[str], stdin, stdout, stderr) -> subprocess.Popen:
+        """Start an external pipeline stage.
+        
+        stdin is None, a binary file or pipe, or a CommandStream of builtin
+        output, which a pump thread writes into a fresh OS pipe.
+        """
+        read_fd = write_fd = None
+        if stdin is None:
+            stdin_arg = subprocess.DEVNULL
+        elif isinstance(stdin, CommandStream):
+            read_fd, write_fd = os.pipe()
+            stdin_arg = read_fd
+        else:
+            stdin_arg = stdin
+        
+        try:
+            process = subprocess.Popen(
+                argv,
+                executable=self.resolve_command(argv[0]),
+                cwd=self.current_dir,
+                stdin=stdin_arg,
+                stdout=stdout,
+                stderr=stderr,
+                bufsize=0
+            )
+        except Exception:
+            if read_fd is not None:
+                os.close(read_fd)
+                os.close(write_fd)
+            raise
+        
+        self.processes.add(process)
+        if read_fd is not None:
+            os.close(read_fd)
+            threading.Thread(target=self._feed_pipe, args=(stdin, write_fd), daemon=True).start()
+        elif stdin is not None:
+            # The child holds its own copy; closing ours lets upstream see EOF and SIGPIPE
+            stdin.close()
+        return process
+    
+    def _feed_pipe(self, stream: CommandStream, write_fd: int):
+        """Write builtin output into an external stage's stdin until it stops reading."""
+        try:
+            with open(write_fd, 'wb') as pipe:
+                for chunk in stream:
+                    pipe.write(chunk.encode('utf-8'))
+        except (OSError, ValueError):
+            pass
+        finally:
+            stream.close()
+    
+    def _stream_process(self, process: subprocess.Popen, pipe=None,
+                        timeout: Optional[float] = None) -> Generator[str, None, int]:
+        """Relay a child process's output (its stdout unless pipe is given) as it is produced.
+        
+        A reader thread moves raw pipe reads into a bounded queue, so at most
+        ``stream_queue_size`` chunks are held in memory and a slow consumer
+        stalls the child on a full pipe instead of growing a buffer. The child
+        is killed after timeout seconds; None means no limit.
+        """
+        pipe = process.stdout if pipe is None else pipe
+        chunks = queue.Queue(maxsize=self.stream_queue_size)
+        reader = threading.Thread(
+            target=self._pump_pipe,
+            args=(pipe, chunks),
+            daemon=True
+        )
+        reader.start()
+        
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            while True:
+                remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+                try:
+                    data = chunks.get(timeout=remaining)
+                except queue.Empty:
+                    process.kill()
+                    process.wait()
+                    yield f"Command timed out after {timeout:g} seconds"
+                    return 124
+                
+                if data is None:
+                    break
+                text = decoder.decode(data)
+                if text:
+                    yield text
+            
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                yield tail
+            return exit_status(process.wait())
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            # Unblock the reader if it is waiting on a full queue. A grandchild
+            # may still hold the pipe open, so only wait a moment for it.
+            grace = time.monotonic() + 1
+            while reader.is_alive() and time.monotonic() < grace:
+                try:
+                    chunks.get_nowait()
+                except queue.Empty:
+                    reader.join(0.05)
+            if not reader.is_alive():
+                pipe.close()
+    
+    def interrupt(self) -> int:
+        """Stop the foreground command, as Ctrl+C would; return how many things were interrupted.
+        
+        Running cp, mv and rm operations are cancelled and foreground
+        child processes are sent SIGINT (terminated on Windows).
+        """
+        interrupted = 0
+        for operation in list(self.operations):
+            operation.cancel()
+            interrupted += 1
+        for process in list(self.processes):
+            try:
+                if os.name == 'nt':
+                    process.terminate()
+                else:
+                    process.send_signal(signal.SIGINT)
+                interrupted += 1
+            except OSError:
+                pass
+        return interrupted
+    
+    def close(self):
+        """Stop any cp, mv or rm and kill the child processes and background jobs this session is still running."""
+        operations = list(self.operations)
+        for operation in operations:
+            operation.cancel('session closed')
+        # Workers stop after their current chunk; let them, so none keeps writing for a closed session
+        for operation in operations:
+            operation.wait(5)
+        for process in list(self.processes):
+            try:
+                process.kill()
+            except OSError:
+                pass
+        self.jobs.close()
+        for pty_id in list(self.ptys):
+            self.close_pty(pty_id)
+        self.history.flush()
     
+    def needs_pty(self, command: str) -> Optional[List[str]]:
+        """Return the words of command if it should run on a pseudo-terminal.
+        
+        That is a single command without redirections that is a known
+        terminal program, an interpreter started without arguments, or is
+        explicitly prefixed with 'pty'.
+        """
+        if not PTY_SUPPORTED:
+            return None
+        try:
+            chain = parse(command)
+        except PipelineSyntaxError:
+            return None
+        if len(chain) != 1 or len(chain[0][1]) != 1 or chain[0][1].background:
+            return None
+        stage = chain[0][1][0]
+        if stage.stdin is not None or stage.stdout is not None:
+            return None
+        
+        argv = self._expand_aliases(stage.argv)
+        if argv[0] == 'pty':
+            return argv[1:] or None
+        name = os.path.basename(argv[0])
+        if name in self.pty_programs or (name in self.repl_programs and len(argv) == 1):
+            return argv
+        return None
+    
+    def open_pty(self, command: str, argv: List[str], rows: int = 24, cols: int = 80) -> Tuple[int, PtySession]:
+        """Start argv on a new pseudo-terminal and return (id, session)."""
+        self.history.add(command)
+        pty_session = PtySession(argv, self.current_dir, rows, cols, executable=self.resolve_command(argv[0]))
+        pty_id = next(self._pty_ids)
+        self.ptys[pty_id] = pty_session
+        return pty_id, pty_session
+    
+    def close_pty(self, pty_id: int) -> Optional[int]:
+        """Hang up a pseudo-terminal session and return its program's exit code."""
+        pty_session = self.ptys.pop(pty_id, None)
+        if pty_session is None:
+            return None
+        return pty_session.close()
+    
+    def _pump_pipe(self, pipe, chunks: queue.Queue):
+        """Copy raw reads from a pipe into a queue, ending with None."""
+        try:
+            while True:
+                data = os.read(pipe.fileno(), self.stream_chunk_size)
+                if not data:
+                    break
+                chunks.put(data)
+        except (OSError, ValueError):
+            pass
+        finally:
+            chunks.put(None)
+    
+    def resolve_command(self, name: str) -> str:
+        """Return the absolute path of the program a command name runs.
+        
+        Bare names are looked up in the session's hash table, so $PATH is
+        not searched again for every spawn; names containing a directory
+        are taken relative to the working directory.
+        Raises FileNotFoundError for a name that is not on $PATH.
+        """
+        if '/' in name or os.sep in name:
+            return self.resolve_path(name)
+        path = self.command_hash.lookup(name)
+        if path is None:
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), name)
+        return path
+    
+    def command_not_found(self, name: str) -> str:
+        """Report an unknown command, suggesting close matches."""
+        message = f"Command not found: {name}"
+        if '/' not in name and os.sep not in name:
+            matches = path_index.suggest(name, itertools.chain(self.commands, self.aliases))
+            if matches:
+                message += f"\nDid you mean: {', '.join(matches)}?"
+        return message
+    
+    def resolve_path(self, path: str) -> str:
+        """Resolve a path against this session's working directory.
+        
+        Sessions never change the process-wide working directory, so every
+        path a builtin touches must be made absolute here first.
+        """
+        return os.path.normpath(os.path.join(self.current_dir, os.path.expanduser(path)))
+    
+    @builtin(section='File Operations', synopsis='ls, ll, la', help="List directory contents (--offset N, --limit N to page)", pure=True)
     def cmd_ls(self, args: List[str]) -> Tuple[str, int]:
         """List directory contents."""
+        return CommandStream(self.stream_ls(args)).read()
+    
+    @streams('ls')
+    def stream_ls(self, args: List[str], stdin: Optional[CommandStream] = None) -> Generator[str, None, int]:
+        """List directory contents in batches of lines.
+        
+        Supports --offset N and --limit N to page through large directories.
+        """
+        # Parse arguments
+        show_all = long_format = human_readable = False
+        offset, limit = 0, None
+        target_dir = self.current_dir
+        
+        options = iter(args)
+        try:
+            for arg in options:
+                if arg == '--all':
+                    show_all = True
+                elif arg == '--long':
+                    long_format = True
+                elif arg == '--human-readable':
+                    human_readable = True
+                elif arg == '--offset':
+                    offset = int(next(options))
+                elif arg == '--limit':
+                    limit = int(next(options))
+                elif arg.startswith('-') and len(arg) > 1 and not arg.startswith('--'):
+                    show_all = show_all or 'a' in arg
+                    long_format = long_format or 'l' in arg
+                    human_readable = human_readable or 'h' in arg
+                elif not arg.startswith('-'):
+                    target_dir = arg
+        except (StopIteration, ValueError):
+            yield "ls: --offset and --limit require a number"
+            return 1
+        
         try:
-            # Parse arguments
-            show_all = '-a' in args or '--all' in args
-            long_format = '-l' in args or '--long' in args
-            human_readable = '-h' in args or '--human-readable' in args
-            
-            # Determine target directory
-            target_dir = args[-1] if args and not args[-1].startswith('-') else self.current_dir
-            
             # Get directory contents
-            items = os.listdir(target_dir)
-            if not show_all:
-                items = [item for item in items if not item.startswith('.')]
-            
-            items.sort()
-            
-            if long_format:
-                return self._format_long_listing(items, target_dir, human_readable), 0
-            else:
-                return '\n'.join(items), 0
-                
+            entries = sorted_page(iter_entries(self.resolve_path(target_dir), show_all), offset, limit)
         except FileNotFoundError:
-            return f"Directory not found: {target_dir}", 1
+            yield f"Directory not found: {target_dir}"
+            return 1
         except PermissionError:
-            return f"Permission denied: {target_dir}", 1
+            yield f"Permission denied: {target_dir}"
+            return 1
         except Exception as e:
-            return f"Error listing directory: {str(e)}", 1
+            yield f"Error listing directory: {str(e)}"
+            return 1
+        
+        if long_format:
+            # Each entry is stat'ed once; DirEntry caches the result
+            stats = [entry_stat(entry) for entry in entries]
+            total_size = sum(entry_stat.st_size for entry_stat in stats if entry_stat)
+            total_str = self._format_size(total_size) if human_readable else str(total_size)
+            yield f"total {total_str}"
+            
+            lines = (
+                self._format_long_entry(entry, entry_stat, human_readable)
+                for entry, entry_stat in zip(entries, stats)
+            )
+            yield from self._batch_lines(lines, after_output=True)
+        else:
+            yield from self._batch_lines((entry.name for entry in entries), after_output=False)
+        return 0
     
-    def _format_long_listing(self, items: List[str], target_dir: str, human_readable: bool) -> str:
-        """Format directory listing in long format."""
-        lines = []
-        total_size = 0
+    def _batch_lines(self, lines: Iterator[str], after_output: bool) -> Iterator[str]:
+        """Join lines into chunks of stream_batch_size, newline-separated from earlier output."""
+        batch = []
+        for line in lines:
+            batch.append(line)
+            if len(batch) >= self.stream_batch_size:
+                yield ('\n' if after_output else '') + '\n'.join(batch)
+                after_output = True
+                batch = []
+        if batch:
+            yield ('\n' if after_output else '') + '\n'.join(batch)
+    
+    def _format_long_entry(self, entry: os.DirEntry, entry_stat: Optional[os.stat_result],
+                           human_readable: bool) -> str:
+        """Format one directory entry in long format."""
+        if entry_stat is None:
+            return f"?????????? ????????? {entry.name}"
         
-        for item in items:
-            item_path = os.path.join(target_dir, item)
-            try:
-                stat = os.stat(item_path)
-                size = stat.st_size
-                total_size += size
-                
-                # Format permissions
-                mode = stat.st_mode
-                permissions = self._format_permissions(mode)
-                
-                # Format size
-                if human_readable:
-                    size_str = self._format_size(size)
-                else:
-                    size_str = str(size)
-                
-                # Format date
-                mtime = time.ctime(stat.st_mtime)
-                
-                # Determine if it's a directory
-                is_dir = os.path.isdir(item_path)
-                item_name = item + '/' if is_dir else item
-                
-                lines.append(f"{permissions} {size_str:>8} {mtime} {item_name}")
-                
-            except (OSError, IOError):
-                lines.append(f"?????????? ????????? {item}")
+        # Format permissions
+        permissions = self._format_permissions(entry_stat.st_mode)
         
-        # Add total line
+        # Format size
         if human_readable:
-            total_str = self._format_size(total_size)
+            size_str = self._format_size(entry_stat.st_size)
         else:
-            total_str = str(total_size)
+            size_str = str(entry_stat.st_size)
+        
+        # Format date
+        mtime = self._format_mtime(int(entry_stat.st_mtime))
         
-        result = f"total {total_str}\n" + '\n'.join(lines)
-        return result
+        # Directories are recognised from the same stat data
+        item_name = entry.name + '/' if stat.S_ISDIR(entry_stat.st_mode) else entry.name
+        
+        return f"{permissions} {size_str:>8} {mtime} {item_name}"
+    
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _format_mtime(mtime: int) -> str:
+        """Format a modification time; files written together share the result."""
+        return time.ctime(mtime)
     
     def _format_permissions(self, mode: int) -> str:
         """Format file permissions."""
         permissions = []
         
         # File type
-        if os.path.isdir(mode):
+        if stat.S_ISDIR(mode):
             permissions.append('d')
         else:
             permissions.append('-')
@@ -277,10 +909,52 @@ class TerminalBackend:
             size /= 1024.0
         return f"{size:.1f}PB"
     
+    @builtin(section='File Operations', help="Change directory", completion='directories')
+    def cmd_cd(self, args: List[str]) -> Tuple[str, int]:
+        """Change directory command."""
+        if not args:
+            new_dir = os.path.expanduser("~")
+        else:
+            new_dir = args[0]
+        
+        try:
+            # Handle special directory references
+            if new_dir == "~":
+                new_dir = os.path.expanduser("~")
+            elif new_dir == "-":
+                # Go to previous directory
+                if hasattr(self, 'prev_dir'):
+                    new_dir = self.prev_dir
+                else:
+                    return "No previous directory", 1
+            
+            target_dir = self.resolve_path(new_dir)
+            if not os.path.isdir(target_dir):
+                if os.path.exists(target_dir):
+                    return f"Not a directory: {new_dir}", 1
+                raise FileNotFoundError(new_dir)
+            if not os.access(target_dir, os.X_OK):
+                raise PermissionError(new_dir)
+            
+            # Store current directory as previous
+            self.prev_dir = self.current_dir
+            
+            # Change this session's directory only; the process cwd is shared
+            self.current_dir = target_dir
+            return "", 0
+        except FileNotFoundError:
+            return f"Directory not found: {new_dir}", 1
+        except PermissionError:
+            return f"Permission denied: {new_dir}", 1
+        except Exception as e:
+            return f"Error changing directory: {str(e)}", 1
+    
+    @builtin(section='File Operations', help="Print working directory", completion='none', pure=True)
     def cmd_pwd(self, args: List[str]) -> Tuple[str, int]:
         """Print working directory."""
         return self.current_dir, 0
     
+    @builtin(section='File Operations', help="Create directory")
     def cmd_mkdir(self, args: List[str]) -> Tuple[str, int]:
         """Create directory."""
         if not args:
@@ -288,7 +962,7 @@ class TerminalBackend:
         
         for dir_name in args:
             try:
-                os.makedirs(dir_name, exist_ok=True)
+                os.makedirs(self.resolve_path(dir_name), exist_ok=True)
             except PermissionError:
                 return f"Permission denied: {dir_name}", 1
             except Exception as e:
@@ -296,36 +970,63 @@ class TerminalBackend:
         
         return "", 0
     
+    @builtin(section='File Operations', help="Remove files/directories")
     def cmd_rm(self, args: List[str]) -> Tuple[str, int]:
         """Remove files or directories."""
+        return CommandStream(self.stream_rm(args)).read()
+    
+    @streams('rm')
+    def stream_rm(self, args: List[str], stdin: Optional[CommandStream] = None) -> Generator[str, None, int]:
+        """Remove files, and directory trees with -r, reporting progress while it takes long."""
+        # Not a generator itself, so the operation gets the time limit in force as its stage starts
+        return self._remove(args, self._file_operation('rm'))
+    
+    def _remove(self, args: List[str], operation: FileOperation) -> Generator[str, None, int]:
         if not args:
-            return "rm: missing operand", 1
+            yield "rm: missing operand"
+            return 1
         
-        recursive = '-r' in args or '-R' in args or '--recursive' in args
-        force = '-f' in args or '--force' in args
-        
-        # Remove flag arguments
-        files = [arg for arg in args if not arg.startswith('-')]
+        recursive = force = False
+        files = []
+        for arg in args:
+            if arg == '--recursive':
+                recursive = True
+            elif arg == '--force':
+                force = True
+            elif arg.startswith('-') and len(arg) > 1 and not arg.startswith('--'):
+                # Combined short flags, e.g. -rf
+                recursive = recursive or 'r' in arg or 'R' in arg
+                force = force or 'f' in arg
+            elif not arg.startswith('-'):
+                files.append(arg)
         
+        targets = []
         for file_path in files:
-            try:
-                if os.path.isdir(file_path):
-                    if recursive:
-                        shutil.rmtree(file_path)
-                    else:
-                        return f"rm: cannot remove '{file_path}': Is a directory", 1
-                else:
-                    os.remove(file_path)
-            except FileNotFoundError:
+            target = self.resolve_path(file_path)
+            if not os.path.lexists(target):
                 if not force:
-                    return f"rm: cannot remove '{file_path}': No such file or directory", 1
-            except PermissionError:
-                return f"rm: cannot remove '{file_path}': Permission denied", 1
-            except Exception as e:
-                return f"rm: cannot remove '{file_path}': {str(e)}", 1
+                    yield f"rm: cannot remove '{file_path}': No such file or directory"
+                    return 1
+            elif is_directory(target) and not recursive:
+                yield f"rm: cannot remove '{file_path}': Is a directory"
+                return 1
+            else:
+                targets.append(target)
         
-        return "", 0
+        def work(operation: FileOperation):
+            for target in targets:
+                try:
+                    if is_directory(target):
+                        remove_tree(target, operation)
+                    else:
+                        os.unlink(target)
+                        operation.count(files=1)
+                except OSError as e:
+                    operation.fail('remove', target, e)
+        
+        return (yield from self._follow_operation(operation, work))
     
+    @builtin(section='File Operations', help="Remove empty directories", completion='directories')
     def cmd_rmdir(self, args: List[str]) -> Tuple[str, int]:
         """Remove empty directories."""
         if not args:
@@ -333,7 +1034,7 @@ class TerminalBackend:
         
         for dir_name in args:
             try:
-                os.rmdir(dir_name)
+                os.rmdir(self.resolve_path(dir_name))
             except FileNotFoundError:
                 return f"rmdir: failed to remove '{dir_name}': No such file or directory", 1
             except OSError as e:
@@ -341,136 +1042,574 @@ class TerminalBackend:
         
         return "", 0
     
+    @builtin(section='File Operations', help="Copy files/directories")
     def cmd_cp(self, args: List[str]) -> Tuple[str, int]:
         """Copy files or directories."""
+        return CommandStream(self.stream_cp(args)).read()
+    
+    @streams('cp')
+    def stream_cp(self, args: List[str], stdin: Optional[CommandStream] = None) -> Generator[str, None, int]:
+        """Copy files, and directory trees with -r, reporting progress while it takes long."""
+        return self._copy(args, self._file_operation('cp'))
+    
+    def _copy(self, args: List[str], operation: FileOperation) -> Generator[str, None, int]:
         if len(args) < 2:
-            return "cp: missing file operand", 1
+            yield "cp: missing file operand"
+            return 1
         
-        recursive = '-r' in args or '-R' in args or '--recursive' in args
-        files = [arg for arg in args if not arg.startswith('-')]
+        recursive = False
+        files = []
+        for arg in args:
+            if arg == '--recursive':
+                recursive = True
+            elif arg.startswith('-') and len(arg) > 1 and not arg.startswith('--'):
+                # Combined short flags, e.g. -rv
+                recursive = recursive or 'r' in arg or 'R' in arg
+            elif not arg.startswith('-'):
+                files.append(arg)
         
         if len(files) < 2:
-            return "cp: missing destination file operand after 'source'", 1
+            yield "cp: missing destination file operand after 'source'"
+            return 1
         
-        source = files[0]
-        destination = files[1]
+        # Like the shell's cp, the last operand is the destination and an existing directory receives copies
+        *sources, destination = files
+        destination_path = self.resolve_path(destination)
+        into = os.path.isdir(destination_path)
+        if len(sources) > 1 and not into:
+            yield f"cp: target '{destination}' is not a directory"
+            return 1
         
-        try:
-            if os.path.isdir(source):
-                if recursive:
-                    shutil.copytree(source, destination)
-                else:
-                    return f"cp: -r not specified; omitting directory '{source}'", 1
+        plan = []
+        for source in sources:
+            source_path = self.resolve_path(source)
+            target = os.path.join(destination_path, os.path.basename(source_path)) if into else destination_path
+            if not os.path.exists(source_path):
+                yield f"cp: cannot stat '{source}': No such file or directory"
+                return 1
+            if os.path.isdir(source_path):
+                if not recursive:
+                    yield f"cp: -r not specified; omitting directory '{source}'"
+                    return 1
+                if target == source_path or target.startswith(source_path + os.sep):
+                    yield f"cp: cannot copy a directory, '{source}', into itself, '{destination}'"
+                    return 1
+                plan.append((copy_tree, source_path, target))
+            elif os.path.exists(target) and os.path.samefile(source_path, target):
+                yield f"cp: '{source}' and '{os.path.join(destination, os.path.basename(source_path)) if into else destination}' are the same file"
+                return 1
             else:
-                shutil.copy2(source, destination)
-        except FileNotFoundError:
-            return f"cp: cannot stat '{source}': No such file or directory", 1
-        except PermissionError:
-            return f"cp: cannot create '{destination}': Permission denied", 1
-        except Exception as e:
-            return f"cp: {str(e)}", 1
+                plan.append((copy_file, source_path, target))
         
-        return "", 0
+        def work(operation: FileOperation):
+            for copy, source_path, target in plan:
+                try:
+                    copy(source_path, target, operation)
+                except OSError as e:
+                    operation.fail('copy', e.filename or source_path, e)
+        
+        return (yield from self._follow_operation(operation, work))
     
+    @builtin(section='File Operations', help="Move/rename files/directories")
     def cmd_mv(self, args: List[str]) -> Tuple[str, int]:
         """Move or rename files or directories."""
+        return CommandStream(self.stream_mv(args)).read()
+    
+    @streams('mv')
+    def stream_mv(self, args: List[str], stdin: Optional[CommandStream] = None) -> Generator[str, None, int]:
+        """Move or rename; across filesystems, copy and remove with progress."""
+        return self._move(args, self._file_operation('mv'))
+    
+    def _move(self, args: List[str], operation: FileOperation) -> Generator[str, None, int]:
         if len(args) < 2:
-            return "mv: missing file operand", 1
+            yield "mv: missing file operand"
+            return 1
         
         source = args[0]
         destination = args[1]
+        source_path = self.resolve_path(source)
+        target = self.resolve_path(destination)
+        if not os.path.lexists(source_path):
+            yield f"mv: cannot stat '{source}': No such file or directory"
+            return 1
+        if os.path.isdir(target):
+            target = os.path.join(target, os.path.basename(source_path))
+            if os.path.lexists(target):
+                yield f"mv: cannot move '{source}': Destination path '{destination}' already exists"
+                return 1
         
+        def work(operation: FileOperation):
+            try:
+                move(source_path, target, operation)
+            except OSError as e:
+                operation.fail('move', e.filename or source_path, e)
+        
+        return (yield from self._follow_operation(operation, work))
+    
+    def _file_operation(self, verb: str) -> FileOperation:
+        """Start tracking a cp, mv or rm, limited only by a 'timeout N' given for the pipeline."""
+        return FileOperation(verb, self.file_workers, self.explicit_time_limit, self.current_dir)
+    
+    def _follow_operation(self, operation: FileOperation, work) -> Generator[str, None, int]:
+        """Run work(operation) in the background, reporting progress until it ends, and return its exit code.
+        
+        Nothing is reported for an operation that finishes within
+        ``progress_interval``. Interrupting (Ctrl+C, interrupt()) or closing
+        the stream cancels the work; the workers stop after their current
+        chunk.
+        """
+        # The CLI redraws one progress line; the web terminal gets a line per report
+        start, end = ('\r', '') if self.interactive else ('', '\n')
+        self.operations.add(operation)
+        operation.start(work)
+        reported = False
         try:
-            shutil.move(source, destination)
-        except FileNotFoundError:
-            return f"mv: cannot stat '{source}': No such file or directory", 1
-        except PermissionError:
-            return f"mv: cannot create '{destination}': Permission denied", 1
-        except Exception as e:
-            return f"mv: {str(e)}", 1
+            while not operation.wait(self.progress_interval):
+                if operation.cancelled:
+                    break
+                yield start + operation.progress() + end
+                reported = True
+        except KeyboardInterrupt:
+            # Ctrl+C in the CLI stops the operation, as it would in a shell
+            operation.cancel()
+        finally:
+            if not operation.wait(0):
+                operation.cancel()
+                operation.wait(self.cancel_grace)
+            self.operations.discard(operation)
         
-        return "", 0
+        lines = [start + operation.progress()] if reported else []
+        lines += [f"{operation.verb}: {error}" for error in operation.errors]
+        if operation.failures > len(operation.errors):
+            lines.append(f"{operation.verb}: {operation.failures - len(operation.errors)} more errors")
+        if operation.reason:
+            lines.append(f"{operation.verb}: {operation.reason}")
+        if lines:
+            yield '\n'.join(lines)
+        if operation.reason:
+            return 124 if operation.expired else 130
+        return 1 if operation.failures else 0
     
+    @builtin(section='File Operations', help="Display file contents (--range START:END, --head N, --tail N)", pure=True)
     def cmd_cat(self, args: List[str]) -> Tuple[str, int]:
         """Display file contents."""
-        if not args:
-            return "cat: missing operand", 1
+        return CommandStream(self.stream_cat(args)).read()
+    
+    @streams('cat')
+    def stream_cat(self, args: List[str], stdin: Optional[CommandStream] = None) -> Generator[str, None, int]:
+        """Display file contents in chunks read from a memory map.
         
-        output = []
-        for file_path in args:
+        Supports --range START:END for a byte range, and --head N or --tail N
+        to limit output to the first or last N lines. Files that cannot be
+        mapped, such as those in /proc, are read instead. With no files,
+        cat passes its pipeline input through.
+        """
+        byte_range = head = tail = None
+        files = []
+        
+        options = iter(args)
+        try:
+            for arg in options:
+                if arg == '--range':
+                    start, _, end = next(options).partition(':')
+                    byte_range = (int(start or 0), int(end) if end else None)
+                elif arg == '--head':
+                    head = int(next(options))
+                elif arg == '--tail':
+                    tail = int(next(options))
+                else:
+                    files.append(arg)
+        except (StopIteration, ValueError):
+            yield "cat: usage: cat [--range START:END] [--head N] [--tail N] FILE..."
+            return 1
+        
+        if not files:
+            if stdin is None:
+                yield "cat: missing operand"
+                return 1
+            yield from stdin
+            return 0
+        
+        for index, file_path in enumerate(files):
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    output.append(f.read())
+                with FileView(self.resolve_path(file_path)) as view:
+                    if view.is_binary():
+                        yield f"cat: {file_path}: binary file ({view.size} bytes) not shown"
+                        return 1
+                    
+                    start, end = 0, view.size
+                    if byte_range:
+                        start, end = byte_range[0], byte_range[1] if byte_range[1] is not None else view.size
+                    if head is not None:
+                        end = min(end, view.head_offset(head))
+                    if tail is not None:
+                        start = max(start, view.tail_offset(tail))
+                    
+                    if index:
+                        yield '\n'
+                    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+                    for chunk in view.chunks(start, end, self.cat_chunk_size):
+                        text = decoder.decode(chunk)
+                        if text:
+                            yield text
+                    tail_text = decoder.decode(b'', final=True)
+                    if tail_text:
+                        yield tail_text
             except FileNotFoundError:
-                return f"cat: {file_path}: No such file or directory", 1
+                yield f"cat: {file_path}: No such file or directory"
+                return 1
             except PermissionError:
-                return f"cat: {file_path}: Permission denied", 1
+                yield f"cat: {file_path}: Permission denied"
+                return 1
             except Exception as e:
-                return f"cat: {file_path}: {str(e)}", 1
+                yield f"cat: {file_path}: {str(e)}"
+                return 1
         
-        return '\n'.join(output), 0
+        return 0
     
+    @builtin(section='File Operations', help="Echo arguments", pure=True)
     def cmd_echo(self, args: List[str]) -> Tuple[str, int]:
         """Echo arguments."""
         return ' '.join(args), 0
     
+    @builtin(help="Clear screen", completion='none')
     def cmd_clear(self, args: List[str]) -> Tuple[str, int]:
         """Clear the screen."""
         os.system('cls' if os.name == 'nt' else 'clear')
         return "", 0
     
+    @builtin(help="Show command history (COUNT, -p PREFIX, -s TEXT, -f FUZZY, -c to clear)", completion='none')
     def cmd_history(self, args: List[str]) -> Tuple[str, int]:
-        """Show command history."""
-        if not self.command_history:
+        """Show, search or clear command history."""
+        usage = "history: usage: history [COUNT] | -p PREFIX | -s TEXT | -f TEXT | -c"
+        if args and args[0] == '-c':
+            self.history.clear()
+            return "", 0
+        
+        if args and args[0] in ('-p', '-s', '-f'):
+            if len(args) < 2:
+                return usage, 2
+            text = ' '.join(args[1:])
+            search = {'-p': self.history.prefix, '-s': self.history.substring, '-f': self.history.fuzzy}[args[0]]
+            matches = search(text, 20)
+            if not matches:
+                return f"history: no match for '{text}'", 1
+            return '\n'.join(matches), 0
+        
+        count = 20
+        if args:
+            try:
+                count = int(args[0])
+            except ValueError:
+                return usage, 2
+        
+        entries = self.history.recent(count)
+        if not entries:
             return "No commands in history", 0
+        return '\n'.join(f"{entry_id:4d}  {cmd}" for entry_id, cmd in entries), 0
+    
+    @builtin(help="Show remembered command paths (-r to forget them, -t NAME to look one up)", completion='commands')
+    def cmd_hash(self, args: List[str]) -> Tuple[str, int]:
+        """Show or change where this session finds external commands."""
+        usage = "hash: usage: hash [-r] [-d NAME] [-t NAME ...] [NAME ...]"
+        if not args:
+            entries = self.command_hash.entries()
+            if not entries:
+                return "hash: hash table empty", 0
+            return 'hits\tcommand\n' + '\n'.join(f"{hits:4d}\t{path}" for _, path, hits in entries), 0
         
-        history_output = []
-        for i, cmd in enumerate(self.command_history[-20:], 1):  # Show last 20 commands
-            history_output.append(f"{i:4d}  {cmd}")
+        if args[0] == '-r':
+            self.command_hash.forget()
+            return "", 0
+        if args[0] == '-d':
+            if len(args) < 2:
+                return usage, 2
+            missing = [name for name in args[1:] if not self.command_hash.forget(name)]
+            return '\n'.join(f"hash: {name}: not found" for name in missing), 1 if missing else 0
         
-        return '\n'.join(history_output), 0
+        show = args[0] == '-t'
+        names = args[1:] if show else args
+        if not names or any(name.startswith('-') for name in names):
+            return usage, 2
+        output = []
+        exit_code = 0
+        for name in names:
+            path = self.command_hash.remember(name)
+            if path is None:
+                output.append(f"hash: {name}: not found")
+                exit_code = 1
+            elif show:
+                output.append(path if len(names) == 1 else f"{name}\t{path}")
+        return '\n'.join(output), exit_code
     
+    @builtin(section='System Information', help="Show running processes", completion='none', pure=True)
     def cmd_ps(self, args: List[str]) -> Tuple[str, int]:
         """Show running processes."""
         try:
             processes = []
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
-                try:
-                    proc_info = proc.info
-                    processes.append(f"{proc_info['pid']:6d} {proc_info['name']:20s} {proc_info['cpu_percent']:6.1f}% {proc_info['memory_percent']:6.1f}%")
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
+            for proc_info in sorted(self.process_table.rows(), key=lambda row: row['pid']):
+                processes.append(self._format_process(proc_info))
             
             header = "PID    NAME                 CPU%   MEM%"
             return header + '\n' + '\n'.join(processes), 0
         except Exception as e:
             return f"Error getting process list: {str(e)}", 1
     
+    @builtin(section='System Information', help="Show top processes by CPU (-n COUNT, -d SECONDS to refresh live)", completion='none', pure=True)
     def cmd_top(self, args: List[str]) -> Tuple[str, int]:
         """Show top processes by CPU usage."""
+        count = 10
+        delay = None
         try:
-            processes = []
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
-                try:
-                    proc_info = proc.info
-                    if proc_info['cpu_percent'] is not None:
-                        processes.append(proc_info)
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
-            
-            # Sort by CPU usage
-            processes.sort(key=lambda x: x['cpu_percent'] or 0, reverse=True)
-            
-            output = ["PID    NAME                 CPU%   MEM%"]
-            for proc in processes[:10]:  # Top 10
-                output.append(f"{proc['pid']:6d} {proc['name']:20s} {proc['cpu_percent']:6.1f}% {proc['memory_percent']:6.1f}%")
-            
-            return '\n'.join(output), 0
+            if '-n' in args:
+                count = int(args[args.index('-n') + 1])
+            if '-d' in args:
+                delay = float(args[args.index('-d') + 1])
+        except (IndexError, ValueError):
+            return "top: usage: top [-n COUNT] [-d SECONDS]", 1
+        
+        if delay is not None:
+            if not self.interactive:
+                return "top: -d (live refresh) is only available in the CLI", 1
+            return self._live_top(count, delay)
+        
+        try:
+            return self._format_top(count), 0
         except Exception as e:
             return f"Error getting top processes: {str(e)}", 1
     
+    def _format_top(self, count: int) -> str:
+        """Format the count busiest processes."""
+        output = ["PID    NAME                 CPU%   MEM%"]
+        for proc_info in self.process_table.top(count):
+            output.append(self._format_process(proc_info))
+        return '\n'.join(output)
+    
+    def _format_process(self, proc_info: Dict[str, Any]) -> str:
+        """Format one process table row."""
+        return f"{proc_info['pid']:6d} {proc_info['name']:20s} {proc_info['cpu_percent']:6.1f}% {proc_info['memory_percent']:6.1f}%"
+    
+    def _live_top(self, count: int, delay: float) -> Tuple[str, int]:
+        """Redraw the top processes every delay seconds until Ctrl+C."""
+        try:
+            while True:
+                frame = self._format_top(count)
+                sys.stdout.write(f"\033[H\033[2J{time.strftime('%H:%M:%S')}  (Ctrl+C to stop)\n{frame}\n")
+                sys.stdout.flush()
+                time.sleep(max(delay, self.process_table.ttl))
+        except KeyboardInterrupt:
+            return "", 0
+        except Exception as e:
+            return f"Error getting top processes: {str(e)}", 1
+    
+    @builtin(section='Jobs', help="List background jobs (-l to show PIDs)", completion='none', pure=True)
+    def cmd_jobs(self, args: List[str]) -> Tuple[str, int]:
+        """List background jobs."""
+        long_format = '-l' in args
+        lines = []
+        for job in self.jobs.list():
+            lines.append(self._format_job(job, long_format))
+            if job.done:
+                job.reported = True
+        self.jobs.forget_reported()
+        return '\n'.join(lines), 0
+    
+    @builtin(section='Jobs', synopsis='fg [%N]', help="Follow a job's output until it finishes", completion='jobs')
+    def cmd_fg(self, args: List[str]) -> Tuple[str, int]:
+        """Wait for a job, showing its output."""
+        return CommandStream(self.stream_fg(args)).read()
+    
+    @streams('fg')
+    def stream_fg(self, args: List[str], stdin: Optional[CommandStream] = None) -> Generator[str, None, int]:
+        """Bring a job to the foreground: resume it and follow its output until it ends."""
+        spec = args[0] if args else None
+        job = self.jobs.get(spec)
+        if job is None:
+            yield f"fg: {spec or 'current'}: no such job"
+            return 1
+        
+        if job.state == 'Stopped':
+            job.signal(signal.SIGCONT)
+        yield job.command + '\n'
+        
+        buffer = job.buffer
+        offset = 0
+        try:
+            while True:
+                if offset < buffer.start:
+                    yield f"[... {buffer.start - offset} characters of earlier output dropped ...]\n"
+                text, offset = buffer.read(offset)
+                if text:
+                    yield text
+                elif job.done:
+                    break
+                else:
+                    buffer.wait(offset, timeout=1.0)
+        except KeyboardInterrupt:
+            # Ctrl+C in the CLI interrupts the job, as it would in a shell
+            job.signal(signal.SIGINT)
+            return 130
+        
+        self.jobs.forget(job)
+        return job.exit_code
+    
+    @builtin(section='Jobs', synopsis='bg [%N]', help="Resume a stopped job in the background", completion='jobs')
+    def cmd_bg(self, args: List[str]) -> Tuple[str, int]:
+        """Resume a stopped job in the background."""
+        spec = args[0] if args else None
+        job = self.jobs.get(spec)
+        if job is None:
+            return f"bg: {spec or 'current'}: no such job", 1
+        if job.state != 'Stopped':
+            return f"bg: job {job.id} already in background", 0
+        job.signal(signal.SIGCONT)
+        return f"[{job.id}] {job.command} &", 0
+    
+    @builtin(section='Jobs', help="Signal jobs or processes (kill -STOP %1, kill -9 PID)", completion='jobs')
+    def cmd_kill(self, args: List[str]) -> Tuple[str, int]:
+        """Send a signal to jobs (%N) or processes (PID)."""
+        sig = signal.SIGTERM
+        targets = list(args)
+        if targets and targets[0] == '-s' and len(targets) > 1:
+            name, targets = targets[1], targets[2:]
+        elif targets and targets[0].startswith('-') and len(targets[0]) > 1:
+            name, targets = targets[0][1:], targets[1:]
+        else:
+            name = None
+        if name is not None:
+            try:
+                sig = int(name) if name.isdigit() else signal.Signals['SIG' + name.upper().replace('SIG', '', 1)]
+            except KeyError:
+                return f"kill: {name}: invalid signal specification", 1
+        if not targets:
+            return "kill: usage: kill [-s SIGNAL | -SIGNAL] %JOB | PID ...", 2
+        
+        output = []
+        exit_code = 0
+        for target in targets:
+            if target.startswith('%'):
+                job = self.jobs.get(target)
+                if job is None or job.done:
+                    output.append(f"kill: {target}: no such job")
+                    exit_code = 1
+                elif not job.processes:
+                    output.append(f"kill: {target}: job has no processes to signal")
+                    exit_code = 1
+                else:
+                    job.signal(sig)
+                continue
+            try:
+                os.kill(int(target), sig)
+            except ValueError:
+                output.append(f"kill: {target}: arguments must be process or job IDs")
+                exit_code = 1
+            except ProcessLookupError:
+                output.append(f"kill: ({target}) - No such process")
+                exit_code = 1
+            except PermissionError:
+                output.append(f"kill: ({target}) - Operation not permitted")
+                exit_code = 1
+        return '\n'.join(output), exit_code
+    
+    @builtin(section='Jobs', synopsis='wait [%N]', help="Wait for background jobs to finish", completion='jobs')
+    def cmd_wait(self, args: List[str]) -> Tuple[str, int]:
+        """Wait for background jobs to finish."""
+        if args:
+            jobs = []
+            for spec in args:
+                job = self.jobs.get(spec)
+                if job is None:
+                    return f"wait: {spec}: no such job", 127
+                jobs.append(job)
+        else:
+            jobs = self.jobs.list()
+        
+        exit_code = 0
+        lines = []
+        for job in jobs:
+            job.wait()
+            lines.append(self._format_job(job))
+            job.reported = True
+            exit_code = job.exit_code
+        self.jobs.forget_reported()
+        return '\n'.join(lines), exit_code
+    
+    @builtin(section='Jobs', help="Run a program on a pseudo-terminal (pty COMMAND)")
+    def cmd_pty(self, args: List[str]) -> Tuple[str, int]:
+        """Run a program on a pseudo-terminal and capture its output."""
+        return CommandStream(self.stream_pty(args)).read()
+    
+    @streams('pty')
+    def stream_pty(self, args: List[str], stdin: Optional[CommandStream] = None) -> Generator[str, None, int]:
+        """Stream the output of a program that insists on a terminal.
+        
+        Used when 'pty cmd' runs as an ordinary command, e.g. inside a
+        pipeline; nothing is typed into the program, so it is limited to
+        the command's time limit (``command_timeout`` unless 'timeout N'
+        set another) like any other external command.
+        """
+        # Not a generator itself, so the program gets the time limit in force as its stage starts
+        return self._pty(args, self.time_limit)
+    
+    def _pty(self, args: List[str], timeout: Optional[float]) -> Generator[str, None, int]:
+        if not args:
+            yield "pty: usage: pty COMMAND [ARG ...]"
+            return 2
+        try:
+            pty_session = PtySession(args, self.current_dir, executable=self.resolve_command(args[0]))
+        except FileNotFoundError:
+            yield self.command_not_found(args[0])
+            return 1
+        except OSError as e:
+            yield f"pty: {e.strerror or e}"
+            return 1
+        
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        deadline = None if timeout is None else time.monotonic() + timeout
+        pending = ''
+        try:
+            while True:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    yield f"Command timed out after {timeout:g} seconds"
+                    return 124
+                data = pty_session.read(remaining)
+                if data is None:
+                    break
+                # The terminal ends lines with CRLF; hold a trailing CR in case its LF follows
+                text = (pending + decoder.decode(data)).replace('\r\n', '\n')
+                text, pending = (text[:-1], '\r') if text.endswith('\r') else (text, '')
+                if text:
+                    yield text
+            tail = pending + decoder.decode(b'', final=True)
+            if tail:
+                yield tail
+        finally:
+            exit_code = pty_session.close()
+        return exit_code
+    
+    def _format_job(self, job: Job, long_format: bool = False) -> str:
+        """Format a job as the jobs builtin shows it."""
+        current, previous = self.jobs.get('%+'), self.jobs.get('%-')
+        mark = '+' if job is current else '-' if job is previous else ' '
+        pids = f"{' '.join(map(str, job.pids))} " if long_format and job.pids else ''
+        suffix = '' if job.done else ' &'
+        return f"[{job.id}]{mark}  {pids}{job.state:<24}{job.command}{suffix}"
+    
+    def _job_notices(self) -> List[str]:
+        """Return status lines for finished jobs not yet reported, and forget those jobs."""
+        notices = []
+        for job in self.jobs.list():
+            if job.done and not job.reported:
+                notices.append(self._format_job(job))
+                job.reported = True
+        self.jobs.forget_reported()
+        return notices
+    
+    @builtin(section='System Information', help="Show disk space usage", completion='none', pure=True)
     def cmd_df(self, args: List[str]) -> Tuple[str, int]:
         """Show disk space usage."""
+        import psutil
         try:
             partitions = psutil.disk_partitions()
             output = ["Filesystem     1K-blocks     Used Available Use% Mounted on"]
@@ -491,8 +1630,10 @@ class TerminalBackend:
         except Exception as e:
             return f"Error getting disk usage: {str(e)}", 1
     
+    @builtin(section='System Information', help="Show memory usage", completion='none', pure=True)
     def cmd_free(self, args: List[str]) -> Tuple[str, int]:
         """Show memory usage."""
+        import psutil
         try:
             memory = psutil.virtual_memory()
             swap = psutil.swap_memory()
@@ -507,16 +1648,20 @@ class TerminalBackend:
         except Exception as e:
             return f"Error getting memory info: {str(e)}", 1
     
+    @builtin(section='System Information', help="Show current user", completion='none', pure=True)
     def cmd_whoami(self, args: List[str]) -> Tuple[str, int]:
         """Show current user."""
         return os.getenv('USER', os.getenv('USERNAME', 'unknown')), 0
     
+    @builtin(section='System Information', help="Show current date/time", completion='none', pure=True)
     def cmd_date(self, args: List[str]) -> Tuple[str, int]:
         """Show current date and time."""
         return time.strftime("%a %b %d %H:%M:%S %Z %Y"), 0
     
+    @builtin(section='System Information', help="Show system uptime", completion='none', pure=True)
     def cmd_uptime(self, args: List[str]) -> Tuple[str, int]:
         """Show system uptime."""
+        import psutil
         try:
             boot_time = psutil.boot_time()
             uptime_seconds = time.time() - boot_time
@@ -529,129 +1674,39 @@ class TerminalBackend:
         except Exception as e:
             return f"Error getting uptime: {str(e)}", 1
     
+    @builtin(help="Show this help", completion='none', pure=True)
     def cmd_help(self, args: List[str]) -> Tuple[str, int]:
         """Show help information."""
-        help_text = """
-Available commands:
-  File Operations:
-    ls, ll, la     - List directory contents
-    cd             - Change directory
-    pwd            - Print working directory
-    mkdir          - Create directory
-    rm             - Remove files/directories
-    rmdir          - Remove empty directories
-    cp             - Copy files/directories
-    mv             - Move/rename files/directories
-    cat            - Display file contents
-    echo           - Echo arguments
-  
-  System Information:
-    ps             - Show running processes
-    top            - Show top processes by CPU
-    df             - Show disk space usage
-    free           - Show memory usage
-    whoami         - Show current user
-    date           - Show current date/time
-    uptime         - Show system uptime
-  
-  Terminal:
-    clear          - Clear screen
-    history        - Show command history
-    help           - Show this help
-    exit, quit     - Exit terminal
-  
-  Aliases:
-    ll = ls -la
-    la = ls -la
-    .. = cd ..
-    ... = cd ../..
-    h = history
-    c = clear
-        """
-        return help_text.strip(), 0
+        return self.commands.help_text(self.aliases, SYNTAX_HELP), 0
     
+    @builtin('exit', 'quit', help="Exit terminal", completion='none')
     def cmd_exit(self, args: List[str]) -> Tuple[str, int]:
         """Exit the terminal."""
         return "Goodbye!", -1  # Special exit code
     
     def interpret_natural_language(self, query: str) -> str:
-        """Interpret natural language queries into commands (AI-driven)."""
-        if not self.openai_client:
-            return "AI interpretation not available. Set OPENAI_API_KEY environment variable."
+        """Interpret natural language queries into commands (AI-driven).
+        
+        Raises RuntimeError, with a message for the user, when no model is
+        available or none could answer; the message is not a command.
+        """
+        if not self.interpreter.available:
+            raise RuntimeError("AI interpretation not available. Set OPENAI_API_KEY environment variable.")
         
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a terminal command interpreter. Convert natural language requests into appropriate terminal commands. Only respond with the command, no explanations."},
-                    {"role": "user", "content": f"Convert this to a terminal command: {query}"}
-                ],
-                max_tokens=100,
-                temperature=0.1
-            )
-            
-            command = response.choices[0].message.content.strip()
-            return command
+            return self.interpreter.interpret(query)
         except Exception as e:
-            return f"Error interpreting natural language: {str(e)}"
+            raise RuntimeError(f"Error interpreting natural language: {str(e)}") from e
     
     def run(self):
-        """Main terminal loop."""
-        print(f"{Fore.CYAN}Welcome to Advanced Python Terminal!{Fore.RESET}")
-        print(f"{Fore.YELLOW}Type 'help' for available commands or 'exit' to quit.{Fore.RESET}")
-        print(f"{Fore.GREEN}AI-powered natural language interpretation is available!{Fore.RESET}")
-        print()
-        
-        # Set up auto-completion
-        commands = list(self.builtin_commands.keys()) + list(self.aliases.keys())
-        completer = WordCompleter(commands, ignore_case=True)
-        
-        while True:
-            try:
-                # Get user input with auto-completion and history
-                user_input = self.session.prompt(
-                    self.get_prompt(),
-                    completer=completer,
-                    auto_suggest=AutoSuggestFromHistory(),
-                    complete_while_typing=True
-                )
-                
-                # Check for AI interpretation
-                if user_input.startswith('ai '):
-                    query = user_input[3:].strip()
-                    if query:
-                        interpreted_command = self.interpret_natural_language(query)
-                        print(f"{Fore.MAGENTA}AI interpreted: {interpreted_command}{Fore.RESET}")
-                        user_input = interpreted_command
-                
-                # Execute command
-                output, exit_code = self.execute_command(user_input)
-                
-                # Handle special exit code
-                if exit_code == -1:
-                    print(output)
-                    break
-                
-                # Display output
-                if output:
-                    print(output)
-                
-                # Show error for non-zero exit codes
-                if exit_code != 0 and not output:
-                    print(f"{Fore.RED}Command failed with exit code {exit_code}{Fore.RESET}")
-                
-            except KeyboardInterrupt:
-                print(f"\n{Fore.YELLOW}Use 'exit' to quit the terminal{Fore.RESET}")
-            except EOFError:
-                print(f"\n{Fore.YELLOW}Goodbye!{Fore.RESET}")
-                break
-            except Exception as e:
-                print(f"{Fore.RED}Unexpected error: {str(e)}{Fore.RESET}")
+        """Run the interactive command line front end on this terminal."""
+        from cli import run
+        run(self)
 
 def main():
     """Main entry point."""
-    terminal = TerminalBackend()
-    terminal.run()
+    from cli import main as cli_main
+    cli_main()
 
 if __name__ == "__main__":
     main()